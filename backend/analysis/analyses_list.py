@@ -0,0 +1,119 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from legislation_cache import LEGISLATION_CACHE
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Колонки списка: без описания, улик и analysis_result — они нужны только в карточке анализа
+LIST_COLUMNS = """
+    ca.id, ca.case_number, ca.incident_date, ca.category, ca.status,
+    ca.officer_id, ca.created_at, ca.updated_at
+"""
+
+
+def encode_cursor(row: dict) -> str:
+    """Курсор следующей страницы: (created_at, id) последней строки"""
+    raw = json.dumps([row['created_at'].isoformat(), row['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбор курсора; некорректный курсор — ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, analysis_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(analysis_id)
+    except (ValueError, TypeError):
+        raise ValueError('Некорректный курсор страницы')
+
+
+def parse_date(value: str, name: str) -> str:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        raise ValueError(f"Некорректная дата {name}: {value}")
+
+
+def list_analyses(conn, query_params: dict) -> Tuple[List[dict], Optional[str]]:
+    """Страница списка анализов от новых к старым с фильтрами и числом документов"""
+    limit = min(max(int(query_params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+
+    conditions = []
+    params = []
+
+    if query_params.get('status'):
+        conditions.append("ca.status = %s")
+        params.append(query_params['status'])
+
+    if query_params.get('officer_id'):
+        conditions.append("ca.officer_id = %s")
+        params.append(int(query_params['officer_id']))
+
+    if query_params.get('category'):
+        conditions.append("ca.category = %s")
+        params.append(query_params['category'])
+
+    if query_params.get('date_from'):
+        conditions.append("ca.incident_date >= %s")
+        params.append(parse_date(query_params['date_from'], 'date_from'))
+
+    if query_params.get('date_to'):
+        conditions.append("ca.incident_date <= %s")
+        params.append(parse_date(query_params['date_to'], 'date_to'))
+
+    if query_params.get('article'):
+        # Номер статьи УК РФ переводится в id по кэшу законодательства
+        articles = LEGISLATION_CACHE.get_articles(conn, 'uk_rf', [query_params['article']])
+        if not articles:
+            return [], None
+        # Сначала все дела статьи (индекс idx_analysis_articles_article), затем выборка по первичному
+        # ключу и сортировка. С IN планировщик идёт по индексу created_at и проверяет каждое дело:
+        # для редкой статьи это проход по всей таблице
+        conditions.append("""ca.id = ANY(ARRAY(
+            SELECT analysis_id
+            FROM analysis_articles
+            WHERE article_type = 'uk_rf' AND article_id = %s
+        ))""")
+        params.append(articles[0]['id'])
+
+    if query_params.get('after'):
+        conditions.append("(ca.created_at, ca.id) < (%s, %s)")
+        params.extend(decode_cursor(query_params['after']))
+
+    where = ' AND '.join(conditions) if conditions else 'TRUE'
+
+    # Сначала выбирается страница по индексу (created_at, id), затем к ней
+    # присоединяются сотрудник и агрегированное число документов только этих анализов
+    cur = conn.cursor()
+    cur.execute(f"""
+        WITH page AS (
+            SELECT {LIST_COLUMNS}
+            FROM crime_analyses ca
+            WHERE {where}
+            ORDER BY ca.created_at DESC, ca.id DESC
+            LIMIT %s
+        ),
+        documents AS (
+            SELECT analysis_id, COUNT(*) AS document_count
+            FROM document_attachments
+            WHERE analysis_id IN (SELECT id FROM page)
+            GROUP BY analysis_id
+        )
+        SELECT
+            page.*,
+            u.full_name as officer_name,
+            u.rank as officer_rank,
+            COALESCE(documents.document_count, 0) as document_count
+        FROM page
+        LEFT JOIN users u ON page.officer_id = u.id
+        LEFT JOIN documents ON documents.analysis_id = page.id
+        ORDER BY page.created_at DESC, page.id DESC
+    """, params + [limit])
+    analyses = cur.fetchall()
+    cur.close()
+
+    next_cursor = encode_cursor(analyses[-1]) if len(analyses) == limit else None
+    return analyses, next_cursor
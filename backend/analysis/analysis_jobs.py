@@ -0,0 +1,155 @@
+import json
+import os
+from typing import List
+
+# Очередь анализов: размер пачки обработчика, число попыток и время, после которого зависшее задание возвращается в очередь
+WORKER_BATCH_SIZE = int(os.environ.get('ANALYSIS_WORKER_BATCH_SIZE', '10'))
+WORKER_TIME_BUDGET = float(os.environ.get('ANALYSIS_WORKER_TIME_BUDGET', '50'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_JOB_MAX_ATTEMPTS', '3'))
+JOB_STALE_AFTER = int(os.environ.get('ANALYSIS_JOB_STALE_AFTER', '300'))
+
+# Пауза перед повтором упавшего задания растёт с номером попытки
+JOB_RETRY_DELAY = int(os.environ.get('ANALYSIS_JOB_RETRY_DELAY', '30'))
+
+# Объём описания, улик и вложения (в байтах), начиная с которого анализ уходит в очередь; 0 — только по запросу
+ASYNC_THRESHOLD_BYTES = int(os.environ.get('ANALYSIS_ASYNC_THRESHOLD_BYTES', '0'))
+
+
+def should_enqueue(body: dict) -> bool:
+    """Асинхронный режим: явно запрошен клиентом или входные данные больше порога"""
+    if body.get('async'):
+        return True
+    if ASYNC_THRESHOLD_BYTES <= 0:
+        return False
+
+    document = body.get('document') or {}
+    size = (
+        len(body.get('description', '')) + len(body.get('evidence', ''))
+        + len(document.get('file_data', '')) + len(document.get('extracted_text', ''))
+    )
+    return size >= ASYNC_THRESHOLD_BYTES
+
+
+def enqueue_job(cur, analysis_id: int, payload: dict) -> int:
+    """Постановка анализа в очередь (фиксируется вместе с транзакцией вызывающего)"""
+    cur.execute("""
+        INSERT INTO analysis_jobs (analysis_id, payload)
+        VALUES (%s, %s)
+        RETURNING id
+    """, (analysis_id, json.dumps(payload)))
+    return cur.fetchone()['id']
+
+
+def requeue_stale_jobs(cur) -> dict:
+    """Зависшие задания (обработчик не отчитался за JOB_STALE_AFTER секунд): с исчерпанными попытками —
+    failed, как в fail_job (документ, роняющий обработчик, не повторяется бесконечно), остальные — в очередь"""
+    cur.execute("""
+        WITH stale AS (
+            UPDATE analysis_jobs
+            SET status = CASE WHEN attempts >= %(max_attempts)s THEN 'failed' ELSE 'queued' END,
+                locked_at = NULL,
+                last_error = CASE WHEN attempts >= %(max_attempts)s
+                    THEN 'Обработчик не завершил задание за ' || %(stale_after)s || ' с'
+                    ELSE last_error END,
+                finished_at = CASE WHEN attempts >= %(max_attempts)s THEN NOW() END
+            WHERE status = 'processing'
+              AND locked_at < NOW() - make_interval(secs => %(stale_after)s)
+            RETURNING analysis_id, status
+        ), analyses AS (
+            UPDATE crime_analyses ca
+            SET status = CASE WHEN stale.status = 'failed' THEN 'failed' ELSE 'pending' END,
+                updated_at = CURRENT_TIMESTAMP
+            FROM stale
+            WHERE ca.id = stale.analysis_id
+        )
+        SELECT
+            COUNT(*) FILTER (WHERE status = 'queued') AS requeued,
+            COUNT(*) FILTER (WHERE status = 'failed') AS failed
+        FROM stale
+    """, {'max_attempts': JOB_MAX_ATTEMPTS, 'stale_after': JOB_STALE_AFTER})
+    return dict(cur.fetchone())
+
+
+def claim_jobs(cur, batch_size: int = WORKER_BATCH_SIZE) -> List[dict]:
+    """Захват пачки заданий; SKIP LOCKED позволяет нескольким обработчикам не мешать друг другу"""
+    cur.execute("""
+        UPDATE analysis_jobs
+        SET status = 'processing', locked_at = NOW(), attempts = attempts + 1
+        WHERE id IN (
+            SELECT id
+            FROM analysis_jobs
+            WHERE status = 'queued' AND run_after <= NOW()
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, analysis_id, payload, attempts
+    """, (batch_size,))
+    jobs = sorted(cur.fetchall(), key=lambda job: job['id'])
+
+    if jobs:
+        cur.execute("""
+            UPDATE crime_analyses
+            SET status = 'processing', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ANY(%s)
+        """, ([job['analysis_id'] for job in jobs],))
+    return jobs
+
+
+def complete_job(cur, job_id: int):
+    """Задание выполнено; тело файла из полезной нагрузки больше не нужно"""
+    cur.execute("""
+        UPDATE analysis_jobs
+        SET status = 'completed', finished_at = NOW(), last_error = NULL,
+            payload = payload #- '{document,file_data}'
+        WHERE id = %s
+    """, (job_id,))
+
+
+def fail_job(cur, job: dict, error: str) -> str:
+    """Ошибка задания: повтор, пока не исчерпаны попытки, затем анализ помечается failed"""
+    final = job['attempts'] >= JOB_MAX_ATTEMPTS
+    status = 'failed' if final else 'queued'
+
+    cur.execute("""
+        UPDATE analysis_jobs
+        SET status = %s, locked_at = NULL, last_error = %s,
+            run_after = NOW() + make_interval(secs => %s),
+            finished_at = CASE WHEN %s THEN NOW() END
+        WHERE id = %s
+    """, (status, error, JOB_RETRY_DELAY * job['attempts'], final, job['id']))
+    cur.execute("""
+        UPDATE crime_analyses
+        SET status = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+    """, ('failed' if final else 'pending', job['analysis_id']))
+    return status
+
+
+def release_jobs(cur, jobs: List[dict]) -> int:
+    """Возврат захваченных, но не начатых заданий в очередь без траты попытки"""
+    if not jobs:
+        return 0
+    cur.execute("""
+        UPDATE analysis_jobs
+        SET status = 'queued', locked_at = NULL, attempts = attempts - 1
+        WHERE id = ANY(%s)
+    """, ([job['id'] for job in jobs],))
+    cur.execute("""
+        UPDATE crime_analyses
+        SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+        WHERE id = ANY(%s)
+    """, ([job['analysis_id'] for job in jobs],))
+    return len(jobs)
+
+
+def get_job_status(cur, analysis_id: int):
+    """Состояние последнего задания анализа для опроса клиентом"""
+    cur.execute("""
+        SELECT status, attempts, last_error, created_at, finished_at
+        FROM analysis_jobs
+        WHERE analysis_id = %s
+        ORDER BY id DESC
+        LIMIT 1
+    """, (analysis_id,))
+    return cur.fetchone()
@@ -0,0 +1,214 @@
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from psycopg2.extras import execute_values
+from analyses_list import parse_date
+from legislation_cache import LEGISLATION_CACHE
+
+DIMENSIONS = ('category', 'article', 'officer', 'severity', 'day')
+
+# Сколько строк приращений переносится в агрегаты за одну транзакцию
+ROLLUP_FOLD_BATCH = int(os.environ.get('ROLLUP_FOLD_BATCH', '10000'))
+
+# Сколько расхождений агрегатов с исходными таблицами возвращается при сверке
+MAX_REPORTED_MISMATCHES = 100
+
+# Агрегаты, пересчитанные по исходным таблицам (те же правила, что и при сохранении анализа)
+RECOMPUTE_QUERIES = {
+    'category': """
+        SELECT COALESCE(category, '') AS bucket, COUNT(*) AS analyses
+        FROM crime_analyses
+        WHERE status = 'completed'
+        GROUP BY 1
+    """,
+    'officer': """
+        SELECT COALESCE(officer_id::text, '') AS bucket, COUNT(*) AS analyses
+        FROM crime_analyses
+        WHERE status = 'completed'
+        GROUP BY 1
+    """,
+    'day': """
+        SELECT incident_date::text AS bucket, COUNT(*) AS analyses
+        FROM crime_analyses
+        WHERE status = 'completed'
+        GROUP BY 1
+    """,
+    'severity': """
+        SELECT COALESCE(analysis_result->'article_details'->0->>'severity', '') AS bucket, COUNT(*) AS analyses
+        FROM crime_analyses
+        WHERE status = 'completed'
+        GROUP BY 1
+    """,
+    'article': """
+        SELECT a.article_number AS bucket, COUNT(DISTINCT aa.analysis_id) AS analyses
+        FROM analysis_articles aa
+        JOIN crime_analyses ca ON ca.id = aa.analysis_id
+        JOIN uk_rf_articles a ON a.id = aa.article_id
+        WHERE aa.article_type = 'uk_rf' AND ca.status = 'completed'
+        GROUP BY 1
+    """
+}
+
+
+def rollup_keys(conn, analysis: dict) -> List[Tuple[str, str]]:
+    """Корзины агрегатов одного завершённого анализа: category, officer_id, incident_date и analysis_result"""
+    analysis_result = analysis['analysis_result']
+    details = analysis_result.get('article_details') or []
+    articles = LEGISLATION_CACHE.get_articles(conn, 'uk_rf', analysis_result.get('suggested_articles') or [])
+
+    keys = [
+        ('category', analysis.get('category') or ''),
+        ('officer', str(analysis['officer_id']) if analysis.get('officer_id') is not None else ''),
+        ('day', str(analysis['incident_date'])),
+        ('severity', (details[0].get('severity') if details else None) or '')
+    ]
+    keys.extend(('article', number) for number in {art['article_number'] for art in articles})
+    return keys
+
+
+def record_analyses(conn, cur, analyses: Iterable[dict]) -> int:
+    """Учёт завершённых анализов (в транзакции сохранения анализов): только вставка приращений.
+    Общие строки analysis_rollups не блокируются — их обновляет fold_rollup_deltas"""
+    counts = Counter(key for analysis in analyses for key in rollup_keys(conn, analysis))
+    if not counts:
+        return 0
+
+    execute_values(cur, """
+        INSERT INTO analysis_rollup_deltas (dimension, bucket, analyses)
+        VALUES %s
+    """, [(dimension, bucket, count) for (dimension, bucket), count in counts.items()], page_size=1000)
+    return len(counts)
+
+
+def fold_rollup_deltas(cur, limit: Optional[int] = ROLLUP_FOLD_BATCH) -> int:
+    """Перенос до limit самых старых приращений в analysis_rollups (None — всех); возвращает число строк.
+    Приращения, которые забрал параллельный перенос, пропускаются (SKIP LOCKED) и не учитываются дважды"""
+    # Корзины обновляются по порядку ключа — параллельные переносы не взаимоблокируются
+    cur.execute("""
+        WITH folded AS (
+            DELETE FROM analysis_rollup_deltas
+            WHERE id IN (
+                SELECT id
+                FROM analysis_rollup_deltas
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING dimension, bucket, analyses
+        ), totals AS (
+            SELECT dimension, bucket, SUM(analyses) AS analyses, COUNT(*) AS deltas
+            FROM folded
+            GROUP BY dimension, bucket
+        ), applied AS (
+            INSERT INTO analysis_rollups (dimension, bucket, analyses)
+            SELECT dimension, bucket, analyses
+            FROM totals
+            ORDER BY dimension, bucket
+            ON CONFLICT (dimension, bucket) DO UPDATE
+            SET analyses = analysis_rollups.analyses + EXCLUDED.analyses,
+                updated_at = CURRENT_TIMESTAMP
+        )
+        SELECT COALESCE(SUM(deltas), 0) AS folded FROM totals
+    """, (limit,))
+    return int(cur.fetchone()['folded'])
+
+
+def get_statistics(conn, query_params: dict) -> dict:
+    """Статистика панели: чтение только строк агрегатов и ещё не перенесённых приращений (по числу корзин, а не анализов)"""
+    dimensions = [name for name in (query_params.get('dimensions') or ','.join(DIMENSIONS)).split(',') if name]
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Неизвестный разрез статистики: {', '.join(unknown)}")
+
+    # Диапазон дат относится только к разрезу по дням (ключ корзины — дата ISO, сравнивается как строка)
+    day_from = parse_date(query_params['date_from'], 'date_from') if query_params.get('date_from') else '0000-00-00'
+    day_to = parse_date(query_params['date_to'], 'date_to') if query_params.get('date_to') else '9999-99-99'
+
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT r.dimension, r.bucket, r.analyses, u.full_name AS officer_name
+        FROM (
+            SELECT dimension, bucket, SUM(analyses)::bigint AS analyses
+            FROM (
+                SELECT dimension, bucket, analyses FROM analysis_rollups
+                UNION ALL
+                SELECT dimension, bucket, analyses FROM analysis_rollup_deltas
+            ) counters
+            GROUP BY dimension, bucket
+        ) r
+        LEFT JOIN users u ON r.dimension = 'officer' AND u.id::text = r.bucket
+        WHERE (r.dimension = ANY(%s) OR r.dimension = 'category')
+          AND r.analyses > 0
+          AND (r.dimension <> 'day' OR r.bucket BETWEEN %s AND %s)
+        ORDER BY r.dimension, r.analyses DESC, r.bucket
+    """, (dimensions, day_from, day_to))
+    rows = cur.fetchall()
+    cur.close()
+
+    statistics = {'total': sum(row['analyses'] for row in rows if row['dimension'] == 'category')}
+    for name in dimensions:
+        statistics[f'by_{name}'] = []
+
+    titles = {}
+    if 'article' in dimensions:
+        numbers = [row['bucket'] for row in rows if row['dimension'] == 'article']
+        titles = {art['article_number']: art['title'] for art in LEGISLATION_CACHE.get_articles(conn, 'uk_rf', numbers)}
+
+    for row in rows:
+        if row['dimension'] not in dimensions:
+            continue
+        item = {'key': row['bucket'], 'count': row['analyses']}
+        if row['dimension'] == 'officer':
+            item['officer_name'] = row['officer_name']
+        elif row['dimension'] == 'article':
+            item['title'] = titles.get(row['bucket'])
+        statistics[f"by_{row['dimension']}"].append(item)
+
+    # Дни — в хронологическом порядке, остальные разрезы — по убыванию числа анализов
+    if 'day' in dimensions:
+        statistics['by_day'].sort(key=lambda item: item['key'])
+    return statistics
+
+
+def recompute_statistics(conn, repair: bool = False) -> dict:
+    """Полный пересчёт агрегатов по исходным таблицам и сверка с накопленными; repair — перезапись агрегатов"""
+    cur = conn.cursor()
+    # Блокировка ждёт завершения транзакций, уже записавших приращения или переносящих их, и задерживает
+    # новые до конца сверки; затем все приращения переносятся и сравниваются только агрегаты
+    cur.execute("LOCK TABLE analysis_rollups, analysis_rollup_deltas IN SHARE ROW EXCLUSIVE MODE")
+    fold_rollup_deltas(cur, limit=None)
+
+    expected: Dict[Tuple[str, str], int] = {}
+    for dimension, query in RECOMPUTE_QUERIES.items():
+        cur.execute(query)
+        expected.update(((dimension, row['bucket']), row['analyses']) for row in cur.fetchall())
+
+    cur.execute("SELECT dimension, bucket, analyses FROM analysis_rollups")
+    actual = {(row['dimension'], row['bucket']): row['analyses'] for row in cur.fetchall()}
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        if expected.get(key, 0) != actual.get(key, 0):
+            mismatches.append({
+                'dimension': key[0],
+                'bucket': key[1],
+                'expected': expected.get(key, 0),
+                'actual': actual.get(key, 0)
+            })
+
+    if repair and mismatches:
+        cur.execute("DELETE FROM analysis_rollups")
+        execute_values(cur, """
+            INSERT INTO analysis_rollups (dimension, bucket, analyses)
+            VALUES %s
+        """, [(dimension, bucket, count) for (dimension, bucket), count in sorted(expected.items())], page_size=1000)
+
+    conn.commit()
+    cur.close()
+    return {
+        'consistent': not mismatches,
+        'buckets': len(expected),
+        'mismatches': len(mismatches),
+        'details': mismatches[:MAX_REPORTED_MISMATCHES],
+        'repaired': bool(repair and mismatches)
+    }
@@ -0,0 +1,143 @@
+import os
+import time
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+from lemmatizer import TOKEN_RE, lemmatize
+from legislation_cache import LEGISLATION_CACHE
+
+# Параметры BM25: насыщение частоты термина и нормализация по длине статьи
+BM25_K1 = float(os.environ.get('RANKER_BM25_K1', '1.2'))
+BM25_B = float(os.environ.get('RANKER_BM25_B', '0.75'))
+
+RANKER_TOP_K = 10
+
+# Релевантность 0..1 из оценки BM25 с фиксированным насыщением score / (score + K): не зависит от того,
+# какие ещё статьи нашлись. Оценки ниже RANKER_MIN_SCORE (совпадение одного частого слова) отбрасываются
+RANKER_SATURATION_K = float(os.environ.get('RANKER_SATURATION_K', '5.0'))
+RANKER_MIN_SCORE = float(os.environ.get('RANKER_MIN_SCORE', '2.5'))
+
+# Служебные слова (местоимения, предлоги, союзы, частицы, связки): встречаются в любой статье и любом
+# протоколе, поэтому по ним BM25 находил статьи для текстов, не имеющих отношения к преступлению
+RUSSIAN_STOPWORDS = frozenset("""
+    а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до его
+    ее ей ему если есть еще же за здесь и из или им их к как какая какой когда кто ли либо лишь между меня
+    мне может можно мой моя мы на над нас наш не него нее ней нельзя нет ни ним них но ну о об однако он она
+    они оно от очень по под после при про с сам себе себя со так также такой там те тем то того тоже той
+    только том тот ту тут ты у уже чем через что чтобы чье эта эти это этого этой этом этот эту я
+""".split())
+
+
+def text_lemmas(text: str, stopwords: frozenset = RUSSIAN_STOPWORDS) -> List[str]:
+    """Леммы значимых слов текста (те же, что использует словарь ключевых слов), без стоп-слов"""
+    return [lemmatize(token) for token in TOKEN_RE.findall(text.lower().replace('ё', 'е')) if token not in stopwords]
+
+
+def bm25_relevance(score: float) -> float:
+    """Релевантность 0..1 по абсолютной оценке BM25"""
+    return score / (score + RANKER_SATURATION_K) if score > 0 else 0.0
+
+
+class ArticleRanker:
+    """BM25 по статьям УК РФ: разреженная матрица весов в памяти, оценка описаний одним умножением"""
+
+    def __init__(self):
+        self.version = None
+        self.numbers: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.term_weights = None
+        self.builds = 0
+        self.build_time_ms = 0.0
+
+    def _build(self, articles: List[dict], version):
+        """Матрица термин × статья с готовыми весами BM25 (idf и нормализация длины учтены заранее)"""
+        started = time.perf_counter()
+        vocabulary: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        lengths = np.zeros(len(articles), dtype=np.float64)
+
+        for col, article in enumerate(articles):
+            text = ' '.join(filter(None, (article['title'], article.get('category'), article.get('full_text'))))
+            lemmas = text_lemmas(text)
+            lengths[col] = len(lemmas)
+            frequencies: Dict[int, int] = {}
+            for lemma in lemmas:
+                term = vocabulary.setdefault(lemma, len(vocabulary))
+                frequencies[term] = frequencies.get(term, 0) + 1
+            rows.extend(frequencies.keys())
+            cols.extend([col] * len(frequencies))
+            counts.extend(frequencies.values())
+
+        tf = sparse.csr_matrix(
+            (np.array(counts, dtype=np.float64), (rows, cols)),
+            shape=(len(vocabulary), len(articles))
+        )
+        document_frequency = np.diff(tf.indptr)
+        idf = np.log((len(articles) - document_frequency + 0.5) / (document_frequency + 0.5) + 1.0)
+
+        # Вес BM25 каждой пары (термин, статья): idf · tf·(k1+1) / (tf + k1·(1 − b + b·len/avg_len))
+        avg_length = lengths.mean() if len(articles) else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / (avg_length or 1.0))
+        coo = tf.tocoo()
+        data = idf[coo.row] * coo.data * (BM25_K1 + 1) / (coo.data + norm[coo.col])
+
+        self.term_weights = sparse.csr_matrix((data, (coo.row, coo.col)), shape=tf.shape)
+        self.vocabulary = vocabulary
+        self.numbers = [article['article_number'] for article in articles]
+        self.version = version
+        self.builds += 1
+        self.build_time_ms = round((time.perf_counter() - started) * 1000, 2)
+        print(f"Article ranker built: articles={len(articles)}, terms={len(vocabulary)}, build_time_ms={self.build_time_ms}")
+
+    def ensure_fresh(self, conn):
+        """Перестройка матрицы при смене версии законодательства"""
+        articles = LEGISLATION_CACHE.list_articles(conn, 'uk_rf')
+        if self.version != LEGISLATION_CACHE.version or self.term_weights is None:
+            self._build(articles, LEGISLATION_CACHE.version)
+
+    def _query_matrix(self, texts: Sequence[str]):
+        """Матрица описание × термин: 1, если лемма термина встречается в описании"""
+        indptr, indices = [0], []
+        for text in texts:
+            terms = {self.vocabulary[lemma] for lemma in text_lemmas(text) if lemma in self.vocabulary}
+            indices.extend(sorted(terms))
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float64), indices, indptr),
+            shape=(len(texts), len(self.vocabulary))
+        )
+
+    def score_batch(self, conn, texts: Sequence[str], top_k: int = RANKER_TOP_K) -> List[List[Tuple[str, float]]]:
+        """Top-k статей с оценками BM25 не ниже RANKER_MIN_SCORE для каждого описания;
+        вся пачка — одно произведение матриц"""
+        self.ensure_fresh(conn)
+        if not texts or not self.numbers:
+            return [[] for _ in texts]
+
+        scores = (self._query_matrix(texts) @ self.term_weights).toarray()
+        positions = np.arange(len(self.numbers))
+
+        ranked = []
+        for row in scores:
+            candidates = np.flatnonzero((row > 0) & (row >= RANKER_MIN_SCORE))
+            # По убыванию оценки, при равенстве — в естественном порядке номеров
+            candidates = candidates[np.lexsort((positions[candidates], -row[candidates]))][:top_k]
+            ranked.append([(self.numbers[i], float(row[i])) for i in candidates])
+        return ranked
+
+    def score(self, conn, text: str, top_k: int = RANKER_TOP_K) -> List[Tuple[str, float]]:
+        """Top-k статей с оценками BM25 не ниже RANKER_MIN_SCORE для одного описания"""
+        return self.score_batch(conn, [text], top_k)[0]
+
+    def stats(self) -> dict:
+        return {
+            'version': self.version,
+            'articles': len(self.numbers),
+            'terms': len(self.vocabulary),
+            'builds': self.builds,
+            'build_time_ms': self.build_time_ms
+        }
+
+
+# Один экземпляр на процесс: матрица строится при холодном старте и живёт между вызовами
+ARTICLE_RANKER = ArticleRanker()
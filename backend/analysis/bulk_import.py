@@ -0,0 +1,240 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+from typing import Callable, Iterator, List, Tuple
+from analysis_stats import record_analyses
+from legislation_cache import LEGISLATION_CACHE
+from similar_cases import case_text, similarity_rows
+
+# Размер пачки импорта: анализ, запись COPY и фиксация транзакции выполняются попачечно
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+IMPORT_MAX_BATCH_SIZE = 5000
+
+# Сколько ошибок строк возвращается клиенту (остальные только подсчитываются)
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+CASE_COLUMNS = (
+    'id', 'case_number', 'incident_date', 'category', 'description',
+    'evidence', 'analysis_result', 'status', 'officer_id'
+)
+
+
+def iter_records(body: str, data_format: str) -> Iterator[Tuple[int, object]]:
+    """Строки импорта с номерами: NDJSON (объект на строку) или CSV с заголовком"""
+    if data_format == 'csv':
+        for row_number, record in enumerate(csv.DictReader(io.StringIO(body)), start=1):
+            yield row_number, record
+        return
+
+    for row_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, ValueError(f"Некорректный JSON: {e.msg}")
+
+
+def validate_case(record) -> dict:
+    """Проверка и нормализация одного дела; ошибки сообщаются через ValueError"""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError('Строка должна быть объектом')
+
+    case_number = str(record.get('case_number') or '').strip()
+    description = str(record.get('description') or '')
+    incident_date = str(record.get('incident_date') or '').strip()
+
+    if not case_number or not incident_date or not description:
+        raise ValueError('Заполните все обязательные поля')
+    try:
+        incident_date = datetime.strptime(incident_date, '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        raise ValueError(f"Некорректная дата происшествия: {incident_date}")
+    try:
+        officer_id = int(record.get('officer_id') or 1)
+    except (TypeError, ValueError):
+        raise ValueError('Некорректный officer_id')
+
+    return {
+        'case_number': case_number,
+        'incident_date': incident_date,
+        'category': str(record.get('category') or ''),
+        'description': description,
+        'evidence': str(record.get('evidence') or ''),
+        'officer_id': officer_id
+    }
+
+
+def copy_rows(cur, table: str, columns: tuple, rows: List[tuple]):
+    """Запись строк командой COPY (CSV, все значения в кавычках — NULL не используется)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator='\n')
+    writer.writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+class BulkImport:
+    """Импорт архива дел: анализ пачками, запись через COPY, ошибки строк не прерывают пачку"""
+
+    def __init__(self, conn, analyze_batch: Callable, batch_size: int = IMPORT_BATCH_SIZE):
+        self.conn = conn
+        self.analyze_batch = analyze_batch
+        self.batch_size = max(1, min(batch_size, IMPORT_MAX_BATCH_SIZE))
+        self.seen_case_numbers = set()
+        self.imported = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors: List[dict] = []
+
+    def _error(self, row_number: int, case_number, message: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'case_number': case_number, 'error': message})
+
+    def _existing_case_numbers(self, cur, case_numbers: List[str]) -> set:
+        cur.execute("""
+            SELECT case_number
+            FROM crime_analyses
+            WHERE case_number = ANY(%s)
+        """, (case_numbers,))
+        return {row['case_number'] for row in cur.fetchall()}
+
+    def _case_row(self, analysis_id: int, case: dict, analysis_result: dict) -> tuple:
+        return (
+            analysis_id, case['case_number'], case['incident_date'], case['category'],
+            case['description'], case['evidence'], json.dumps(analysis_result, ensure_ascii=False),
+            'completed', case['officer_id']
+        )
+
+    def _article_rows(self, analysis_id: int, analysis_result: dict) -> List[tuple]:
+        articles = LEGISLATION_CACHE.get_articles(self.conn, 'uk_rf', analysis_result['suggested_articles'])
+        scores = analysis_result['article_scores']
+        return [(analysis_id, 'uk_rf', art['id'], scores.get(art['article_number'], 0)) for art in articles]
+
+    def _similarity_rows(self, ids: List[int], cases: List[dict]) -> Tuple[List[tuple], List[tuple]]:
+        signatures, buckets = similarity_rows(
+            (analysis_id, case_text(case['description'], case['evidence'])) for analysis_id, case in zip(ids, cases)
+        )
+        # bytea в CSV для COPY передаётся в шестнадцатеричном виде
+        return [
+            (analysis_id, '\\x' + signature.hex(), '\\x' + hashes.hex())
+            for analysis_id, signature, hashes in signatures
+        ], buckets
+
+    def _copy_similarity(self, cur, ids: List[int], cases: List[dict]):
+        """Сигнатуры MinHash и корзины LSH для поиска похожих дел"""
+        signatures, buckets = self._similarity_rows(ids, cases)
+        if signatures:
+            copy_rows(cur, 'case_minhash', ('analysis_id', 'signature', 'shingles'), signatures)
+            copy_rows(cur, 'case_lsh_buckets', ('bucket', 'analysis_id'), buckets)
+
+    def _write_individually(self, cur, batch: List[tuple], ids: List[int], results: List[dict]) -> int:
+        """Запасной путь после сбоя COPY: построчная запись, чтобы найти и пропустить плохие строки"""
+        written = 0
+        for (row_number, case), analysis_id, analysis_result in zip(batch, ids, results):
+            cur.execute("SAVEPOINT import_row")
+            try:
+                copy_rows(cur, 'crime_analyses', CASE_COLUMNS, [self._case_row(analysis_id, case, analysis_result)])
+                article_rows = self._article_rows(analysis_id, analysis_result)
+                if article_rows:
+                    copy_rows(cur, 'analysis_articles', ('analysis_id', 'article_type', 'article_id', 'relevance_score'), article_rows)
+                self._copy_similarity(cur, [analysis_id], [case])
+                record_analyses(self.conn, cur, [{**case, 'analysis_result': analysis_result}])
+                cur.execute("RELEASE SAVEPOINT import_row")
+                written += 1
+            except Exception as row_error:
+                cur.execute("ROLLBACK TO SAVEPOINT import_row")
+                self._error(row_number, case['case_number'], str(row_error).strip())
+        return written
+
+    def _flush(self, batch: List[tuple]):
+        """Анализ и запись одной пачки в одной транзакции"""
+        if not batch:
+            return
+        cur = self.conn.cursor()
+
+        existing = self._existing_case_numbers(cur, [case['case_number'] for _, case in batch])
+        accepted = []
+        for row_number, case in batch:
+            if case['case_number'] in existing:
+                self._error(row_number, case['case_number'], 'Дело с таким номером уже существует')
+            else:
+                accepted.append((row_number, case))
+
+        if accepted:
+            results = self.analyze_batch(self.conn, [case for _, case in accepted])
+
+            # Идентификаторы выделяются заранее: COPY не возвращает RETURNING
+            cur.execute("""
+                SELECT nextval(pg_get_serial_sequence('crime_analyses', 'id')) AS id
+                FROM generate_series(1, %s)
+            """, (len(accepted),))
+            ids = [row['id'] for row in cur.fetchall()]
+
+            cur.execute("SAVEPOINT import_batch")
+            try:
+                copy_rows(cur, 'crime_analyses', CASE_COLUMNS, [
+                    self._case_row(analysis_id, case, analysis_result)
+                    for (_, case), analysis_id, analysis_result in zip(accepted, ids, results)
+                ])
+                copy_rows(cur, 'analysis_articles', ('analysis_id', 'article_type', 'article_id', 'relevance_score'), [
+                    row
+                    for analysis_id, analysis_result in zip(ids, results)
+                    for row in self._article_rows(analysis_id, analysis_result)
+                ])
+                self._copy_similarity(cur, ids, [case for _, case in accepted])
+                record_analyses(self.conn, cur, [
+                    {**case, 'analysis_result': analysis_result}
+                    for (_, case), analysis_result in zip(accepted, results)
+                ])
+                cur.execute("RELEASE SAVEPOINT import_batch")
+                self.imported += len(accepted)
+            except Exception:
+                cur.execute("ROLLBACK TO SAVEPOINT import_batch")
+                self.imported += self._write_individually(cur, accepted, ids, results)
+
+        self.conn.commit()
+        cur.close()
+        self.batches += 1
+
+    def run(self, records: Iterator[Tuple[int, object]]) -> dict:
+        """Импорт всех строк; возвращает счётчики, ошибки строк и пропускную способность"""
+        started = time.perf_counter()
+        batch = []
+
+        for row_number, record in records:
+            try:
+                case = validate_case(record)
+            except ValueError as row_error:
+                case_number = record.get('case_number') if isinstance(record, dict) else None
+                self._error(row_number, case_number, str(row_error))
+                continue
+
+            if case['case_number'] in self.seen_case_numbers:
+                self._error(row_number, case['case_number'], 'Номер дела повторяется в импорте')
+                continue
+            self.seen_case_numbers.add(case['case_number'])
+
+            batch.append((row_number, case))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+
+        self._flush(batch)
+
+        elapsed = time.perf_counter() - started
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'batches': self.batches,
+            'batch_size': self.batch_size,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'cases_per_second': round(self.imported / elapsed, 1) if elapsed > 0 else 0.0,
+            'errors': self.errors
+        }
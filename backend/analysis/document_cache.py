@@ -0,0 +1,119 @@
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from parse_document import FILE_TYPES, DocumentSource, extract_text
+from tracing import stage
+
+# Ограничения LRU-кэша в памяти: число документов и суммарный объём текста
+CACHE_MAX_ENTRIES = int(os.environ.get('DOCUMENT_CACHE_MAX_ENTRIES', '256'))
+CACHE_MAX_BYTES = int(os.environ.get('DOCUMENT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+
+class DocumentTextCache:
+    """Извлечённый текст по SHA-256 содержимого: LRU в памяти перед таблицей document_text_cache.
+    Вместе с текстом хранится признак обрезки по бюджету извлечения"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+
+    def _remember(self, key: Tuple[str, str], text: str, truncated: bool):
+        """Запись в LRU с вытеснением самых давних документов"""
+        size = len(text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size_bytes -= len(self._entries.pop(key)[0])
+            self._entries[key] = (text, truncated)
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+
+    def get(self, conn, content_hash: str, file_type: str) -> Optional[Tuple[str, bool]]:
+        """Текст и признак обрезки из памяти, иначе из таблицы (с подъёмом в память), иначе None"""
+        key = (content_hash, file_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT extracted_text, truncated
+            FROM document_text_cache
+            WHERE content_hash = %s AND file_type = %s
+        """, key)
+        row = cur.fetchone()
+        cur.close()
+
+        if row is None:
+            return None
+        self._remember(key, row['extracted_text'], row['truncated'])
+        return row['extracted_text'], row['truncated']
+
+    def put(self, conn, content_hash: str, file_type: str, text: str, truncated: bool = False):
+        """Сохранение текста в память и в таблицу (фиксируется вместе с транзакцией вызывающего)"""
+        self._remember((content_hash, file_type), text, truncated)
+
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO document_text_cache (content_hash, file_type, extracted_text, text_length, truncated)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (content_hash, file_type) DO NOTHING
+        """, (content_hash, file_type, text, len(text), truncated))
+        cur.close()
+
+
+DOCUMENT_CACHE = DocumentTextCache()
+
+
+def extract_text_cached(conn, source: DocumentSource, file_name: str, content_hash: str, file_size: int) -> dict:
+    """Текст документа по хешу содержимого; извлечение выполняется только при промахе кэша"""
+    file_ext = file_name.lower().split('.')[-1]
+    file_type = FILE_TYPES.get(file_ext)
+    started = time.perf_counter()
+
+    with stage('document_cache'):
+        cached = DOCUMENT_CACHE.get(conn, content_hash, file_type) if file_type else None
+    cache_hit = cached is not None
+
+    if cache_hit:
+        text, truncated = cached
+    else:
+        try:
+            text, file_type, truncated = extract_text(source, file_name)
+        except Exception as e:
+            raise Exception(f"Ошибка парсинга документа: {str(e)}")
+        DOCUMENT_CACHE.put(conn, content_hash, file_type, text, truncated)
+
+    return {
+        'text': text,
+        'truncated': truncated,
+        'file_type': file_type,
+        'file_size': file_size,
+        'content_hash': content_hash,
+        'cache_hit': cache_hit,
+        'extraction_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def parse_document_cached(conn, base64_data: str, file_name: str) -> dict:
+    """Парсинг документа с кэшем по хешу содержимого: повторная загрузка не извлекается заново"""
+    with stage('decode'):
+        try:
+            file_data = base64.b64decode(base64_data)
+        except Exception as e:
+            raise Exception(f"Ошибка парсинга документа: {str(e)}")
+
+        content_hash = hashlib.sha256(file_data).hexdigest()
+    return extract_text_cached(conn, file_data, file_name, content_hash, len(file_data))
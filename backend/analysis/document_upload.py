@@ -0,0 +1,202 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from typing import Optional
+from parse_document import FILE_TYPES
+from document_cache import DOCUMENT_CACHE, extract_text_cached
+
+# Ограничения поэтапной загрузки: размер одной части, размер файла и срок жизни незавершённой загрузки
+UPLOAD_CHUNK_MAX_BYTES = int(os.environ.get('UPLOAD_CHUNK_MAX_BYTES', str(4 * 1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', str(100 * 1024 * 1024)))
+UPLOAD_TTL_HOURS = int(os.environ.get('UPLOAD_TTL_HOURS', '24'))
+
+# Сколько частей забирается из базы за одно обращение при сборке файла
+ASSEMBLE_FETCH_CHUNKS = 4
+
+
+class UploadError(Exception):
+    """Ошибка протокола загрузки с HTTP-статусом ответа"""
+
+    def __init__(self, message: str, status_code: int = 400, **details):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+
+def _get_upload(cur, upload_id: str, lock: bool = False) -> dict:
+    """Сессия загрузки по идентификатору (с блокировкой строки для сборки)"""
+    try:
+        uuid.UUID(upload_id)
+    except (TypeError, ValueError):
+        raise UploadError('Некорректный идентификатор загрузки')
+
+    cur.execute(f"""
+        SELECT id, file_name, file_type, file_size, received_bytes, status, content_hash
+        FROM document_uploads
+        WHERE id = %s
+        {'FOR UPDATE' if lock else ''}
+    """, (upload_id,))
+    upload = cur.fetchone()
+    if upload is None:
+        raise UploadError('Загрузка не найдена', 404)
+    return upload
+
+
+def init_upload(conn, file_name: str, file_size: int, uploaded_by: Optional[int] = None) -> dict:
+    """Начало загрузки: проверка формата и размера, создание сессии"""
+    file_ext = file_name.lower().split('.')[-1]
+    file_type = FILE_TYPES.get(file_ext)
+    if file_type is None:
+        raise UploadError(f"Неподдерживаемый формат файла: {file_ext}")
+    if file_size <= 0 or file_size > UPLOAD_MAX_BYTES:
+        raise UploadError(f"Размер файла должен быть от 1 до {UPLOAD_MAX_BYTES} байт")
+
+    cur = conn.cursor()
+    # Брошенные загрузки удаляются вместе с частями (каскадно)
+    cur.execute("""
+        DELETE FROM document_uploads
+        WHERE status = 'open' AND created_at < NOW() - make_interval(hours => %s)
+    """, (UPLOAD_TTL_HOURS,))
+
+    upload_id = str(uuid.uuid4())
+    cur.execute("""
+        INSERT INTO document_uploads (id, file_name, file_type, file_size, uploaded_by)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (upload_id, file_name, file_type, file_size, uploaded_by))
+    cur.close()
+
+    return {
+        'upload_id': upload_id,
+        'file_type': file_type,
+        'file_size': file_size,
+        'received_bytes': 0,
+        'chunk_size': UPLOAD_CHUNK_MAX_BYTES
+    }
+
+
+def append_chunk(conn, upload_id: str, offset: int, chunk: bytes) -> dict:
+    """Приём части файла по смещению; повторная отправка уже принятой части (те же смещение и байты) безопасна"""
+    if not chunk:
+        raise UploadError('Пустая часть файла')
+    if len(chunk) > UPLOAD_CHUNK_MAX_BYTES:
+        raise UploadError(f"Часть файла больше {UPLOAD_CHUNK_MAX_BYTES} байт", 413)
+
+    cur = conn.cursor()
+    upload = _get_upload(cur, upload_id)
+    if upload['status'] != 'open':
+        raise UploadError('Загрузка уже завершена', 409)
+    if offset + len(chunk) > upload['file_size']:
+        raise UploadError('Часть выходит за объявленный размер файла')
+
+    # Части принимаются строго по порядку: счётчик сдвигается, только если смещение совпало
+    cur.execute("""
+        UPDATE document_uploads
+        SET received_bytes = received_bytes + %s, updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND status = 'open' AND received_bytes = %s
+        RETURNING received_bytes
+    """, (len(chunk), upload_id, offset))
+    updated = cur.fetchone()
+
+    if updated is None:
+        cur.execute("SELECT received_bytes FROM document_uploads WHERE id = %s", (upload_id,))
+        received = cur.fetchone()['received_bytes']
+        if offset + len(chunk) <= received:
+            # Повтор после обрыва соединения: дубликат, только если по этому смещению сохранены те же байты
+            cur.execute("""
+                SELECT length(data) = %s AND sha256(data) = %s AS same
+                FROM document_upload_chunks
+                WHERE upload_id = %s AND chunk_offset = %s
+            """, (len(chunk), hashlib.sha256(chunk).digest(), upload_id, offset))
+            stored = cur.fetchone()
+            if stored is not None and stored['same']:
+                cur.close()
+                return {'upload_id': upload_id, 'received_bytes': received, 'duplicate': True}
+        cur.close()
+        raise UploadError('Неверное смещение части файла', 409, expected_offset=received)
+
+    cur.execute("""
+        INSERT INTO document_upload_chunks (upload_id, chunk_offset, data)
+        VALUES (%s, %s, %s)
+    """, (upload_id, offset, chunk))
+    cur.close()
+
+    return {'upload_id': upload_id, 'received_bytes': updated['received_bytes'], 'duplicate': False}
+
+
+def finalize_upload(conn, upload_id: str) -> dict:
+    """Сборка частей во временный файл с потоковым хешированием и извлечение текста из файла"""
+    cur = conn.cursor()
+    upload = _get_upload(cur, upload_id, lock=True)
+    if upload['status'] == 'completed':
+        cur.close()
+        raise UploadError('Загрузка уже завершена', 409)
+    if upload['received_bytes'] != upload['file_size']:
+        cur.close()
+        raise UploadError(
+            'Файл загружен не полностью', 409,
+            received_bytes=upload['received_bytes'], file_size=upload['file_size']
+        )
+
+    sha256 = hashlib.sha256()
+    assembled = tempfile.NamedTemporaryFile(suffix=f".{upload['file_type'].lower()}", delete=False)
+    # Временный файл удаляется при любой ошибке: записи на диск, чтения частей из базы или разбора
+    try:
+        with assembled:
+            # Серверный курсор: в памяти одновременно не больше ASSEMBLE_FETCH_CHUNKS частей
+            chunks = conn.cursor(name=f"upload_{uuid.UUID(upload_id).hex}")
+            chunks.itersize = ASSEMBLE_FETCH_CHUNKS
+            chunks.execute("""
+                SELECT data
+                FROM document_upload_chunks
+                WHERE upload_id = %s
+                ORDER BY chunk_offset
+            """, (upload_id,))
+            for row in chunks:
+                sha256.update(row['data'])
+                assembled.write(row['data'])
+            chunks.close()
+
+        try:
+            parsed = extract_text_cached(
+                conn, assembled.name, upload['file_name'], sha256.hexdigest(), upload['file_size']
+            )
+        except Exception as parse_error:
+            raise UploadError(str(parse_error))
+    finally:
+        os.unlink(assembled.name)
+
+    cur.execute("""
+        UPDATE document_uploads
+        SET status = 'completed', content_hash = %s, file_type = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+    """, (parsed['content_hash'], parsed['file_type'], upload_id))
+    cur.execute("DELETE FROM document_upload_chunks WHERE upload_id = %s", (upload_id,))
+    cur.close()
+
+    parsed['upload_id'] = upload_id
+    parsed['file_name'] = upload['file_name']
+    return parsed
+
+
+def get_uploaded_document(conn, upload_id: str) -> dict:
+    """Завершённая загрузка для привязки к анализу: текст берётся из кэша по хешу"""
+    cur = conn.cursor()
+    upload = _get_upload(cur, upload_id)
+    cur.close()
+    if upload['status'] != 'completed':
+        raise UploadError('Загрузка не завершена', 409)
+
+    cached = DOCUMENT_CACHE.get(conn, upload['content_hash'], upload['file_type'])
+    if cached is None:
+        raise UploadError('Текст документа не найден', 404)
+
+    # Признак обрезки клиент уже получил в ответе на finalize
+    text, _ = cached
+    return {
+        'text': text,
+        'file_name': upload['file_name'],
+        'file_type': upload['file_type'],
+        'file_size': upload['file_size'],
+        'content_hash': upload['content_hash']
+    }
@@ -1,259 +1,142 @@
+import base64
 import json
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import time
+from psycopg2.extras import execute_values
 from datetime import datetime
-from parse_document import parse_document
+from db import db_connection
+from bulk_import import IMPORT_BATCH_SIZE, IMPORT_MAX_BATCH_SIZE, BulkImport, iter_records
+from document_cache import parse_document_cached
+from document_upload import UploadError, append_chunk, finalize_upload, get_uploaded_document, init_upload
+from keyword_map import KEYWORD_MAP
+from article_ranker import ARTICLE_RANKER, bm25_relevance
+from legislation_cache import LEGISLATION_CACHE
+from analyses_list import list_analyses
+from analysis_stats import ROLLUP_FOLD_BATCH, fold_rollup_deltas, get_statistics, recompute_statistics, record_analyses
+from session_auth import AuthError, authenticate, require_session
+from tracing import log_error, stage, traced
+from serialization import dumps, load
+from similar_cases import SIMILAR_BACKFILL_BATCH, backfill_index, index_case, similar_cases
+from analysis_jobs import (
+    WORKER_TIME_BUDGET, claim_jobs, complete_job, enqueue_job, fail_job,
+    get_job_status, release_jobs, requeue_stale_jobs, should_enqueue
+)
 
-def get_db_connection():
-    """Подключение к базе данных PostgreSQL"""
-    return psycopg2.connect(
-        os.environ['DATABASE_URL'],
-        cursor_factory=RealDictCursor
-    )
+# Доля релевантности, которую даёт совпадение с ключевым словом словаря (с учётом веса слова, остальное — BM25)
+KEYWORD_MATCH_WEIGHT = 0.5
 
-def analyze_crime(description: str, category: str, evidence: str, conn) -> dict:
-    """Улучшенный анализ преступления с использованием полнотекстового поиска по базе"""
+# Служебные действия — только администратору, импорт архива — любому сотруднику с сессией (даже без REQUIRE_AUTH)
+ADMIN_ACTIONS = {('POST', 'process_jobs'), ('POST', 'stats_recompute'), ('POST', 'index_similar')}
+SESSION_ACTIONS = {('POST', 'import')}
+
+def fetch_articles(conn, article_numbers: list) -> list:
+    """Статьи УК РФ по списку номеров в порядке списка (из кэша законодательства)"""
+    return LEGISLATION_CACHE.get_articles(conn, 'uk_rf', article_numbers)
+
+def save_analysis_articles(cur, analysis_id: int, articles: list, scores: dict):
+    """Пакетная привязка статей к анализу одним INSERT с оценками релевантности ранжирования"""
+    if not articles:
+        return
     
-    # Расширенный словарь ключевых слов с синонимами и связанными терминами
-    keywords_map = {
-        # Преступления против собственности
-        'кража': ['158', '158.1'],
-        'украл': ['158'],
-        'украли': ['158'],
-        'похитил': ['158', '161', '126'],
-        'похищение': ['158', '126'],
-        'воровство': ['158'],
-        'тайное хищение': ['158'],
-        'грабеж': ['161'],
-        'грабёж': ['161'],
-        'открытое хищение': ['161'],
-        'отобрал': ['161'],
-        'разбой': ['162'],
-        'нападение': ['162', '213'],
-        'оружие': ['162', '222', '223', '226'],
-        'пистолет': ['222', '162'],
-        'нож': ['162', '222'],
-        'автомат': ['222'],
-        'взрывчатка': ['222.1', '223.1'],
-        'мошенничество': ['159', '159.1', '159.2', '159.3', '159.4', '159.5', '159.6'],
-        'обман': ['159', '165'],
-        'обманул': ['159'],
-        'развод': ['159'],
-        'фальшивый': ['186', '187'],
-        'поддельный': ['186', '187', '327'],
-        'подделка': ['186', '327'],
-        'вымогательство': ['163'],
-        'вымогал': ['163'],
-        'требовал деньги': ['163'],
-        'присвоение': ['160'],
-        'растрата': ['160'],
-        'угон': ['166'],
-        'угнал машину': ['166'],
-        'поджог': ['167', '205'],
-        'уничтожение имущества': ['167'],
-        'повреждение имущества': ['167', '168'],
-        
-        # Преступления против жизни и здоровья
-        'убийство': ['105'],
-        'убил': ['105'],
-        'лишил жизни': ['105'],
-        'умышленное убийство': ['105'],
-        'двух человек': ['105.1'],
-        'нескольких человек': ['105.1'],
-        'младенец': ['106'],
-        'новорожденный': ['106'],
-        'аффект': ['107', '113'],
-        'необходимая оборона': ['108', '114'],
-        'самооборона': ['108'],
-        'по неосторожности': ['109', '118'],
-        'неосторожно': ['109', '118', '168'],
-        'суицид': ['110'],
-        'самоубийство': ['110'],
-        'доведение до самоубийства': ['110'],
-        'избил': ['111', '112', '115', '116'],
-        'избиение': ['111', '112', '116'],
-        'побои': ['116'],
-        'удар': ['115', '116'],
-        'тяжкий вред': ['111'],
-        'средний вред': ['112'],
-        'легкий вред': ['115'],
-        'истязание': ['117'],
-        'пытки': ['117'],
-        'угроза убийством': ['119'],
-        'угрожал убить': ['119'],
-        'вич': ['122'],
-        'спид': ['122'],
-        'заражение': ['121', '122'],
-        'венерическая болезнь': ['121'],
-        
-        # Половые преступления
-        'изнасилование': ['131'],
-        'изнасиловал': ['131'],
-        'насилие сексуальное': ['132'],
-        'несовершеннолетний': ['134', '135', '150', '151'],
-        'ребенок': ['134', '135', '150'],
-        'развратные действия': ['135'],
-        
-        # Преступления против свободы
-        'похищение человека': ['126'],
-        'захват заложника': ['206'],
-        'заложник': ['206'],
-        'лишение свободы': ['127'],
-        'незаконное лишение свободы': ['127'],
-        'торговля людьми': ['127.1'],
-        'рабский труд': ['127.2'],
-        'клевета': ['128.1'],
-        
-        # Наркотические преступления
-        'наркотик': ['228', '228.1', '228.2', '228.3', '228.4', '229', '230', '231', '232'],
-        'наркотики': ['228', '228.1', '229'],
-        'героин': ['228', '228.1'],
-        'кокаин': ['228', '228.1'],
-        'марихуана': ['228', '231'],
-        'гашиш': ['228', '231'],
-        'амфетамин': ['228', '228.1'],
-        'наркотическое средство': ['228', '228.1'],
-        'психотропное вещество': ['228', '228.1'],
-        'сбыт наркотиков': ['228.1'],
-        'распространение наркотиков': ['228.1'],
-        'склонение к употреблению': ['230'],
-        'притон': ['232'],
-        'выращивание наркотических растений': ['231'],
-        
-        # Транспортные преступления
-        'дтп': ['264', '265'],
-        'авария': ['264'],
-        'дорожно-транспортное': ['264'],
-        'сбил пешехода': ['264'],
-        'наехал': ['264'],
-        'скрылся с места': ['265'],
-        'оставил место дтп': ['265'],
-        'пьяный за рулем': ['264.1'],
-        'алкоголь за рулем': ['264'],
-        'нарушение пдд': ['264'],
-        
-        # Экономические преступления
-        'коррупция': ['290', '291'],
-        'взятка': ['290', '291', '291.1', '291.2'],
-        'подкуп': ['290', '291', '204'],
-        'дал взятку': ['291'],
-        'получил взятку': ['290'],
-        'откат': ['290', '291'],
-        'отмывание': ['174', '174.1'],
-        'легализация': ['174', '174.1'],
-        'уклонение от налогов': ['198', '199'],
-        'налоги не платил': ['198', '199'],
-        'незаконное предпринимательство': ['171'],
-        'банкротство': ['195', '196', '197'],
-        'фиктивное банкротство': ['197'],
-        'преднамеренное банкротство': ['196'],
-        
-        # Компьютерные преступления
-        'взлом': ['272', '273', '274.1'],
-        'хакер': ['272', '273'],
-        'компьютер': ['272', '273', '274'],
-        'вирус': ['273'],
-        'компьютерная программа': ['273'],
-        'неправомерный доступ': ['272'],
-        'вредоносная программа': ['273'],
-        'база данных': ['272'],
-        'критическая инфраструктура': ['274.1'],
-        
-        # Террористические и экстремистские преступления
-        'терроризм': ['205', '205.1', '205.2', '205.3', '205.4', '205.5'],
-        'террористический акт': ['205'],
-        'теракт': ['205'],
-        'взрыв': ['205', '207', '222.1'],
-        'ложное сообщение': ['207'],
-        'заминирование': ['207'],
-        'экстремизм': ['280', '282', '282.1', '282.2'],
-        'разжигание ненависти': ['282'],
-        'национальная рознь': ['282'],
-        'религиозная рознь': ['282'],
+    execute_values(cur, """
+        INSERT INTO analysis_articles (analysis_id, article_type, article_id, relevance_score)
+        VALUES %s
+    """, [
+        (analysis_id, 'uk_rf', art['id'], scores.get(art['article_number'], 0))
+        for art in articles
+    ], page_size=len(articles))
+
+def attach_document(conn, cur, analysis_id: int, document: dict, officer_id: int):
+    """Сохранение вложения анализа; возвращает сведения о разборе файла на сервере (если был)"""
+    document_parse = None
+    # Точка сохранения: ошибка вложения не должна прерывать транзакцию анализа
+    cur.execute("SAVEPOINT document_attachment")
+    try:
+        file_type = document.get('file_type', 'TXT')
+        file_size = document.get('file_size', 0)
+        extracted_text = document.get('extracted_text', '')
+        content_hash = None
         
-        # Преступления против государственной власти
-        'служебный подлог': ['292'],
-        'подлог': ['292', '327'],
-        'халатность': ['293'],
-        'превышение полномочий': ['286'],
-        'злоупотребление полномочиями': ['285'],
-        'фальсификация доказательств': ['303'],
-        'незаконное задержание': ['301'],
-        'пытки следователем': ['302'],
-        'ложный донос': ['306'],
-        'лжесвидетельство': ['307'],
-        'государственная измена': ['275'],
-        'шпионаж': ['276'],
+        if document.get('upload_id'):
+            # Документ загружен по частям: текст уже извлечён при сборке
+            uploaded = get_uploaded_document(conn, document['upload_id'])
+            file_type, file_size = uploaded['file_type'], uploaded['file_size']
+            extracted_text, content_hash = uploaded['text'], uploaded['content_hash']
+            document['file_name'] = uploaded['file_name']
+        elif document.get('file_data'):
+            # Текст берётся из кэша по хешу содержимого, повторно файл не разбирается
+            try:
+                parsed = parse_document_cached(conn, document['file_data'], document.get('file_name', 'document'))
+                file_type, file_size = parsed['file_type'], parsed['file_size']
+                extracted_text, content_hash = parsed['text'], parsed['content_hash']
+                document_parse = {
+                    'content_hash': content_hash,
+                    'cache_hit': parsed['cache_hit'],
+                    'extraction_ms': parsed['extraction_ms'],
+                    'truncated': parsed['truncated']
+                }
+            except Exception as parse_error:
+                # Файл не разобран на сервере — сохраняем текст, извлечённый клиентом
+                print(f"Warning: Failed to parse document attachment: {str(parse_error)}")
         
-        # Хулиганство и общественный порядок
-        'хулиганство': ['213'],
-        'дебош': ['213'],
-        'нарушение порядка': ['213'],
-        'вандализм': ['214'],
-        'массовые беспорядки': ['212'],
-        'бандитизм': ['209'],
-        'банда': ['209', '210'],
-        'преступная группа': ['210'],
-        'организованная группа': ['210'],
-    }
-    
-    description_lower = description.lower()
-    evidence_lower = evidence.lower()
-    combined_text = f"{description_lower} {evidence_lower} {category.lower()}"
-    
-    # Этап 1: Поиск по ключевым словам
-    keyword_articles = set()
-    matched_keywords = []
-    
-    for keyword, articles in keywords_map.items():
-        if keyword in combined_text:
-            keyword_articles.update(articles)
-            matched_keywords.append(keyword)
-    
-    # Этап 2: Полнотекстовый поиск в базе данных
-    cur = conn.cursor()
-    search_terms = ' '.join(matched_keywords[:5]) if matched_keywords else description_lower[:100]
+        cur.execute("""
+            INSERT INTO document_attachments (
+                analysis_id, file_name, file_type, file_size, 
+                extracted_text, content_hash, uploaded_by
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING id
+        """, (
+            analysis_id,
+            document.get('file_name', 'document'),
+            file_type,
+            file_size,
+            extracted_text,
+            content_hash,
+            officer_id
+        ))
+        cur.execute("RELEASE SAVEPOINT document_attachment")
+    except Exception as doc_error:
+        cur.execute("ROLLBACK TO SAVEPOINT document_attachment")
+        print(f"Warning: Failed to save document attachment: {str(doc_error)}")
     
-    # Поиск по УК РФ
-    cur.execute("""
-        SELECT article_number, title, category, severity
-        FROM uk_rf_articles
-        WHERE 
-            title ILIKE %s 
-            OR category ILIKE %s
-        ORDER BY 
-            CASE 
-                WHEN title ILIKE %s THEN 1
-                WHEN category ILIKE %s THEN 2
-                ELSE 3
-            END
-        LIMIT 10
-    """, (f'%{search_terms}%', f'%{category}%', f'%{search_terms}%', f'%{category}%'))
+    return document_parse
+
+def prepare_analysis(conn, description: str, category: str, evidence: str) -> tuple:
+    """Этап 1 анализа: ключевые слова и статьи по словарю (с весами) из keyword_article_map"""
+    combined_text = f"{description.lower()} {evidence.lower()} {category.lower()}"
     
-    db_articles = cur.fetchall()
-    db_article_numbers = [art['article_number'] for art in db_articles]
+    # Поиск по ключевым словам (один проход по тексту с учётом границ слов)
+    matched_keywords, keyword_articles = KEYWORD_MAP.get_matcher(conn).match(combined_text)
+    return matched_keywords, keyword_articles, combined_text
+
+def build_analysis_result(conn, matched_keywords: list, keyword_articles: dict, ranked: list) -> dict:
+    """Объединение статей словаря и ранжирования BM25 в результат анализа с оценками релевантности"""
+    # Релевантность 0..1: половина — вес совпавшего ключевого слова, половина — абсолютная оценка BM25
+    # с насыщением (лучшая из найденных статей не получает 1.0 только потому, что она лучшая)
+    bm25 = {number: bm25_relevance(score) for number, score in ranked}
+    scores = {
+        number: KEYWORD_MATCH_WEIGHT * keyword_articles.get(number, 0.0) + (1 - KEYWORD_MATCH_WEIGHT) * bm25.get(number, 0.0)
+        for number in set(keyword_articles) | set(bm25)
+    }
     
-    # Объединение результатов
-    all_articles = list(keyword_articles) + db_article_numbers
-    suggested_articles = list(dict.fromkeys(all_articles))[:15]  # Убираем дубликаты, берем топ-15
+    # По убыванию релевантности; при равенстве — сначала словарные статьи, затем по номеру
+    natural_order = LEGISLATION_CACHE.sort_numbers(conn, 'uk_rf', scores)
+    position = {number: i for i, number in enumerate(natural_order)}
+    suggested_articles = sorted(
+        scores, key=lambda number: (-scores[number], number not in keyword_articles, position[number])
+    )[:15]  # Берем топ-15
+    article_scores = {number: round(scores[number], 4) for number in suggested_articles}
     
-    # Получаем детали статей
+    # Получаем детали статей из кэша, сохраняя порядок ранжирования
     article_details = []
-    for art_num in suggested_articles[:10]:  # Берем топ-10 для детализации
-        cur.execute("""
-            SELECT article_number, title, category, severity
-            FROM uk_rf_articles
-            WHERE article_number = %s
-        """, (art_num,))
-        art = cur.fetchone()
-        if art:
-            article_details.append({
-                'number': art['article_number'],
-                'title': art['title'],
-                'category': art['category'],
-                'severity': art['severity']
-            })
+    for art in fetch_articles(conn, suggested_articles[:10]):  # Берем топ-10 для детализации
+        article_details.append({
+            'number': art['article_number'],
+            'title': art['title'],
+            'category': art['category'],
+            'severity': art['severity'],
+            'relevance': article_scores[art['article_number']]
+        })
     
     # Определение уровня уверенности
     confidence = 'high' if len(matched_keywords) >= 2 else 'medium' if len(matched_keywords) == 1 else 'low'
@@ -261,12 +144,269 @@ def analyze_crime(description: str, category: str, evidence: str, conn) -> dict:
     return {
         'suggested_articles': suggested_articles,
         'article_details': article_details,
+        'article_scores': article_scores,
         'matched_keywords': matched_keywords,
         'analysis_date': datetime.now().isoformat(),
         'confidence': confidence,
         'total_found': len(suggested_articles)
     }
 
+def analyze_crime(description: str, category: str, evidence: str, conn) -> dict:
+    """Анализ преступления: словарь ключевых слов и ранжирование статей УК РФ по BM25"""
+    with stage('keywords'):
+        matched_keywords, keyword_articles, combined_text = prepare_analysis(conn, description, category, evidence)
+    
+    # Этап 2: оценка описания по всем статьям одним умножением разреженной матрицы
+    with stage('rank'):
+        ranked = ARTICLE_RANKER.score(conn, combined_text)
+    
+    with stage('result'):
+        return build_analysis_result(conn, matched_keywords, keyword_articles, ranked)
+
+def analyze_crimes_batch(conn, cases: list) -> list:
+    """Анализ пачки дел: словарный этап по каждому делу, BM25 — одним произведением матриц на всю пачку"""
+    if not cases:
+        return []
+    
+    with stage('keywords'):
+        prepared = [prepare_analysis(conn, case['description'], case['category'], case['evidence']) for case in cases]
+    with stage('rank'):
+        ranked = ARTICLE_RANKER.score_batch(conn, [combined_text for _, _, combined_text in prepared])
+    
+    with stage('result'):
+        return [
+            build_analysis_result(conn, matched_keywords, keyword_articles, case_ranked)
+            for (matched_keywords, keyword_articles, _), case_ranked in zip(prepared, ranked)
+        ]
+
+def run_analysis_job(conn, job: dict):
+    """Выполнение одного задания очереди: тот же конвейер, что и у синхронного POST"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT description, category, evidence, officer_id, incident_date
+        FROM crime_analyses
+        WHERE id = %s
+    """, (job['analysis_id'],))
+    analysis = cur.fetchone()
+    
+    analysis_result = analyze_crime(
+        analysis['description'] or '', analysis['category'] or '', analysis['evidence'] or '', conn
+    )
+    
+    document = (load(job['payload']) or {}).get('document')
+    if document:
+        attach_document(conn, cur, job['analysis_id'], document, analysis['officer_id'])
+    
+    save_analysis_articles(
+        cur, job['analysis_id'], fetch_articles(conn, analysis_result['suggested_articles']),
+        analysis_result['article_scores']
+    )
+    
+    cur.execute("""
+        UPDATE crime_analyses
+        SET analysis_result = %s, status = 'completed', updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+    """, (json.dumps(analysis_result), job['analysis_id']))
+    record_analyses(conn, cur, [{**analysis, 'analysis_result': analysis_result}])
+    complete_job(cur, job['id'])
+    cur.close()
+
+def process_jobs(time_budget: float = WORKER_TIME_BUDGET) -> dict:
+    """Обработчик очереди: забирает задания пачками, пока очередь не опустеет или не выйдет время,
+    затем переносит накопленные приращения статистики в агрегаты"""
+    started = time.monotonic()
+    stats = {'completed': 0, 'failed': 0, 'retried': 0, 'requeued': 0, 'released': 0, 'rollups_folded': 0}
+    
+    with db_connection() as conn:
+        cur = conn.cursor()
+        stale = requeue_stale_jobs(cur)
+        stats['requeued'] = stale['requeued']
+        stats['failed'] += stale['failed']
+        conn.commit()
+        
+        while time.monotonic() - started < time_budget:
+            jobs = claim_jobs(cur)
+            conn.commit()
+            if not jobs:
+                break
+            
+            for i, job in enumerate(jobs):
+                if time.monotonic() - started >= time_budget:
+                    # Время вызова на исходе: незапущенные задания сразу возвращаются в очередь
+                    stats['released'] = release_jobs(cur, jobs[i:])
+                    conn.commit()
+                    break
+                
+                try:
+                    run_analysis_job(conn, job)
+                    conn.commit()
+                    stats['completed'] += 1
+                except Exception as job_error:
+                    conn.rollback()
+                    status = fail_job(cur, job, str(job_error))
+                    conn.commit()
+                    stats['failed' if status == 'failed' else 'retried'] += 1
+                    print(f"Warning: Analysis job {job['id']} failed: {str(job_error)}")
+        
+        # Приращения синхронных POST, импорта и заданий очереди
+        while time.monotonic() - started < time_budget:
+            folded = fold_rollup_deltas(cur)
+            conn.commit()
+            stats['rollups_folded'] += folded
+            if folded < ROLLUP_FOLD_BATCH:
+                break
+        
+        cur.close()
+    
+    stats['elapsed_ms'] = round((time.monotonic() - started) * 1000, 2)
+    return stats
+
+def upload_params(action: str, event: dict, query_params: dict) -> dict:
+    """Параметры запроса загрузки; нечисловой размер или смещение, битые JSON и base64 — UploadError (400)"""
+    try:
+        if action == 'upload_chunk':
+            # Тело запроса — сама часть файла (бинарные тела шлюз передаёт в base64)
+            return {
+                'upload_id': query_params.get('upload_id', ''),
+                'offset': int(query_params.get('offset', 0)),
+                'chunk': base64.b64decode(event.get('body') or '')
+            }
+        
+        body = json.loads(event.get('body') or '{}')
+        if action == 'upload_init':
+            return {
+                'file_name': body.get('file_name', ''),
+                'file_size': int(body.get('file_size', 0)),
+                'uploaded_by': body.get('uploaded_by')
+            }
+        return {'upload_id': body.get('upload_id', '')}
+    except (ValueError, TypeError, AttributeError) as param_error:
+        raise UploadError(f'Некорректный запрос загрузки: {param_error}')
+
+def handle_upload(action: str, event: dict, query_params: dict) -> dict:
+    """Поэтапная загрузка документа: upload_init → upload_chunk (по смещениям) → upload_finalize"""
+    try:
+        params = upload_params(action, event, query_params)
+        
+        with db_connection() as conn:
+            if action == 'upload_init':
+                data = init_upload(conn, params['file_name'], params['file_size'], params['uploaded_by'])
+                status_code = 201
+            elif action == 'upload_chunk':
+                data = append_chunk(conn, params['upload_id'], params['offset'], params['chunk'])
+                status_code = 200
+            else:
+                data = finalize_upload(conn, params['upload_id'])
+                data['text_length'] = len(data['text'])
+                status_code = 200
+            
+            conn.commit()
+        
+        return {
+            'statusCode': status_code,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'success': True,
+                'data': data
+            }),
+            'isBase64Encoded': False
+        }
+    except UploadError as upload_error:
+        return {
+            'statusCode': upload_error.status_code,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'success': False,
+                'error': str(upload_error),
+                **upload_error.details
+            }),
+            'isBase64Encoded': False
+        }
+
+def handle_similar(method: str, event: dict, query_params: dict) -> dict:
+    """Похожие дела: GET ?action=similar&analysis_id= или POST с описанием ещё не сохранённого дела;
+    POST ?action=index_similar дозаполняет индекс для старых дел"""
+    try:
+        with db_connection() as conn:
+            if query_params.get('action') == 'index_similar':
+                data = backfill_index(conn, int(query_params.get('limit', SIMILAR_BACKFILL_BATCH)))
+            else:
+                body = json.loads(event.get('body') or '{}') if method == 'POST' else None
+                data = similar_cases(conn, query_params, body)
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': dumps({
+                'success': True,
+                'data': data
+            }),
+            'isBase64Encoded': False
+        }
+    except (ValueError, LookupError) as similar_error:
+        return {
+            'statusCode': 404 if isinstance(similar_error, LookupError) else 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'success': False,
+                'error': str(similar_error)
+            }),
+            'isBase64Encoded': False
+        }
+
+def handle_statistics(method: str, query_params: dict) -> dict:
+    """Статистика для панели (GET ?action=stats) и сверка агрегатов с исходными таблицами (POST ?action=stats_recompute)"""
+    try:
+        with db_connection() as conn:
+            if method == 'POST':
+                data = recompute_statistics(conn, repair=query_params.get('repair') in ('1', 'true'))
+            else:
+                # Одна пачка приращений переносится и при чтении: без обработчика очереди таблица не растёт
+                cur = conn.cursor()
+                fold_rollup_deltas(cur)
+                conn.commit()
+                cur.close()
+                data = get_statistics(conn, query_params)
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': dumps({
+                'success': True,
+                'data': data
+            }),
+            'isBase64Encoded': False
+        }
+    except ValueError as param_error:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'success': False,
+                'error': str(param_error)
+            }),
+            'isBase64Encoded': False
+        }
+
+@traced('analysis')
 def handler(event: dict, context) -> dict:
     """API для анализа преступлений и управления делами"""
     method = event.get('httpMethod', 'GET')
@@ -277,16 +417,88 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Authorization'
+                'Access-Control-Allow-Headers': 'Content-Type, X-Authorization, X-Trace'
             },
             'body': '',
             'isBase64Encoded': False
         }
     
     try:
+        # Сессия по X-Authorization: обычно из кэша процесса, без обращения к базе
+        with stage('auth'):
+            session = authenticate(event)
+        
         query_params = event.get('queryStringParameters', {}) or {}
         action = query_params.get('action', '')
         
+        if (method, action) in ADMIN_ACTIONS:
+            require_session(session, 'admin')
+        elif (method, action) in SESSION_ACTIONS:
+            require_session(session)
+        
+        if method == 'POST' and action in ('upload_init', 'upload_chunk', 'upload_finalize'):
+            return handle_upload(action, event, query_params)
+        
+        if (method == 'GET' and action == 'stats') or (method == 'POST' and action == 'stats_recompute'):
+            return handle_statistics(method, query_params)
+        
+        if action == 'similar' or (method == 'POST' and action == 'index_similar'):
+            return handle_similar(method, event, query_params)
+        
+        if method == 'POST' and action == 'process_jobs':
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'success': True,
+                    'data': process_jobs()
+                }),
+                'isBase64Encoded': False
+            }
+        
+        if method == 'POST' and action == 'import':
+            # Импорт архива: NDJSON (по умолчанию) или CSV с заголовком, формат из ?format= или Content-Type
+            body = event.get('body') or ''
+            if event.get('isBase64Encoded'):
+                body = base64.b64decode(body).decode('utf-8')
+            headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+            data_format = query_params.get('format') or ('csv' if 'csv' in headers.get('content-type', '') else 'ndjson')
+            batch_size = query_params.get('batch_size') or str(IMPORT_BATCH_SIZE)
+            if not batch_size.isdecimal() or not 1 <= int(batch_size) <= IMPORT_MAX_BATCH_SIZE:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'success': False,
+                        'error': f"batch_size должен быть целым числом от 1 до {IMPORT_MAX_BATCH_SIZE}"
+                    }),
+                    'isBase64Encoded': False
+                }
+            batch_size = int(batch_size)
+            
+            with db_connection() as conn:
+                stats = BulkImport(conn, analyze_crimes_batch, batch_size).run(iter_records(body, data_format))
+            
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'success': True,
+                    'message': f"Импортировано дел: {stats['imported']}, с ошибками: {stats['failed']}",
+                    'data': stats
+                }),
+                'isBase64Encoded': False
+            }
+        
         if method == 'POST' and action == 'parse':
             body = json.loads(event.get('body', '{}'))
             file_data = body.get('file_data', '')
@@ -307,7 +519,10 @@ def handler(event: dict, context) -> dict:
                 }
             
             try:
-                text, file_type = parse_document(file_data, file_name)
+                with db_connection() as conn:
+                    with stage('parse'):
+                        parsed = parse_document_cached(conn, file_data, file_name)
+                    conn.commit()
                 
                 return {
                     'statusCode': 200,
@@ -317,12 +532,16 @@ def handler(event: dict, context) -> dict:
                     },
                     'body': json.dumps({
                         'success': True,
-                        'message': f'Документ {file_type} обработан успешно',
+                        'message': f"Документ {parsed['file_type']} обработан успешно",
                         'data': {
-                            'text': text,
+                            'text': parsed['text'],
                             'file_name': file_name,
-                            'file_type': file_type,
-                            'text_length': len(text)
+                            'file_type': parsed['file_type'],
+                            'text_length': len(parsed['text']),
+                            'truncated': parsed['truncated'],
+                            'content_hash': parsed['content_hash'],
+                            'cache_hit': parsed['cache_hit'],
+                            'extraction_ms': parsed['extraction_ms']
                         }
                     }),
                     'isBase64Encoded': False
@@ -341,131 +560,110 @@ def handler(event: dict, context) -> dict:
                     'isBase64Encoded': False
                 }
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        if method == 'POST':
-            body = json.loads(event.get('body', '{}'))
-            
-            case_number = body.get('case_number', '')
-            incident_date = body.get('incident_date', '')
-            category = body.get('category', '')
-            description = body.get('description', '')
-            evidence = body.get('evidence', '')
-            officer_id = body.get('officer_id', 1)
-            document = body.get('document', None)
+        with db_connection() as conn:
+            cur = conn.cursor()
             
-            if not case_number or not incident_date or not description:
-                return {
-                    'statusCode': 400,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'success': False,
-                        'error': 'Заполните все обязательные поля'
-                    }),
-                    'isBase64Encoded': False
-                }
-            
-            analysis_result = analyze_crime(description, category, evidence, conn)
-            
-            cur.execute("""
-                INSERT INTO crime_analyses (
-                    case_number, incident_date, category, description, 
-                    evidence, analysis_result, status, officer_id
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id, case_number, status, created_at
-            """, (
-                case_number, incident_date, category, description,
-                evidence, json.dumps(analysis_result), 'completed', officer_id
-            ))
-            
-            new_analysis = cur.fetchone()
-            analysis_id = new_analysis['id']
-            
-            if document:
-                try:
+            if method == 'POST':
+                body = json.loads(event.get('body', '{}'))
+                
+                case_number = body.get('case_number', '')
+                incident_date = body.get('incident_date', '')
+                category = body.get('category', '')
+                description = body.get('description', '')
+                evidence = body.get('evidence', '')
+                officer_id = session['user_id'] if session else body.get('officer_id', 1)
+                document = body.get('document', None)
+                
+                if not case_number or not incident_date or not description:
+                    return {
+                        'statusCode': 400,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({
+                            'success': False,
+                            'error': 'Заполните все обязательные поля'
+                        }),
+                        'isBase64Encoded': False
+                    }
+                
+                if should_enqueue(body):
+                    # Асинхронный режим: анализ выполнит обработчик очереди, клиент опрашивает GET ?analysis_id=
                     cur.execute("""
-                        INSERT INTO document_attachments (
-                            analysis_id, file_name, file_type, file_size, 
-                            extracted_text, uploaded_by
+                        INSERT INTO crime_analyses (
+                            case_number, incident_date, category, description, 
+                            evidence, status, officer_id
                         )
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        RETURNING id
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        RETURNING id, case_number, status, created_at
                     """, (
-                        analysis_id,
-                        document.get('file_name', 'document'),
-                        document.get('file_type', 'TXT'),
-                        document.get('file_size', 0),
-                        document.get('extracted_text', ''),
-                        officer_id
+                        case_number, incident_date, category, description,
+                        evidence, 'pending', officer_id
                     ))
-                except Exception as doc_error:
-                    print(f"Warning: Failed to save document attachment: {str(doc_error)}")
-            
-            for article_num in analysis_result['suggested_articles']:
-                cur.execute("""
-                    SELECT id FROM uk_rf_articles WHERE article_number = %s
-                """, (article_num,))
-                article = cur.fetchone()
+                    
+                    new_analysis = cur.fetchone()
+                    index_case(cur, new_analysis['id'], description, evidence)
+                    new_analysis['job_id'] = enqueue_job(cur, new_analysis['id'], {'document': document})
+                    conn.commit()
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 202,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': dumps({
+                            'success': True,
+                            'message': 'Анализ поставлен в очередь',
+                            'data': new_analysis
+                        }),
+                        'isBase64Encoded': False
+                    }
                 
-                if article:
+                with stage('analyze'):
+                    analysis_result = analyze_crime(description, category, evidence, conn)
+                
+                with stage('insert'):
                     cur.execute("""
-                        INSERT INTO analysis_articles (analysis_id, article_type, article_id, relevance_score)
-                        VALUES (%s, %s, %s, %s)
-                    """, (new_analysis['id'], 'uk_rf', article['id'], 0.85))
-            
-            conn.commit()
-            
-            cur.execute("""
-                SELECT 
-                    ca.*,
-                    u.full_name as officer_name,
-                    u.rank as officer_rank
-                FROM crime_analyses ca
-                LEFT JOIN users u ON ca.officer_id = u.id
-                WHERE ca.id = %s
-            """, (analysis_id,))
-            
-            complete_analysis = cur.fetchone()
-            
-            cur.execute("""
-                SELECT id, file_name, file_type, file_size, upload_date
-                FROM document_attachments
-                WHERE analysis_id = %s
-            """, (analysis_id,))
-            
-            documents = cur.fetchall()
-            complete_analysis['documents'] = documents if documents else []
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 201,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'success': True,
-                    'message': 'Анализ преступления завершён',
-                    'data': complete_analysis
-                }, default=str),
-                'isBase64Encoded': False
-            }
-        
-        elif method == 'GET':
-            query_params = event.get('queryStringParameters', {}) or {}
-            status_filter = query_params.get('status', '')
-            officer_id = query_params.get('officer_id', '')
-            
-            analysis_id = query_params.get('analysis_id', '')
-            
-            if analysis_id:
+                        INSERT INTO crime_analyses (
+                            case_number, incident_date, category, description, 
+                            evidence, analysis_result, status, officer_id
+                        )
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        RETURNING id, case_number, incident_date, status, created_at
+                    """, (
+                        case_number, incident_date, category, description,
+                        evidence, json.dumps(analysis_result), 'completed', officer_id
+                    ))
+                    
+                    new_analysis = cur.fetchone()
+                    analysis_id = new_analysis['id']
+                
+                with stage('similar_index'):
+                    index_case(cur, analysis_id, description, evidence)
+                
+                with stage('document'):
+                    document_parse = attach_document(conn, cur, analysis_id, document, officer_id) if document else None
+                
+                with stage('articles'):
+                    save_analysis_articles(
+                        cur, analysis_id, fetch_articles(conn, analysis_result['suggested_articles']),
+                        analysis_result['article_scores']
+                    )
+                
+                with stage('rollups'):
+                    record_analyses(conn, cur, [{
+                        'category': category,
+                        'officer_id': officer_id,
+                        'incident_date': new_analysis['incident_date'],
+                        'analysis_result': analysis_result
+                    }])
+                
+                with stage('commit'):
+                    conn.commit()
+                
                 cur.execute("""
                     SELECT 
                         ca.*,
@@ -474,92 +672,145 @@ def handler(event: dict, context) -> dict:
                     FROM crime_analyses ca
                     LEFT JOIN users u ON ca.officer_id = u.id
                     WHERE ca.id = %s
-                """, (int(analysis_id),))
+                """, (analysis_id,))
+                
+                complete_analysis = cur.fetchone()
+                
+                cur.execute("""
+                    SELECT id, file_name, file_type, file_size, upload_date
+                    FROM document_attachments
+                    WHERE analysis_id = %s
+                """, (analysis_id,))
                 
-                analysis = cur.fetchone()
+                documents = cur.fetchall()
+                complete_analysis['documents'] = documents if documents else []
+                complete_analysis['document_parse'] = document_parse
                 
-                if analysis:
+                cur.close()
+                
+                with stage('serialize'):
+                    response_body = dumps({
+                        'success': True,
+                        'message': 'Анализ преступления завершён',
+                        'data': complete_analysis
+                    })
+                
+                return {
+                    'statusCode': 201,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': response_body,
+                    'isBase64Encoded': False
+                }
+            
+            elif method == 'GET':
+                analysis_id = query_params.get('analysis_id', '')
+                
+                if analysis_id:
                     cur.execute("""
-                        SELECT id, file_name, file_type, file_size, upload_date, extracted_text
-                        FROM document_attachments
-                        WHERE analysis_id = %s
+                        SELECT 
+                            ca.*,
+                            u.full_name as officer_name,
+                            u.rank as officer_rank
+                        FROM crime_analyses ca
+                        LEFT JOIN users u ON ca.officer_id = u.id
+                        WHERE ca.id = %s
                     """, (int(analysis_id),))
                     
-                    documents = cur.fetchall()
-                    analysis['documents'] = documents if documents else []
-                    
-                    cur.close()
-                    conn.close()
+                    analysis = cur.fetchone()
                     
+                    if analysis:
+                        cur.execute("""
+                            SELECT id, file_name, file_type, file_size, upload_date, extracted_text
+                            FROM document_attachments
+                            WHERE analysis_id = %s
+                        """, (int(analysis_id),))
+                        
+                        documents = cur.fetchall()
+                        analysis['documents'] = documents if documents else []
+                        analysis['job'] = get_job_status(cur, int(analysis_id))
+                        
+                        cur.close()
+                        
+                        return {
+                            'statusCode': 200,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*'
+                            },
+                            'body': dumps({
+                                'success': True,
+                                'data': analysis
+                            }),
+                            'isBase64Encoded': False
+                        }
+                
+                cur.close()
+                
+                try:
+                    with stage('list'):
+                        analyses, next_cursor = list_analyses(conn, query_params)
+                except ValueError as param_error:
                     return {
-                        'statusCode': 200,
+                        'statusCode': 400,
                         'headers': {
                             'Content-Type': 'application/json',
                             'Access-Control-Allow-Origin': '*'
                         },
                         'body': json.dumps({
-                            'success': True,
-                            'data': analysis
-                        }, default=str),
+                            'success': False,
+                            'error': str(param_error)
+                        }),
                         'isBase64Encoded': False
                     }
-            
-            query = """
-                SELECT 
-                    ca.*,
-                    u.full_name as officer_name,
-                    u.rank as officer_rank,
-                    (SELECT COUNT(*) FROM document_attachments WHERE analysis_id = ca.id) as document_count
-                FROM crime_analyses ca
-                LEFT JOIN users u ON ca.officer_id = u.id
-                WHERE 1=1
-            """
-            params = []
-            
-            if status_filter:
-                query += " AND ca.status = %s"
-                params.append(status_filter)
-            
-            if officer_id:
-                query += " AND ca.officer_id = %s"
-                params.append(int(officer_id))
-            
-            query += " ORDER BY ca.created_at DESC LIMIT 50"
-            
-            cur.execute(query, params)
-            analyses = cur.fetchall()
+                
+                with stage('serialize'):
+                    response_body = dumps({
+                        'success': True,
+                        'data': analyses,
+                        'count': len(analyses),
+                        'next_cursor': next_cursor
+                    })
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': response_body,
+                    'isBase64Encoded': False
+                }
             
             cur.close()
-            conn.close()
             
             return {
-                'statusCode': 200,
+                'statusCode': 405,
                 'headers': {
                     'Content-Type': 'application/json',
                     'Access-Control-Allow-Origin': '*'
                 },
-                'body': json.dumps({
-                    'success': True,
-                    'data': analyses,
-                    'count': len(analyses)
-                }, default=str),
+                'body': json.dumps({'error': 'Method not allowed'}),
                 'isBase64Encoded': False
             }
-        
-        cur.close()
-        conn.close()
-        
+            
+    except AuthError as auth_error:
         return {
-            'statusCode': 405,
+            'statusCode': auth_error.status_code,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({'error': 'Method not allowed'}),
+            'body': json.dumps({
+                'success': False,
+                'error': str(auth_error)
+            }),
             'isBase64Encoded': False
         }
-        
     except Exception as e:
+        log_error('analysis', e)
         return {
             'statusCode': 500,
             'headers': {
@@ -0,0 +1,107 @@
+import os
+import time
+from typing import Dict, Optional
+from keyword_matcher import KeywordMatcher
+
+# Как часто (в секундах) сверять ревизию словаря с таблицей keyword_article_map
+VERSION_CHECK_INTERVAL = float(os.environ.get('KEYWORD_MAP_CHECK_INTERVAL', '30'))
+
+
+class KeywordMapCache:
+    """Словарь ключевых слов из keyword_article_map: автомат строится при холодном старте,
+    при смене ревизии таблицы дозагружаются только изменённые строки"""
+
+    def __init__(self, article_type: str = 'uk_rf'):
+        self.article_type = article_type
+        self.rows: Dict[int, dict] = {}
+        self.revision = 0
+        self.version = None
+        self.matcher: Optional[KeywordMatcher] = None
+        self.checked_at = 0.0
+        self.full_loads = 0
+        self.delta_loads = 0
+        self.build_time_ms = 0.0
+
+    def _fetch_version(self, cur) -> tuple:
+        """Версия таблицы: наибольшая ревизия, число строк и сумма ревизий.
+        Число строк ловит удаления, сумма — изменения, зафиксированные не в порядке ревизий"""
+        cur.execute("""
+            SELECT 
+                COALESCE(MAX(revision), 0) AS revision,
+                COUNT(*) AS row_count,
+                COALESCE(SUM(revision), 0) AS checksum
+            FROM keyword_article_map
+            WHERE article_type = %s
+        """, (self.article_type,))
+        row = cur.fetchone()
+        return row['revision'], row['row_count'], int(row['checksum'])
+
+    def _fetch_rows(self, cur, after_revision: int) -> list:
+        cur.execute("""
+            SELECT id, keyword, article_number, weight, is_active, revision
+            FROM keyword_article_map
+            WHERE article_type = %s AND revision > %s
+        """, (self.article_type, after_revision))
+        return cur.fetchall()
+
+    def _build(self):
+        """Автомат по активным строкам в порядке добавления слов"""
+        started = time.perf_counter()
+        keywords_map: Dict[str, Dict[str, float]] = {}
+        for row in sorted(self.rows.values(), key=lambda row: row['id']):
+            if row['is_active']:
+                keywords_map.setdefault(row['keyword'], {})[row['article_number']] = float(row['weight'])
+        self.matcher = KeywordMatcher(keywords_map)
+        self.build_time_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def ensure_fresh(self, conn):
+        """Проверка ревизии (не чаще VERSION_CHECK_INTERVAL) и дозагрузка изменений"""
+        now = time.monotonic()
+        if self.matcher is not None and now - self.checked_at < VERSION_CHECK_INTERVAL:
+            return
+
+        cur = conn.cursor()
+        try:
+            version = self._fetch_version(cur)
+            if self.matcher is None or version != self.version:
+                _, row_count, checksum = version
+                changed = self._fetch_rows(cur, self.revision) if self.matcher is not None else []
+                for row in changed:
+                    self.rows[row['id']] = dict(row)
+
+                if self.matcher is None or len(self.rows) != row_count or sum(
+                    row['revision'] for row in self.rows.values()
+                ) != checksum:
+                    # Первая загрузка, удаление строк или пропущенное изменение — читаем словарь целиком
+                    changed = self._fetch_rows(cur, 0)
+                    self.rows = {row['id']: dict(row) for row in changed}
+                    self.full_loads += 1
+                else:
+                    self.delta_loads += 1
+
+                self.revision = max((row['revision'] for row in self.rows.values()), default=0)
+                self.version = version
+                self._build()
+                print(f"Keyword map loaded: revision={self.revision}, changed_rows={len(changed)}, build_time_ms={self.build_time_ms}")
+            self.checked_at = now
+        finally:
+            cur.close()
+
+    def get_matcher(self, conn) -> KeywordMatcher:
+        """Актуальный автомат ключевых слов"""
+        self.ensure_fresh(conn)
+        return self.matcher
+
+    def stats(self) -> dict:
+        return {
+            'revision': self.revision,
+            'rows': len(self.rows),
+            'keywords': len(self.matcher.keywords) if self.matcher else 0,
+            'full_loads': self.full_loads,
+            'delta_loads': self.delta_loads,
+            'build_time_ms': self.build_time_ms
+        }
+
+
+# Один экземпляр на процесс: живёт между тёплыми вызовами функции
+KEYWORD_MAP = KeywordMapCache()
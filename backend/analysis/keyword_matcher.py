@@ -0,0 +1,90 @@
+from collections import deque
+from typing import Dict, List, Tuple
+from lemmatizer import LEMMA_CODE_BASE, PHRASE_BREAK, LemmaTable, TOKEN_RE, lemmatize
+
+
+class KeywordMatcher:
+    """Автомат Aho-Corasick по леммам: все ключевые фразы находятся за один проход по тексту"""
+
+    def __init__(self, keywords_map: Dict[str, Dict[str, float]]):
+        self.lemmas = LemmaTable()
+        self.keywords: List[str] = []
+        self.articles: List[Dict[str, float]] = []
+
+        # Бор по идентификаторам лемм ключевых фраз: переходы, суффиксные ссылки, выходы
+        self._goto: List[Dict[int, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for keyword, articles in keywords_map.items():
+            state = 0
+            for token in TOKEN_RE.findall(keyword.lower()):
+                lemma_id = self.lemmas.add(lemmatize(token))
+                next_state = self._goto[state].get(lemma_id)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][lemma_id] = next_state
+                state = next_state
+
+            if self._out[state]:
+                # Другая словоформа уже внесённой фразы ('украл' / 'украли') — объединяем статьи
+                merged = self.articles[self._out[state][0]]
+                for article, weight in articles.items():
+                    merged[article] = max(merged.get(article, 0.0), weight)
+            else:
+                self._out[state].append(len(self.keywords))
+                self.keywords.append(keyword)
+                self.articles.append(dict(articles))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for lemma_id, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and lemma_id not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(lemma_id, 0)
+                self._out[next_state].extend(self._out[self._fail[next_state]])
+
+    def find(self, text: str) -> List[int]:
+        """Индексы найденных ключевых фраз в порядке словаря"""
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        found = set()
+
+        # Слова склеиваются в строку кодов лемм (split, join и map работают в C), строка режется
+        # по разрывам фраз: автомат проходит только уникальные цепочки подряд идущих лемм словаря
+        words = text.split()
+        codes = self.lemmas.encode(words)
+        runs = set(''.join(map(codes.__getitem__, words)).split(PHRASE_BREAK))
+
+        for run in runs:
+            state = 0
+            for char in run:
+                lemma_id = ord(char) - LEMMA_CODE_BASE
+                if not state:
+                    state = root.get(lemma_id, 0)
+                else:
+                    while state and lemma_id not in goto[state]:
+                        state = fail[state]
+                    state = goto[state].get(lemma_id, 0)
+                if out[state]:
+                    found.update(out[state])
+
+        return sorted(found)
+
+    def match(self, text: str) -> Tuple[List[str], Dict[str, float]]:
+        """Найденные ключевые слова и связанные с ними статьи с наибольшим весом среди совпавших слов"""
+        matched_keywords = []
+        keyword_articles: Dict[str, float] = {}
+
+        for index in self.find(text):
+            matched_keywords.append(self.keywords[index])
+            for article, weight in self.articles[index].items():
+                keyword_articles[article] = max(keyword_articles.get(article, 0.0), weight)
+
+        return matched_keywords, keyword_articles
@@ -0,0 +1,145 @@
+import os
+import time
+from typing import Dict, List
+
+# Таблицы кодексов, которые держатся в памяти тёплого контейнера
+LEGISLATION_TABLES = {
+    'uk_rf': 'uk_rf_articles',
+    'upk_rf': 'upk_rf_articles',
+    'constitution': 'constitution_articles'
+}
+
+# Отдаваемые клиентам колонки (служебный search_vector не выбирается)
+LEGISLATION_COLUMNS = {
+    'uk_rf': 'id, article_number, title, category, severity, full_text, last_updated',
+    'upk_rf': 'id, article_number, title, category, full_text, last_updated',
+    'constitution': 'id, article_number, title, category, full_text, last_updated'
+}
+
+# Как часто (в секундах) сверять версию кэша с таблицей legislation_updates
+VERSION_CHECK_INTERVAL = float(os.environ.get('LEGISLATION_CACHE_CHECK_INTERVAL', '5'))
+
+
+class LegislationCache:
+    """Кэш статей УК РФ, УПК РФ и Конституции РФ с инвалидацией по версии законодательства"""
+
+    def __init__(self):
+        self.version = None
+        self.checked_at = 0.0
+        self.articles: Dict[str, List[dict]] = {}
+        self.by_number: Dict[str, Dict[str, dict]] = {}
+        self.by_category: Dict[str, Dict[str, List[dict]]] = {}
+        self.positions: Dict[str, Dict[str, int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_time_ms = 0.0
+
+    def _fetch_version(self, cur) -> tuple:
+        """Текущая версия законодательства: последний id и дата в legislation_updates"""
+        cur.execute("""
+            SELECT id, update_date
+            FROM legislation_updates
+            ORDER BY id DESC
+            LIMIT 1
+        """)
+        row = cur.fetchone()
+        return (row['id'], str(row['update_date'])) if row else (0, None)
+
+    def _load(self, cur, version: tuple):
+        """Полная загрузка всех кодексов в память"""
+        started = time.perf_counter()
+        articles, by_number, by_category, positions = {}, {}, {}, {}
+
+        for code, table_name in LEGISLATION_TABLES.items():
+            cur.execute(f"""
+                SELECT {LEGISLATION_COLUMNS[code]}, sort_major, sort_minor
+                FROM {table_name}
+                ORDER BY sort_major, sort_minor, article_number
+            """)
+            rows = [dict(row) for row in cur.fetchall()]
+            articles[code] = rows
+            by_number[code] = {row['article_number']: row for row in rows}
+            positions[code] = {row['article_number']: i for i, row in enumerate(rows)}
+            by_category[code] = {}
+            for row in rows:
+                by_category[code].setdefault(row.get('category') or '', []).append(row)
+
+        self.articles, self.by_number, self.by_category = articles, by_number, by_category
+        self.positions = positions
+        self.version = version
+        self.loads += 1
+        self.load_time_ms = round((time.perf_counter() - started) * 1000, 2)
+        print(f"Legislation cache loaded: version={version}, load_time_ms={self.load_time_ms}")
+
+    def ensure_fresh(self, conn):
+        """Проверка версии (не чаще VERSION_CHECK_INTERVAL) и перезагрузка при её изменении"""
+        now = time.monotonic()
+        if self.version is not None and now - self.checked_at < VERSION_CHECK_INTERVAL:
+            self.hits += 1
+            return
+
+        cur = conn.cursor()
+        try:
+            version = self._fetch_version(cur)
+            if version == self.version:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._load(cur, version)
+            self.checked_at = now
+        finally:
+            cur.close()
+
+    def invalidate(self):
+        """Сброс кэша: следующий запрос перезагрузит законодательство"""
+        self.version = None
+
+    def current_version(self, conn) -> tuple:
+        """Актуальная версия законодательства (основа для ETag)"""
+        self.ensure_fresh(conn)
+        return self.version
+
+    def list_articles(self, conn, code: str) -> List[dict]:
+        """Все статьи кодекса в естественном порядке номеров"""
+        self.ensure_fresh(conn)
+        return self.articles.get(code, [])
+
+    def list_category(self, conn, code: str, category: str) -> List[dict]:
+        """Статьи кодекса, категория которых содержит category без учёта регистра (как ILIKE '%...%'),
+        в естественном порядке номеров"""
+        self.ensure_fresh(conn)
+        needle = category.lower()
+        # Подстрока ищется по названиям категорий (их единицы), а не по всем статьям кодекса
+        groups = [rows for name, rows in self.by_category.get(code, {}).items() if needle in name.lower()]
+        if len(groups) == 1:
+            return groups[0]
+        positions = self.positions.get(code, {})
+        return sorted((row for rows in groups for row in rows), key=lambda row: positions[row['article_number']])
+
+    def sort_numbers(self, conn, code: str, article_numbers) -> List[str]:
+        """Номера статей в естественном порядке ('105' < '105.1' < '106'), неизвестные в конце"""
+        self.ensure_fresh(conn)
+        positions = self.positions.get(code, {})
+        return sorted(article_numbers, key=lambda num: (positions.get(num, len(positions)), num))
+
+    def get_articles(self, conn, code: str, article_numbers: List[str]) -> List[dict]:
+        """Статьи кодекса по списку номеров в порядке списка, отсутствующие пропускаются"""
+        self.ensure_fresh(conn)
+        index = self.by_number.get(code, {})
+        return [index[num] for num in article_numbers if num in index]
+
+    def stats(self) -> dict:
+        """Счётчики попаданий/промахов и время последней загрузки"""
+        return {
+            'version': self.version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'load_time_ms': self.load_time_ms,
+            'articles': {code: len(rows) for code, rows in self.articles.items()}
+        }
+
+
+# Один экземпляр на процесс: живёт между тёплыми вызовами функции
+LEGISLATION_CACHE = LegislationCache()
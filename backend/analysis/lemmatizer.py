@@ -0,0 +1,211 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
+
+# Нормализация словоформ русского языка по алгоритму Snowball (Портер): 'украл', 'украли',
+# 'украла' сводятся к одной основе, поэтому словарю достаточно одной формы слова
+
+VOWELS = 'аеиоуыэюя'
+
+# Слово — последовательность букв/цифр, допускаются дефисы внутри ("дорожно-транспортное")
+TOKEN_RE = re.compile(r'\w+(?:-\w+)*')
+
+
+def _endings(*endings: str) -> Tuple[FrozenSet[str], ...]:
+    """Окончания, сгруппированные по длине — от самых длинных к коротким"""
+    longest = max(len(ending) for ending in endings)
+    return tuple(
+        frozenset(ending for ending in endings if len(ending) == length)
+        for length in range(longest, 0, -1)
+    )
+
+
+PERFECTIVE_GERUND_1 = _endings('вшись', 'вши', 'в')
+PERFECTIVE_GERUND_2 = _endings('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+REFLEXIVE = _endings('ся', 'сь')
+ADJECTIVE = _endings(
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой',
+    'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'
+)
+PARTICIPLE_1 = _endings('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE_2 = _endings('ивш', 'ывш', 'ующ')
+VERB_1 = _endings('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н')
+VERB_2 = _endings(
+    'ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют',
+    'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю'
+)
+NOUN = _endings(
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей',
+    'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й',
+    'о', 'у', 'ы', 'ь', 'ю', 'я'
+)
+SUPERLATIVE = _endings('ейше', 'ейш')
+DERIVATIONAL = _endings('ость', 'ост')
+FINAL_I = _endings('и')
+SOFT_SIGN = _endings('ь')
+
+# Супплетивные и иные формы, которые не сводятся к общей основе отсечением окончаний
+LEMMA_EXCEPTIONS: Dict[str, str] = {
+    'шел': 'идт',
+    'шла': 'идт',
+    'шли': 'идт',
+    # Основа 'да' совпала бы с частицей «да»: «да, взятку» находило бы фразу «дал взятку»
+    'дал': 'дать',
+    'дала': 'дать',
+    'дало': 'дать',
+    'дали': 'дать',
+    'дать': 'дать',
+    'людей': 'человек',
+    'люди': 'человек',
+    'людьми': 'человек',
+}
+
+LEMMA_CACHE_SIZE = 50000
+
+# Текст кодируется строкой из символов лемм: chr(LEMMA_CODE_BASE + id) — лемма словаря,
+# PHRASE_BREAK — всё, на чём фраза обрывается (лемма не из словаря, знак препинания, слово из цифр)
+LEMMA_CODE_BASE = 0x100
+PHRASE_BREAK = ' '
+
+
+def _regions(word: str) -> Tuple[int, int]:
+    """Начало областей RV и R2 в слове"""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start: int) -> int:
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    return rv, next_region(r1)
+
+
+def _strip(word: str, start: int, endings: Tuple[FrozenSet[str], ...], after_a: bool = False) -> str:
+    """Отсечение самого длинного окончания, целиком лежащего в области начиная со start"""
+    length = len(endings)
+    for group in endings:
+        cut = len(word) - length
+        length -= 1
+        if cut < start or word[cut:] not in group:
+            continue
+        if after_a and (cut - 1 < start or word[cut - 1] not in 'ая'):
+            continue
+        return word[:cut]
+    return word
+
+
+def _strip_any(word: str, start: int, group_1: tuple, group_2: tuple) -> str:
+    """Отсечение окончания из группы 1 (после а/я) или группы 2 — выбирается более длинное"""
+    first = _strip(word, start, group_1, after_a=True)
+    second = _strip(word, start, group_2)
+    return min(first, second, key=len)
+
+
+def stem(word: str) -> str:
+    """Основа слова по алгоритму Snowball для русского языка"""
+    word = word.replace('ё', 'е')
+    if word in LEMMA_EXCEPTIONS:
+        return LEMMA_EXCEPTIONS[word]
+
+    rv, r2 = _regions(word)
+
+    # Шаг 1: деепричастие, иначе возвратная частица и прилагательное/глагол/существительное
+    result = _strip_any(word, rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if result == word:
+        word = _strip(word, rv, REFLEXIVE)
+        result = _strip(word, rv, ADJECTIVE)
+        if result != word:
+            result = _strip_any(result, rv, PARTICIPLE_1, PARTICIPLE_2)
+        else:
+            result = _strip_any(word, rv, VERB_1, VERB_2)
+            if result == word:
+                result = _strip(word, rv, NOUN)
+    word = result
+
+    # Шаг 2: конечное 'и'
+    word = _strip(word, rv, FINAL_I)
+
+    # Шаг 3: словообразовательный суффикс в R2
+    word = _strip(word, r2, DERIVATIONAL)
+
+    # Шаг 4: превосходная степень, двойное 'н', мягкий знак
+    without_superlative = _strip(word, rv, SUPERLATIVE)
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        word = word[:-1]
+    elif without_superlative != word:
+        word = without_superlative
+        if word.endswith('нн') and len(word) - 1 >= rv:
+            word = word[:-1]
+    else:
+        word = _strip(word, rv, SOFT_SIGN)
+
+    return word
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(token: str) -> str:
+    """Лемма (основа) слова; повторяющиеся слова отчётов берутся из LRU-кэша"""
+    if '-' in token:
+        return '-'.join(stem(part) for part in token.split('-'))
+    return stem(token)
+
+
+class LemmaTable:
+    """Компактная таблица лемм: каждой лемме словаря сопоставлен целочисленный идентификатор"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        # Коды уже встречавшихся слов: протоколы повторяют одну и ту же лексику от вызова к вызову
+        self._codes: Dict[str, str] = {}
+
+    def add(self, lemma: str) -> int:
+        """Идентификатор леммы, новая лемма получает следующий номер"""
+        lemma_id = self._ids.get(lemma)
+        if lemma_id is None:
+            lemma_id = len(self._ids) + 1
+            self._ids[lemma] = lemma_id
+            self._codes.clear()
+        return lemma_id
+
+    def get(self, lemma: str) -> int:
+        """Идентификатор леммы или 0, если лемма не встречается в словаре"""
+        return self._ids.get(lemma, 0)
+
+    def _code(self, word: str) -> str:
+        parts = []
+        position = 0
+        for match in TOKEN_RE.finditer(word):
+            if match.start() > position:
+                parts.append(PHRASE_BREAK)
+            lemma_id = self._ids.get(lemmatize(match.group()), 0)
+            parts.append(chr(LEMMA_CODE_BASE + lemma_id) if lemma_id else PHRASE_BREAK)
+            position = match.end()
+        if position < len(word) or not parts:
+            parts.append(PHRASE_BREAK)
+        return ''.join(parts)
+
+    def encode(self, words: List[str]) -> Dict[str, str]:
+        """Код каждого уникального слова текста (слова разделены пробелами): символ
+        chr(LEMMA_CODE_BASE + id) на лемму словаря, PHRASE_BREAK — на лемму не из словаря и на знаки
+        препинания до, между и после слов"""
+        # Пунктуация отделяется и леммы считаются один раз на уникальное слово, а не на вхождение
+        cache = self._codes
+        codes = {}
+        for word in set(words):
+            code = cache.get(word)
+            if code is None:
+                code = self._code(word)
+                if len(cache) >= LEMMA_CACHE_SIZE:
+                    cache.clear()
+                cache[word] = code
+            codes[word] = code
+        return codes
+
+    def __len__(self) -> int:
+        return len(self._ids)
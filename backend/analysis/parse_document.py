@@ -1,72 +1,190 @@
-import base64
 import io
-from typing import Tuple
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Tuple, Union
+from tracing import stage
 
-def extract_text_from_pdf(file_data: bytes) -> str:
+# Бюджет извлечения: после MAX_PAGES страниц или MAX_TEXT_BYTES байт текста документ обрезается
+# (результат разбора помечается truncated)
+MAX_PAGES = int(os.environ.get('PARSE_MAX_PAGES', '1000'))
+MAX_TEXT_BYTES = int(os.environ.get('PARSE_MAX_TEXT_BYTES', str(10 * 1024 * 1024)))
+
+# Параллельное извлечение страниц PDF: число процессов, порог включения и размер задания
+PDF_WORKERS = int(os.environ.get('PARSE_PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+PARALLEL_MIN_PAGES = int(os.environ.get('PARSE_PARALLEL_MIN_PAGES', '40'))
+PAGES_PER_TASK = 10
+
+# Поддерживаемые расширения и тип документа
+FILE_TYPES = {
+    'pdf': 'PDF',
+    'doc': 'Word',
+    'docx': 'Word',
+    'txt': 'TXT'
+}
+
+# Источник документа: байты в памяти или путь к файлу на диске (читается по мере разбора)
+DocumentSource = Union[bytes, str]
+
+_worker_reader = None
+
+def _open_source(source: DocumentSource):
+    """Поток для чтения документа: файл открывается без загрузки целиком в память"""
+    return open(source, 'rb') if isinstance(source, str) else io.BytesIO(source)
+
+def _init_pdf_worker(path: str):
+    """Инициализация процесса-обработчика: PDF открывается с диска один раз на процесс"""
+    global _worker_reader
+    import pypdf
+    _worker_reader = pypdf.PdfReader(open(path, 'rb'))
+
+def _extract_page_range(page_range: Tuple[int, int]) -> List[str]:
+    """Текст страниц [start, stop) в процессе-обработчике"""
+    start, stop = page_range
+    return [_worker_reader.pages[i].extract_text() or '' for i in range(start, stop)]
+
+def _spill_to_file(source: DocumentSource) -> Tuple[str, bool]:
+    """Путь к документу для процессов-обработчиков: байты из памяти записываются во временный файл,
+    чтобы не передавать весь PDF в аргументах каждого процесса. Второе значение — файл временный"""
+    if isinstance(source, str):
+        return source, False
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as spilled:
+        spilled.write(source)
+    return spilled.name, True
+
+class PdfPages:
+    """Текст страниц PDF по одной; большие документы раздаются пулу процессов.
+    После обхода truncated — в документе больше max_pages страниц"""
+    
+    def __init__(self, source: DocumentSource, max_pages: int = MAX_PAGES, workers: int = PDF_WORKERS):
+        self.source = source
+        self.max_pages = max_pages
+        self.workers = workers
+        self.truncated = False
+    
+    def _parallel(self, page_count: int) -> Iterator[str]:
+        """Страницы из пула процессов; при сбое пула — исключение после последней выданной страницы"""
+        ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+        path, spilled = _spill_to_file(self.source)
+        try:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_pdf_worker, initargs=(path,))
+            try:
+                # map сохраняет порядок страниц; при досрочной остановке оставшиеся задания отменяются
+                for pages in executor.map(_extract_page_range, ranges):
+                    yield from pages
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+        finally:
+            if spilled:
+                os.unlink(path)
+    
+    def __iter__(self) -> Iterator[str]:
+        import pypdf
+        stream = _open_source(self.source)
+        try:
+            reader = pypdf.PdfReader(stream)
+            total_pages = len(reader.pages)
+            page_count = min(total_pages, self.max_pages)
+            if total_pages > page_count:
+                self.truncated = True
+                print(f"Warning: document truncated at {page_count} of {total_pages} pages")
+            
+            done = 0
+            if self.workers > 1 and page_count >= PARALLEL_MIN_PAGES:
+                try:
+                    for page in self._parallel(page_count):
+                        yield page
+                        done += 1
+                except (BrokenProcessPool, OSError, NotImplementedError, ImportError) as pool_error:
+                    # Пул не запустился (нет /dev/shm, лимит процессов) или обработчик упал —
+                    # оставшиеся страницы извлекаются последовательно
+                    print(f"Warning: parallel PDF extraction failed at page {done}, continuing serially: {pool_error!r}")
+            
+            for i in range(done, page_count):
+                yield reader.pages[i].extract_text() or ''
+        finally:
+            stream.close()
+
+def collect_text(parts: Iterator[str], max_bytes: int = MAX_TEXT_BYTES) -> Tuple[str, bool]:
+    """Склейка частей текста одним join с досрочной остановкой по бюджету размера;
+    второе значение — текст обрезан по бюджету"""
+    collected = []
+    total = 0
+    truncated = False
+    
+    for part in parts:
+        size = len(part.encode('utf-8'))
+        if total + size > max_bytes:
+            remaining = max(max_bytes - total, 0)
+            collected.append(part.encode('utf-8')[:remaining].decode('utf-8', errors='ignore'))
+            print(f"Warning: document text truncated at {max_bytes} bytes")
+            truncated = True
+            break
+        collected.append(part)
+        total += size + 1
+    
+    return '\n'.join(collected).strip(), truncated
+
+def extract_text_from_pdf(source: DocumentSource) -> Tuple[str, bool]:
     """Извлечение текста из PDF с помощью pypdf"""
     try:
-        import pypdf
-        pdf_file = io.BytesIO(file_data)
-        pdf_reader = pypdf.PdfReader(pdf_file)
-        
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        
-        return text.strip()
+        pdf_pages = PdfPages(source)
+        pages = iter(pdf_pages)
+        try:
+            text, truncated = collect_text(pages)
+        finally:
+            pages.close()
+        return text, truncated or pdf_pages.truncated
     except Exception as e:
         raise Exception(f"Ошибка обработки PDF: {str(e)}")
 
-def extract_text_from_docx(file_data: bytes) -> str:
+def extract_text_from_docx(source: DocumentSource) -> Tuple[str, bool]:
     """Извлечение текста из Word документа с помощью python-docx"""
     try:
         from docx import Document
-        doc_file = io.BytesIO(file_data)
-        doc = Document(doc_file)
-        
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        with _open_source(source) as doc_file:
+            doc = Document(doc_file)
         
-        return text.strip()
+        return collect_text(paragraph.text for paragraph in doc.paragraphs)
     except Exception as e:
         raise Exception(f"Ошибка обработки Word: {str(e)}")
 
-def extract_text_from_txt(file_data: bytes) -> str:
+def extract_text_from_txt(source: DocumentSource) -> Tuple[str, bool]:
     """Извлечение текста из TXT файла"""
+    if isinstance(source, str):
+        with open(source, 'rb') as txt_file:
+            file_data = txt_file.read()
+    else:
+        file_data = source
+    
     try:
         text = file_data.decode('utf-8')
-        return text.strip()
+        return text.strip(), False
     except UnicodeDecodeError:
         try:
             text = file_data.decode('windows-1251')
-            return text.strip()
+            return text.strip(), False
         except Exception as e:
             raise Exception(f"Ошибка обработки TXT: {str(e)}")
 
-def parse_document(base64_data: str, file_name: str) -> Tuple[str, str]:
-    """Парсинг документа и извлечение текста"""
-    try:
-        file_data = base64.b64decode(base64_data)
-        
-        file_ext = file_name.lower().split('.')[-1]
-        
-        if file_ext == 'pdf':
-            text = extract_text_from_pdf(file_data)
-            file_type = 'PDF'
-        elif file_ext in ['doc', 'docx']:
-            text = extract_text_from_docx(file_data)
-            file_type = 'Word'
-        elif file_ext == 'txt':
-            text = extract_text_from_txt(file_data)
-            file_type = 'TXT'
+def extract_text(source: DocumentSource, file_name: str) -> Tuple[str, str, bool]:
+    """Извлечение текста из декодированного файла или файла на диске по расширению имени:
+    текст, тип документа и признак обрезки по бюджету извлечения"""
+    file_ext = file_name.lower().split('.')[-1]
+    file_type = FILE_TYPES.get(file_ext)
+    
+    with stage('extract'):
+        if file_type == 'PDF':
+            text, truncated = extract_text_from_pdf(source)
+        elif file_type == 'Word':
+            text, truncated = extract_text_from_docx(source)
+        elif file_type == 'TXT':
+            text, truncated = extract_text_from_txt(source)
         else:
             raise Exception(f"Неподдерживаемый формат файла: {file_ext}")
-        
-        if len(text) < 10:
-            raise Exception("Документ слишком короткий или не содержит текста")
-        
-        return text, file_type
-        
-    except Exception as e:
-        raise Exception(f"Ошибка парсинга документа: {str(e)}")
\ No newline at end of file
+    
+    if len(text) < 10:
+        raise Exception("Документ слишком короткий или не содержит текста")
+    
+    return text, file_type, truncated
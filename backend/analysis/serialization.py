@@ -0,0 +1,125 @@
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from json.encoder import _make_iterencode, c_make_encoder, encode_basestring
+from psycopg2.extras import register_default_jsonb
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Кодировщик ответов: orjson с Fragment (3.9+), если установлен и не выключен (JSON_ORJSON=0), иначе стандартный json
+JSON_ORJSON = (
+    os.environ.get('JSON_ORJSON', '1').lower() in ('1', 'true', 'yes')
+    and orjson is not None and hasattr(orjson, 'Fragment')
+)
+
+
+class RawJSON:
+    """Значение JSONB из базы в виде исходного текста: в ответ вставляется как есть, без json.loads/json.dumps"""
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def load(self):
+        return json.loads(self.text)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f'RawJSON({self.text[:60]!r})'
+
+
+def load(value):
+    """Разобранное значение JSONB-колонки: RawJSON читается, dict/list/None возвращаются без изменений"""
+    return value.load() if isinstance(value, RawJSON) else value
+
+
+def register_raw_jsonb(conn):
+    """JSONB-колонки этого соединения читаются как RawJSON вместо dict"""
+    register_default_jsonb(conn, loads=RawJSON)
+
+
+# Типы, которых нет в JSON: формат совпадает с прежним default=str, чтобы клиенты не заметили замены
+ENCODERS = {
+    datetime: lambda value: value.isoformat(' '),
+    date: date.isoformat,
+    time: time.isoformat,
+    Decimal: str,
+    memoryview: lambda value: value.tobytes().decode('utf-8', 'replace'),
+    bytes: lambda value: value.decode('utf-8', 'replace')
+}
+
+
+class _RawText(str):
+    """Готовый JSON из RawJSON: строка, которую _encode_string отдаёт без кавычек и экранирования"""
+    __slots__ = ()
+
+
+def _encode_string(value: str) -> str:
+    return value if type(value) is _RawText else encode_basestring(value)
+
+
+def _float_string(value: float) -> str:
+    """Число с плавающей точкой как у json.dumps (allow_nan)"""
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return 'Infinity' if value > 0 else '-Infinity'
+    return float.__repr__(value)
+
+
+class RawJSONEncoder(json.JSONEncoder):
+    """Стандартный json: RawJSON вставляется как есть, типы из ENCODERS — в формате default=str"""
+
+    def __init__(self):
+        super().__init__(ensure_ascii=False, separators=(',', ':'))
+
+    def default(self, value):
+        if type(value) is RawJSON:
+            return _RawText(value.text)
+        encoder = ENCODERS.get(type(value))
+        return encoder(value) if encoder is not None else str(value)
+
+    def iterencode(self, o, _one_shot=False):
+        # Тот же кодировщик, что у json.dumps (C-модуль _json, без него — чистый Python), но строки
+        # кодирует _encode_string: быстрого пути encode_basestring у C-кодировщика здесь нет
+        markers = {} if self.check_circular else None
+        if c_make_encoder is not None:
+            return c_make_encoder(
+                markers, self.default, _encode_string, self.indent, self.key_separator,
+                self.item_separator, self.sort_keys, self.skipkeys, self.allow_nan
+            )(o, 0)
+        return _make_iterencode(
+            markers, self.default, _encode_string, self.indent, _float_string, self.key_separator,
+            self.item_separator, self.sort_keys, self.skipkeys, _one_shot
+        )(o, 0)
+
+
+_JSON_ENCODER = RawJSONEncoder()
+
+
+def _orjson_default(value):
+    """orjson.Fragment вставляет готовый JSON сам"""
+    if type(value) is RawJSON:
+        return orjson.Fragment(value.text)
+    encoder = ENCODERS.get(type(value))
+    return encoder(value) if encoder is not None else str(value)
+
+
+def _dumps_orjson(obj) -> str:
+    return orjson.dumps(
+        obj,
+        default=_orjson_default,
+        # datetime уходит в ENCODERS (формат default=str), numpy-числа и ключи-числа — как у json
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ).decode()
+
+
+def dumps(obj) -> str:
+    """Тело ответа из строк RealDictCursor: даты, Decimal и RawJSON без обхода через default=str"""
+    return _dumps_orjson(obj) if JSON_ORJSON else _JSON_ENCODER.encode(obj)
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from db import db_connection
+
+# Срок жизни сессии после входа
+SESSION_TTL_HOURS = int(os.environ.get('SESSION_TTL_HOURS', '12'))
+
+# Сколько секунд проверенный токен живёт в памяти процесса без обращения к базе:
+# отзыв сессии или блокировка сотрудника в другом экземпляре функции вступает в силу не позже
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', '30'))
+SESSION_CACHE_MAX_ENTRIES = int(os.environ.get('SESSION_CACHE_MAX_ENTRIES', '10000'))
+
+# Без REQUIRE_AUTH запросы без заголовка X-Authorization пропускаются (неверный токен отклоняется всегда)
+REQUIRE_AUTH = os.environ.get('REQUIRE_AUTH', '').lower() in ('1', 'true', 'yes')
+
+
+class AuthError(Exception):
+    """Отказ в доступе: сообщение и HTTP-статус ответа"""
+
+    def __init__(self, message: str, status_code: int = 401):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def request_token(event: dict) -> str:
+    """Токен из заголовка X-Authorization (допускается префикс Bearer)"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == 'x-authorization' and value:
+            return value[7:].strip() if value.lower().startswith('bearer ') else value.strip()
+    return ''
+
+
+class SessionCache:
+    """LRU проверенных токенов: сессия (или её отсутствие) запоминается на SESSION_CACHE_TTL секунд"""
+
+    def __init__(self, ttl: float = SESSION_CACHE_TTL, max_entries: int = SESSION_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token_hash: str) -> Tuple[bool, Optional[dict]]:
+        """(найдено в кэше, сессия или None для недействительного токена)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None or now - entry[0] >= self.ttl:
+                self._entries.pop(token_hash, None)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(token_hash)
+            self.hits += 1
+            cached_at, expires_at, session = entry
+            # Срок сессии проверяется и по кэшу: истёкшая сессия не продлевается на время TTL
+            return True, session if session is not None and now < expires_at else None
+
+    def put(self, token_hash: str, session: Optional[dict], expires_in: float = 0.0):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[token_hash] = (now, now + expires_in, session)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token_hash: str):
+        with self._lock:
+            self._entries.pop(token_hash, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'ttl_seconds': self.ttl
+        }
+
+
+# Один экземпляр на процесс: живёт между тёплыми вызовами функции
+SESSION_CACHE = SessionCache()
+
+
+def create_session(cur, user_id: int) -> dict:
+    """Новая сессия сотрудника (фиксируется вместе с транзакцией вызывающего); токен возвращается один раз"""
+    token = secrets.token_urlsafe(32)
+    cur.execute("""
+        DELETE FROM sessions
+        WHERE user_id = %s AND expires_at < NOW()
+    """, (user_id,))
+    cur.execute("""
+        INSERT INTO sessions (token_hash, user_id, expires_at)
+        VALUES (%s, %s, NOW() + make_interval(hours => %s))
+        RETURNING expires_at
+    """, (hash_token(token), user_id, SESSION_TTL_HOURS))
+    return {'token': token, 'expires_at': cur.fetchone()['expires_at']}
+
+
+def revoke_session(cur, token: str) -> bool:
+    """Отзыв сессии: в этом процессе сразу, в остальных — по истечении SESSION_CACHE_TTL"""
+    token_hash = hash_token(token)
+    cur.execute("""
+        UPDATE sessions
+        SET revoked_at = NOW()
+        WHERE token_hash = %s AND revoked_at IS NULL
+    """, (token_hash,))
+    SESSION_CACHE.discard(token_hash)
+    return cur.rowcount > 0
+
+
+def load_session(conn, token_hash: str) -> Tuple[Optional[dict], float]:
+    """Действующая сессия активного сотрудника и число секунд до её истечения"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT
+            s.id AS session_id,
+            s.user_id,
+            u.username,
+            u.full_name,
+            u.role,
+            EXTRACT(EPOCH FROM s.expires_at - NOW()) AS expires_in
+        FROM sessions s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.token_hash = %s
+          AND s.revoked_at IS NULL
+          AND s.expires_at > NOW()
+          AND u.is_active = true
+    """, (token_hash,))
+    row = cur.fetchone()
+    cur.close()
+    if row is None:
+        return None, 0.0
+    session = dict(row)
+    return session, float(session.pop('expires_in'))
+
+
+def validate_token(token: str, conn=None) -> Optional[dict]:
+    """Сессия по токену: из кэша процесса, при промахе — одним запросом к базе"""
+    token_hash = hash_token(token)
+    found, session = SESSION_CACHE.get(token_hash)
+    if found:
+        return session
+
+    if conn is None:
+        with db_connection() as conn:
+            session, expires_in = load_session(conn, token_hash)
+    else:
+        session, expires_in = load_session(conn, token_hash)
+    SESSION_CACHE.put(token_hash, session, expires_in)
+    return session
+
+
+def authenticate(event: dict, conn=None) -> Optional[dict]:
+    """Проверка X-Authorization запроса; AuthError при неверном токене или его отсутствии (если REQUIRE_AUTH)"""
+    token = request_token(event)
+    if not token:
+        if REQUIRE_AUTH:
+            raise AuthError('Требуется авторизация')
+        return None
+
+    session = validate_token(token, conn)
+    if session is None:
+        raise AuthError('Сессия недействительна или истекла')
+    return session
+
+
+def require_session(session: Optional[dict], role: Optional[str] = None) -> dict:
+    """Сессия обязательна независимо от REQUIRE_AUTH (служебные и дорогие действия); role — требуемая роль"""
+    if session is None:
+        raise AuthError('Требуется авторизация')
+    if role is not None and session.get('role') != role:
+        raise AuthError('Недостаточно прав', 403)
+    return session
@@ -0,0 +1,236 @@
+import hashlib
+import os
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from psycopg2.extras import execute_values
+from analyses_list import LIST_COLUMNS
+from article_ranker import text_lemmas
+
+# Сигнатура MinHash: NUM_PERM хеш-функций, значения uint32 → 512 байт на дело.
+# Параметры входят в сохранённые сигнатуры и корзины: при их смене индекс строится заново
+NUM_PERM = 128
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+# Хеш-функции вида (a·x + b) mod p над простым Мерсенна 2^31 − 1: произведение помещается в uint64
+MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240517)
+PERM_A = _rng.integers(1, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.integers(0, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+
+# Короткие слова (предлоги, союзы) не несут смысла дела и только сближают несвязанные описания
+MIN_SHINGLE_LENGTH = 3
+
+DEFAULT_SIMILAR_LIMIT = 10
+MAX_SIMILAR_LIMIT = 50
+
+# Сколько кандидатов (с наибольшим числом совпавших полос) сравнивается по сигнатуре
+SIMILAR_MAX_CANDIDATES = int(os.environ.get('SIMILAR_MAX_CANDIDATES', '2000'))
+
+# Размер пачки дозаполнения индекса для дел, сохранённых до его появления
+SIMILAR_BACKFILL_BATCH = int(os.environ.get('SIMILAR_BACKFILL_BATCH', '1000'))
+
+
+def case_text(description: Optional[str], evidence: Optional[str]) -> str:
+    """Текст дела, по которому считается сходство"""
+    return f"{description or ''} {evidence or ''}"
+
+
+def shingles(text: str) -> set:
+    """Множество лемм текста — по нему считается сходство Жаккара"""
+    # Без списка стоп-слов ранжирования: он не входит в сохранённые сигнатуры и корзины
+    return {lemma for lemma in text_lemmas(text, stopwords=frozenset()) if len(lemma) >= MIN_SHINGLE_LENGTH}
+
+
+def _hash64(data: bytes) -> int:
+    # Встроенный hash() зависит от процесса (PYTHONHASHSEED), а сигнатуры хранятся в базе
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """Отсортированные хеши лемм текста (uint32 < 2^31 − 1) — компактная форма множества для точного Жаккара"""
+    return np.unique(np.fromiter(
+        (_hash64(word.encode()) % MERSENNE_PRIME for word in shingles(text)), dtype=np.uint64
+    )).astype(np.uint32)
+
+
+def compute_signature(hashes: np.ndarray) -> Optional[np.ndarray]:
+    """Сигнатура MinHash множества хешей; None, если в тексте нет значимых слов"""
+    if not len(hashes):
+        return None
+    hashed = (np.outer(hashes.astype(np.uint64), PERM_A) + PERM_B) % MERSENNE_PRIME
+    return hashed.min(axis=0).astype(np.uint32)
+
+
+def to_bytes(values: np.ndarray) -> bytes:
+    return values.astype('<u4').tobytes()
+
+
+def from_bytes(data) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype='<u4')
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """Корзины LSH: хеш каждой полосы из LSH_ROWS значений вместе с номером полосы"""
+    raw = to_bytes(signature)
+    band_size = LSH_ROWS * 4
+    return [
+        int.from_bytes(
+            hashlib.blake2b(band.to_bytes(2, 'little') + raw[band * band_size:(band + 1) * band_size], digest_size=8).digest(),
+            'little', signed=True
+        )
+        for band in range(LSH_BANDS)
+    ]
+
+
+def similarity_rows(cases: Iterable[Tuple[int, str]]) -> Tuple[List[tuple], List[tuple]]:
+    """Строки case_minhash (id, сигнатура, хеши лемм) и case_lsh_buckets (корзина, id) для пачки дел (id, текст)"""
+    signatures, buckets = [], []
+    for analysis_id, text in cases:
+        hashes = shingle_hashes(text)
+        signature = compute_signature(hashes)
+        if signature is None:
+            continue
+        signatures.append((analysis_id, to_bytes(signature), to_bytes(hashes)))
+        buckets.extend((bucket, analysis_id) for bucket in set(band_buckets(signature)))
+    return signatures, buckets
+
+
+def index_cases(cur, cases: Iterable[Tuple[int, str]]) -> int:
+    """Сигнатуры и корзины LSH для пачки дел (id, текст); возвращает число проиндексированных дел"""
+    signatures, buckets = similarity_rows(cases)
+    if not signatures:
+        return 0
+
+    execute_values(cur, """
+        INSERT INTO case_minhash (analysis_id, signature, shingles)
+        VALUES %s
+        ON CONFLICT (analysis_id) DO NOTHING
+    """, signatures, page_size=1000)
+    execute_values(cur, """
+        INSERT INTO case_lsh_buckets (bucket, analysis_id)
+        VALUES %s
+        ON CONFLICT DO NOTHING
+    """, buckets, page_size=5000)
+    return len(signatures)
+
+
+def index_case(cur, analysis_id: int, description: str, evidence: str) -> bool:
+    """Индексация одного дела при сохранении (в транзакции вызывающего)"""
+    return index_cases(cur, [(analysis_id, case_text(description, evidence))]) > 0
+
+
+def backfill_index(conn, limit: int = SIMILAR_BACKFILL_BATCH) -> dict:
+    """Индексация дел, сохранённых без сигнатуры (до появления индекса)"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT ca.id, ca.description, ca.evidence
+        FROM crime_analyses ca
+        WHERE NOT EXISTS (SELECT 1 FROM case_minhash cm WHERE cm.analysis_id = ca.id)
+        ORDER BY ca.id
+        LIMIT %s
+    """, (limit,))
+    rows = cur.fetchall()
+    indexed = index_cases(cur, [(row['id'], case_text(row['description'], row['evidence'])) for row in rows])
+    conn.commit()
+    cur.close()
+    return {'scanned': len(rows), 'indexed': indexed, 'done': len(rows) < limit}
+
+
+def find_similar_ids(conn, signature: np.ndarray, hashes: np.ndarray, limit: int = DEFAULT_SIMILAR_LIMIT,
+                     exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Похожие дела: кандидаты из совпавших корзин LSH, порядок — точный Жаккар по хешам лемм"""
+    cur = conn.cursor()
+    cur.execute("""
+        WITH candidates AS (
+            SELECT analysis_id, COUNT(*) AS bands
+            FROM case_lsh_buckets
+            WHERE bucket = ANY(%s::bigint[])
+            GROUP BY analysis_id
+            ORDER BY bands DESC, analysis_id DESC
+            LIMIT %s
+        )
+        SELECT cm.analysis_id, cm.shingles
+        FROM candidates
+        JOIN case_minhash cm ON cm.analysis_id = candidates.analysis_id
+    """, (band_buckets(signature), SIMILAR_MAX_CANDIDATES))
+    rows = [row for row in cur.fetchall() if row['analysis_id'] != exclude_id]
+    cur.close()
+    if not rows:
+        return []
+
+    # Пересечения всех кандидатов с запросом за один проход: общий массив хешей и границы дел в нём
+    candidate_hashes = [bytes(row['shingles']) for row in rows]
+    sizes = np.array([len(data) // 4 for data in candidate_hashes])
+    found = np.isin(np.frombuffer(b''.join(candidate_hashes), dtype='<u4'), hashes)
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    intersection = np.add.reduceat(found, offsets) if len(found) else np.zeros(len(rows))
+    similarity = intersection / (sizes + len(hashes) - intersection)
+    ids = np.array([row['analysis_id'] for row in rows])
+
+    # По убыванию сходства, при равенстве — более новые дела первыми
+    order = np.lexsort((-ids, -similarity))[:limit]
+    return [(int(ids[i]), round(float(similarity[i]), 4)) for i in order if similarity[i] > 0]
+
+
+def get_signature(conn, analysis_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Сохранённые сигнатура и хеши лемм дела"""
+    cur = conn.cursor()
+    cur.execute("SELECT signature, shingles FROM case_minhash WHERE analysis_id = %s", (analysis_id,))
+    row = cur.fetchone()
+    cur.close()
+    return (from_bytes(row['signature']), from_bytes(row['shingles'])) if row else None
+
+
+def fetch_cases(conn, ranked: Sequence[Tuple[int, float]]) -> List[dict]:
+    """Карточки найденных дел (колонки списка анализов) в порядке сходства"""
+    if not ranked:
+        return []
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT {LIST_COLUMNS}, u.full_name as officer_name
+        FROM crime_analyses ca
+        LEFT JOIN users u ON ca.officer_id = u.id
+        WHERE ca.id = ANY(%s)
+    """, ([analysis_id for analysis_id, _ in ranked],))
+    cases = {row['id']: row for row in cur.fetchall()}
+    cur.close()
+
+    result = []
+    for analysis_id, similarity in ranked:
+        if analysis_id in cases:
+            cases[analysis_id]['similarity'] = similarity
+            result.append(cases[analysis_id])
+    return result
+
+
+def similar_cases(conn, query_params: dict, body: Optional[dict] = None) -> List[dict]:
+    """Похожие дела для сохранённого анализа (?analysis_id=) или для текста ещё не сохранённого дела"""
+    limit = min(max(int(query_params.get('limit', DEFAULT_SIMILAR_LIMIT)), 1), MAX_SIMILAR_LIMIT)
+
+    if query_params.get('analysis_id'):
+        analysis_id = int(query_params['analysis_id'])
+        stored = get_signature(conn, analysis_id)
+        if stored is None:
+            # Дело сохранено до появления индекса — сигнатура считается по тексту и сохраняется
+            cur = conn.cursor()
+            cur.execute("SELECT description, evidence FROM crime_analyses WHERE id = %s", (analysis_id,))
+            row = cur.fetchone()
+            if row is None:
+                cur.close()
+                raise LookupError('Анализ не найден')
+            index_case(cur, analysis_id, row['description'], row['evidence'])
+            conn.commit()
+            cur.close()
+            stored = get_signature(conn, analysis_id)
+        if stored is None:
+            return []
+        signature, hashes = stored
+        return fetch_cases(conn, find_similar_ids(conn, signature, hashes, limit, exclude_id=analysis_id))
+
+    body = body or {}
+    hashes = shingle_hashes(case_text(body.get('description'), body.get('evidence')))
+    signature = compute_signature(hashes)
+    if signature is None:
+        raise ValueError('Укажите описание дела')
+    return fetch_cases(conn, find_similar_ids(conn, signature, hashes, limit))
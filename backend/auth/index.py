@@ -1,44 +1,14 @@
 import json
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
 from datetime import datetime, timedelta
-import hashlib
-import secrets
-import bcrypt
-
-def get_db_connection():
-    """Подключение к базе данных PostgreSQL"""
-    return psycopg2.connect(
-        os.environ['DATABASE_URL'],
-        cursor_factory=RealDictCursor
-    )
-
-def hash_password(password: str) -> str:
-    """Хеширование пароля с bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode(), salt).decode()
-
-def verify_password(password: str, password_hash: str) -> bool:
-    """Проверка пароля"""
-    try:
-        print(f"DEBUG: Checking password length: {len(password)}")
-        print(f"DEBUG: Password bytes: {password.encode('utf-8')}")
-        print(f"DEBUG: Hash starts with: {password_hash[:20]}")
-        print(f"DEBUG: Hash length: {len(password_hash)}")
-        result = bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
-        print(f"DEBUG: Password check result: {result}")
-        return result
-    except Exception as e:
-        print(f"ERROR in verify_password: {str(e)}")
-        import traceback
-        print(f"TRACEBACK: {traceback.format_exc()}")
-        return False
-
-def generate_token() -> str:
-    """Генерация токена сессии"""
-    return secrets.token_urlsafe(32)
+from db import db_connection
+from session_auth import AuthError, authenticate, create_session, request_token, require_session, revoke_session
+from password_service import PASSWORD_METRICS, hash_password, needs_rehash, verify_password
+from login_limiter import LOGIN_LIMITER, RateLimitExceeded, source_ip
+from user_directory import USER_DIRECTORY
+from tracing import log_error, stage, traced
+from serialization import dumps
 
+@traced('auth')
 def handler(event: dict, context) -> dict:
     """API для авторизации и управления доступом сотрудников МВД"""
     method = event.get('httpMethod', 'GET')
@@ -49,200 +19,346 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Authorization'
+                'Access-Control-Allow-Headers': 'Content-Type, X-Authorization, X-Trace'
             },
             'body': '',
             'isBase64Encoded': False
         }
     
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        if method == 'POST':
-            body = json.loads(event.get('body', '{}'))
-            action = body.get('action', 'login')
+        with db_connection() as conn:
+            cur = conn.cursor()
             
-            if action == 'login':
-                username = body.get('username', '')
-                password = body.get('password', '')
+            if method == 'POST':
+                body = json.loads(event.get('body', '{}'))
+                action = body.get('action', 'login')
                 
-                if not username or not password:
+                if action == 'login':
+                    username = body.get('username', '')
+                    password = body.get('password', '')
+                    
+                    if not username or not password:
+                        return {
+                            'statusCode': 400,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*'
+                            },
+                            'body': json.dumps({
+                                'success': False,
+                                'error': 'Укажите имя пользователя и пароль'
+                            }),
+                            'isBase64Encoded': False
+                        }
+                    
+                    # Лимит попыток проверяется до bcrypt: перебор паролей не занимает пул хеширования
+                    try:
+                        with stage('limiter'):
+                            LOGIN_LIMITER.check(conn, username, source_ip(event))
+                    except RateLimitExceeded as limited:
+                        cur.close()
+                        return {
+                            'statusCode': 429,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*',
+                                'Retry-After': str(limited.retry_after)
+                            },
+                            'body': json.dumps({
+                                'success': False,
+                                'error': str(limited),
+                                'retry_after': limited.retry_after
+                            }),
+                            'isBase64Encoded': False
+                        }
+                    
+                    cur.execute("""
+                        SELECT id, username, full_name, rank, department, role, is_active, password_hash
+                        FROM users
+                        WHERE username = %s AND is_active = true
+                    """, (username,))
+                    
+                    user = cur.fetchone()
+                    
+                    with stage('password'):
+                        password_ok = bool(user) and verify_password(password, user['password_hash'])
+                    
+                    if not password_ok:
+                        cur.close()
+                        return {
+                            'statusCode': 401,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*'
+                            },
+                            'body': json.dumps({
+                                'success': False,
+                                'error': 'Неверное имя пользователя или пароль'
+                            }),
+                            'isBase64Encoded': False
+                        }
+                    
+                    # Хеш со старой стоимостью bcrypt пересчитывается, пока известен пароль
+                    with stage('rehash'):
+                        new_hash = hash_password(password) if needs_rehash(user['password_hash']) else None
+                    
+                    cur.execute("""
+                        UPDATE users
+                        SET last_login = %s, password_hash = COALESCE(%s, password_hash)
+                        WHERE id = %s
+                    """, (datetime.now(), new_hash, user['id']))
+                    
+                    with stage('session'):
+                        LOGIN_LIMITER.reset_user(cur, username)
+                        session = create_session(cur, user['id'])
+                        conn.commit()
+                    # last_login (и хеш) изменились — страницы справочника перечитываются
+                    USER_DIRECTORY.invalidate()
+                    
+                    user_data = {k: v for k, v in user.items() if k != 'password_hash'}
+                    
+                    cur.close()
+                    
                     return {
-                        'statusCode': 400,
+                        'statusCode': 200,
                         'headers': {
                             'Content-Type': 'application/json',
                             'Access-Control-Allow-Origin': '*'
                         },
-                        'body': json.dumps({
-                            'success': False,
-                            'error': 'Укажите имя пользователя и пароль'
+                        'body': dumps({
+                            'success': True,
+                            'message': 'Авторизация успешна',
+                            'data': {
+                                'user': user_data,
+                                'token': session['token'],
+                                'expires_at': session['expires_at']
+                            }
                         }),
                         'isBase64Encoded': False
                     }
                 
-                cur.execute("""
-                    SELECT id, username, full_name, rank, department, role, is_active, password_hash
-                    FROM users
-                    WHERE username = %s AND is_active = true
-                """, (username,))
-                
-                user = cur.fetchone()
-                
-                if not user or not verify_password(password, user['password_hash']):
+                elif action == 'logout':
+                    token = request_token(event) or body.get('token', '')
+                    
+                    if not token:
+                        cur.close()
+                        return {
+                            'statusCode': 400,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*'
+                            },
+                            'body': json.dumps({
+                                'success': False,
+                                'error': 'Не передан токен сессии'
+                            }),
+                            'isBase64Encoded': False
+                        }
+                    
+                    revoked = revoke_session(cur, token)
+                    conn.commit()
                     cur.close()
-                    conn.close()
+                    
                     return {
-                        'statusCode': 401,
+                        'statusCode': 200,
                         'headers': {
                             'Content-Type': 'application/json',
                             'Access-Control-Allow-Origin': '*'
                         },
                         'body': json.dumps({
-                            'success': False,
-                            'error': 'Неверное имя пользователя или пароль'
+                            'success': True,
+                            'message': 'Сессия завершена',
+                            'data': {'revoked': revoked}
                         }),
                         'isBase64Encoded': False
                     }
                 
-                cur.execute("""
-                    UPDATE users
-                    SET last_login = %s
-                    WHERE id = %s
-                """, (datetime.now(), user['id']))
-                
-                conn.commit()
-                
-                token = generate_token()
-                
-                user_data = {k: v for k, v in user.items() if k != 'password_hash'}
-                
-                cur.close()
-                conn.close()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'success': True,
-                        'message': 'Авторизация успешна',
-                        'data': {
-                            'user': user_data,
-                            'token': token
+                elif action == 'register':
+                    username = body.get('username', '')
+                    password = body.get('password', '')
+                    full_name = body.get('full_name', '')
+                    rank = body.get('rank', '')
+                    department = body.get('department', '')
+                    
+                    if not username or not password or not full_name:
+                        return {
+                            'statusCode': 400,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*'
+                            },
+                            'body': json.dumps({
+                                'success': False,
+                                'error': 'Заполните все обязательные поля'
+                            }),
+                            'isBase64Encoded': False
                         }
-                    }, default=str),
-                    'isBase64Encoded': False
-                }
+                    
+                    cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+                    existing_user = cur.fetchone()
+                    
+                    if existing_user:
+                        cur.close()
+                        return {
+                            'statusCode': 409,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*'
+                            },
+                            'body': json.dumps({
+                                'success': False,
+                                'error': 'Пользователь с таким именем уже существует'
+                            }),
+                            'isBase64Encoded': False
+                        }
+                    
+                    password_hash = hash_password(password)
+                    
+                    cur.execute("""
+                        INSERT INTO users (username, full_name, rank, department, password_hash, role)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        RETURNING id, username, full_name, rank, department, role
+                    """, (username, full_name, rank, department, password_hash, 'officer'))
+                    
+                    new_user = cur.fetchone()
+                    conn.commit()
+                    USER_DIRECTORY.invalidate()
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 201,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': dumps({
+                            'success': True,
+                            'message': 'Пользователь зарегистрирован',
+                            'data': dict(new_user)
+                        }),
+                        'isBase64Encoded': False
+                    }
             
-            elif action == 'register':
-                username = body.get('username', '')
-                password = body.get('password', '')
-                full_name = body.get('full_name', '')
-                rank = body.get('rank', '')
-                department = body.get('department', '')
+            elif method == 'GET':
+                query_params = event.get('queryStringParameters', {}) or {}
                 
-                if not username or not password or not full_name:
+                if query_params.get('action') == 'password_stats':
+                    cur.close()
+                    # Метрики входа и лимитов — только администратору, даже без REQUIRE_AUTH
+                    require_session(authenticate(event, conn), 'admin')
+                    
                     return {
-                        'statusCode': 400,
+                        'statusCode': 200,
                         'headers': {
                             'Content-Type': 'application/json',
                             'Access-Control-Allow-Origin': '*'
                         },
                         'body': json.dumps({
-                            'success': False,
-                            'error': 'Заполните все обязательные поля'
+                            'success': True,
+                            'data': {
+                                **PASSWORD_METRICS.stats(),
+                                'login_limiter': LOGIN_LIMITER.stats(),
+                                'user_directory': USER_DIRECTORY.stats()
+                            }
                         }),
                         'isBase64Encoded': False
                     }
                 
-                cur.execute("SELECT id FROM users WHERE username = %s", (username,))
-                existing_user = cur.fetchone()
-                
-                if existing_user:
+                if query_params.get('action') == 'session':
+                    # Проверка токена клиента (например, при перезагрузке страницы)
                     cur.close()
-                    conn.close()
+                    if not request_token(event):
+                        raise AuthError('Требуется авторизация')
+                    
                     return {
-                        'statusCode': 409,
+                        'statusCode': 200,
                         'headers': {
                             'Content-Type': 'application/json',
                             'Access-Control-Allow-Origin': '*'
                         },
-                        'body': json.dumps({
-                            'success': False,
-                            'error': 'Пользователь с таким именем уже существует'
+                        'body': dumps({
+                            'success': True,
+                            'data': authenticate(event, conn)
                         }),
                         'isBase64Encoded': False
                     }
                 
-                password_hash = hash_password(password)
-                
-                cur.execute("""
-                    INSERT INTO users (username, full_name, rank, department, password_hash, role)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING id, username, full_name, rank, department, role
-                """, (username, full_name, rank, department, password_hash, 'officer'))
-                
-                new_user = cur.fetchone()
-                conn.commit()
                 cur.close()
-                conn.close()
+                
+                try:
+                    if query_params.get('action') == 'count':
+                        # Итоги для интерфейса без загрузки самого списка
+                        return {
+                            'statusCode': 200,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*'
+                            },
+                            'body': json.dumps({
+                                'success': True,
+                                'data': USER_DIRECTORY.count(conn, query_params)
+                            }),
+                            'isBase64Encoded': False
+                        }
+                    
+                    with stage('list'):
+                        users, next_cursor = USER_DIRECTORY.list(conn, query_params)
+                except ValueError as param_error:
+                    return {
+                        'statusCode': 400,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({
+                            'success': False,
+                            'error': str(param_error)
+                        }),
+                        'isBase64Encoded': False
+                    }
                 
                 return {
-                    'statusCode': 201,
+                    'statusCode': 200,
                     'headers': {
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps({
+                    'body': dumps({
                         'success': True,
-                        'message': 'Пользователь зарегистрирован',
-                        'data': dict(new_user)
-                    }, default=str),
+                        'data': users,
+                        'count': len(users),
+                        'next_cursor': next_cursor
+                    }),
                     'isBase64Encoded': False
                 }
-        
-        elif method == 'GET':
-            cur.execute("""
-                SELECT id, username, full_name, rank, department, role, is_active, created_at, last_login
-                FROM users
-                ORDER BY created_at DESC
-            """)
             
-            users = cur.fetchall()
             cur.close()
-            conn.close()
             
             return {
-                'statusCode': 200,
+                'statusCode': 405,
                 'headers': {
                     'Content-Type': 'application/json',
                     'Access-Control-Allow-Origin': '*'
                 },
-                'body': json.dumps({
-                    'success': True,
-                    'data': users,
-                    'count': len(users)
-                }, default=str),
+                'body': json.dumps({'error': 'Method not allowed'}),
                 'isBase64Encoded': False
             }
-        
-        cur.close()
-        conn.close()
-        
+            
+    except AuthError as auth_error:
         return {
-            'statusCode': 405,
+            'statusCode': auth_error.status_code,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({'error': 'Method not allowed'}),
+            'body': json.dumps({
+                'success': False,
+                'error': str(auth_error)
+            }),
             'isBase64Encoded': False
         }
-        
     except Exception as e:
+        log_error('auth', e)
         return {
             'statusCode': 500,
             'headers': {
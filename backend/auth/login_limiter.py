@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+from psycopg2.extras import execute_values
+
+# Лимиты попыток входа: (число попыток, длина окна в секундах) для логина и для адреса клиента.
+# Адрес допускает больше попыток: через NAT отдела при пересменке входит много сотрудников
+LOGIN_POLICIES: Dict[str, Tuple[int, int]] = {
+    'user': (
+        int(os.environ.get('LOGIN_USER_MAX_ATTEMPTS', '10')),
+        int(os.environ.get('LOGIN_USER_WINDOW', '900'))
+    ),
+    'ip': (
+        int(os.environ.get('LOGIN_IP_MAX_ATTEMPTS', '100')),
+        int(os.environ.get('LOGIN_IP_WINDOW', '60'))
+    )
+}
+
+LIMITER_MAX_KEYS = int(os.environ.get('LOGIN_LIMITER_MAX_KEYS', '50000'))
+
+# Синхронизация с таблицей: попытка копится в памяти, пока оценка ключа ниже доли LIMITER_SYNC_FRACTION лимита,
+# счёт ключа получен из таблицы меньше LIMITER_SYNC_INTERVAL секунд назад и неотправленных попыток меньше
+# LIMITER_SYNC_BATCH; иначе накопленное отправляется в таблицу одним запросом вместе с текущей попыткой
+LIMITER_SYNC_FRACTION = float(os.environ.get('LOGIN_LIMITER_SYNC_FRACTION', '0.5'))
+LIMITER_SYNC_INTERVAL = float(os.environ.get('LOGIN_LIMITER_SYNC_INTERVAL', '1'))
+LIMITER_SYNC_BATCH = int(os.environ.get('LOGIN_LIMITER_SYNC_BATCH', '100'))
+
+# Как часто (в синхронизациях) удалять из таблицы окна старше суток
+CLEANUP_EVERY = 1000
+
+
+class RateLimitExceeded(Exception):
+    """Превышен лимит попыток входа; retry_after — через сколько секунд повторить"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def source_ip(event: dict) -> str:
+    """Адрес клиента из requestContext шлюза"""
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    return identity.get('sourceIp') or ''
+
+
+class LoginLimiter:
+    """Скользящее окно попыток входа: счётчик в памяти отсекает превышение без запроса к базе,
+    таблица login_rate_limits делает счёт общим для всех экземпляров функции.
+    Вдали от лимита попытки пишутся в таблицу пачками: другие экземпляры видят их с задержкой
+    до sync_interval секунд, поэтому каждый экземпляр может добавить к общему счёту ключа не больше
+    примерно sync_fraction лимита незаметно для остальных; ближе к лимиту каждая попытка пишется сразу"""
+
+    def __init__(self, policies: Dict[str, Tuple[int, int]] = LOGIN_POLICIES, max_keys: int = LIMITER_MAX_KEYS,
+                 sync_fraction: float = LIMITER_SYNC_FRACTION, sync_interval: float = LIMITER_SYNC_INTERVAL,
+                 sync_batch: int = LIMITER_SYNC_BATCH):
+        self.policies = policies
+        self.max_keys = max_keys
+        self.sync_fraction = sync_fraction
+        self.sync_interval = sync_interval
+        self.sync_batch = sync_batch
+        # ключ → (номер окна, попыток в окне, попыток в предыдущем окне, время синхронизации с таблицей)
+        self._counters: OrderedDict = OrderedDict()
+        # (ключ, номер окна) → попыток, ещё не отправленных в таблицу
+        self._pending: Dict[Tuple[str, int], int] = {}
+        self._pending_hits = 0
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.deferred = 0
+        self.syncs = 0
+        self.rejected_local = 0
+        self.rejected_shared = 0
+
+    @staticmethod
+    def _estimate(window: int, now: float, current: int, previous: int) -> float:
+        """Попыток за последние window секунд: предыдущее окно учитывается пропорционально перекрытию"""
+        return previous * (1 - (now % window) / window) + current
+
+    def _local(self, key: str, window_id: int) -> Tuple[int, int, float]:
+        entry = self._counters.get(key)
+        if entry is None:
+            return 0, 0, 0.0
+        stored_window, current, previous, synced_at = entry
+        if stored_window == window_id:
+            return current, previous, synced_at
+        if stored_window == window_id - 1:
+            return 0, current, synced_at
+        return 0, 0, 0.0
+
+    def _store(self, key: str, window_id: int, current: int, previous: int, synced_at: float):
+        self._counters[key] = (window_id, current, previous, synced_at)
+        self._counters.move_to_end(key)
+        while len(self._counters) > self.max_keys:
+            self._counters.popitem(last=False)
+
+    def _add_pending(self, batch: Dict[Tuple[str, int], int]):
+        for item, hits in batch.items():
+            self._pending[item] = self._pending.get(item, 0) + hits
+            self._pending_hits += hits
+
+    def _reject(self, now: float, window: int):
+        raise RateLimitExceeded(
+            'Слишком много попыток входа, повторите позже',
+            retry_after=max(1, int(window - now % window))
+        )
+
+    def check(self, conn, username: str, ip: str):
+        """Учёт попытки входа до проверки пароля; RateLimitExceeded, если лимит логина или адреса исчерпан"""
+        now = time.time()
+        keys = {'user': username.lower(), 'ip': ip}
+        windows = {
+            f'{policy}:{value}': (limit, window, int(now // window))
+            for policy, value in keys.items() if value
+            for limit, window in [self.policies[policy]]
+        }
+
+        with self._lock:
+            self.checks += 1
+            local = {key: self._local(key, window_id) for key, (_, _, window_id) in windows.items()}
+            # Ключ уже над лимитом в этом экземпляре — отказ без обращения к базе
+            for key, (limit, window, _) in windows.items():
+                if self._estimate(window, now, *local[key][:2]) >= limit:
+                    self.rejected_local += 1
+                    self._reject(now, window)
+
+            # Счёт свежий и далёк от лимита — попытка копится в памяти до следующей синхронизации
+            if self._pending_hits < self.sync_batch and all(
+                now - local[key][2] < self.sync_interval
+                and self._estimate(window, now, local[key][0] + 1, local[key][1]) < limit * self.sync_fraction
+                for key, (limit, window, _) in windows.items()
+            ):
+                for key, (_, _, window_id) in windows.items():
+                    current, previous, synced_at = local[key]
+                    self._store(key, window_id, current + 1, previous, synced_at)
+                self._add_pending({(key, window_id): 1 for key, (_, _, window_id) in windows.items()})
+                self.deferred += 1
+                return
+
+            batch = self._pending
+            for key, (_, _, window_id) in windows.items():
+                batch[(key, window_id)] = batch.get((key, window_id), 0) + 1
+            self._pending = {}
+            self._pending_hits = 0
+            self.syncs += 1
+            cleanup = self.syncs % CLEANUP_EVERY == 0
+
+        try:
+            cur = conn.cursor()
+            rows = execute_values(cur, """
+                WITH hit AS (
+                    INSERT INTO login_rate_limits (key, window_id, attempts)
+                    VALUES %s
+                    ON CONFLICT (key, window_id) DO UPDATE
+                    SET attempts = login_rate_limits.attempts + EXCLUDED.attempts, updated_at = CURRENT_TIMESTAMP
+                    RETURNING key, window_id, attempts
+                )
+                SELECT hit.key, hit.window_id, hit.attempts, COALESCE(previous.attempts, 0) AS previous
+                FROM hit
+                LEFT JOIN login_rate_limits previous
+                    ON previous.key = hit.key AND previous.window_id = hit.window_id - 1
+            """, [(key, window_id, hits) for (key, window_id), hits in sorted(batch.items())], fetch=True)
+
+            if cleanup:
+                cur.execute("DELETE FROM login_rate_limits WHERE updated_at < NOW() - INTERVAL '1 day'")
+            # Попытки близко к лимиту фиксируются сразу: другие экземпляры должны видеть их до окончания проверки пароля
+            conn.commit()
+            cur.close()
+        except Exception:
+            # Неотправленные попытки (и текущая) уйдут со следующей синхронизацией
+            with self._lock:
+                self._add_pending(batch)
+            raise
+
+        exceeded = None
+        with self._lock:
+            for row in rows:
+                key, window_id = row['key'], row['window_id']
+                stored = self._counters.get(key)
+                if stored is not None and stored[0] > window_id:
+                    continue
+                # Попытки, отложенные другими потоками после снимка пачки, остаются в счёте
+                pending = self._pending.get((key, window_id), 0)
+                self._store(key, window_id, row['attempts'] + pending, row['previous'], now)
+                if key not in windows or windows[key][2] != window_id:
+                    continue
+                limit, window, _ = windows[key]
+                # Текущая попытка уже учтена в счётчике, поэтому сравнение строгое
+                if self._estimate(window, now, row['attempts'], row['previous']) > limit and exceeded is None:
+                    exceeded = window
+            if exceeded is not None:
+                self.rejected_shared += 1
+        if exceeded is not None:
+            self._reject(now, exceeded)
+
+    def reset_user(self, cur, username: str):
+        """Успешный вход обнуляет счётчик логина (ошибки ввода пароля до него не копятся)"""
+        key = f'user:{username.lower()}'
+        cur.execute("DELETE FROM login_rate_limits WHERE key = %s", (key,))
+        with self._lock:
+            self._counters.pop(key, None)
+            for item in [item for item in self._pending if item[0] == key]:
+                self._pending_hits -= self._pending.pop(item)
+
+    def stats(self) -> dict:
+        return {
+            'keys': len(self._counters),
+            'checks': self.checks,
+            'deferred': self.deferred,
+            'syncs': self.syncs,
+            'pending': self._pending_hits,
+            'rejected_local': self.rejected_local,
+            'rejected_shared': self.rejected_shared,
+            'policies': {policy: {'limit': limit, 'window': window} for policy, (limit, window) in self.policies.items()}
+        }
+
+
+# Один экземпляр на процесс: счётчики живут между тёплыми вызовами функции
+LOGIN_LIMITER = LoginLimiter()
@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+# Стоимость bcrypt (log2 числа раундов): хеши с другой стоимостью пересчитываются при входе
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+
+# Потоки для bcrypt: вычисление отпускает GIL, поэтому параллельные входы не выстраиваются в очередь
+# за одним ядром; ограничение пула не даёт всплеску входов занять все ядра функции
+PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Проверки пароля дольше порога (ожидание в пуле + bcrypt) пишутся в журнал одной строкой
+PASSWORD_SLOW_MS = float(os.environ.get('PASSWORD_SLOW_MS', '1000'))
+
+
+class PasswordMetrics:
+    """Счётчики и время операций с паролями в текущем процессе"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = {}
+
+    def record(self, operation: str, wait_ms: float, work_ms: float):
+        with self._lock:
+            stats = self.operations.setdefault(operation, {
+                'count': 0, 'wait_ms': 0.0, 'work_ms': 0.0, 'max_ms': 0.0
+            })
+            stats['count'] += 1
+            stats['wait_ms'] += wait_ms
+            stats['work_ms'] += work_ms
+            stats['max_ms'] = max(stats['max_ms'], wait_ms + work_ms)
+
+        if wait_ms + work_ms >= PASSWORD_SLOW_MS:
+            print(json.dumps({
+                'event': 'password_slow',
+                'operation': operation,
+                'wait_ms': round(wait_ms, 2),
+                'work_ms': round(work_ms, 2),
+                'rounds': BCRYPT_ROUNDS
+            }))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'rounds': BCRYPT_ROUNDS,
+                'workers': PASSWORD_WORKERS,
+                'operations': {
+                    operation: {
+                        'count': stats['count'],
+                        'avg_wait_ms': round(stats['wait_ms'] / stats['count'], 2),
+                        'avg_work_ms': round(stats['work_ms'] / stats['count'], 2),
+                        'max_ms': round(stats['max_ms'], 2)
+                    }
+                    for operation, stats in self.operations.items()
+                }
+            }
+
+
+# Один пул и одни метрики на процесс: живут между тёплыми вызовами функции
+PASSWORD_POOL = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix='bcrypt')
+PASSWORD_METRICS = PasswordMetrics()
+
+
+def _run(operation: str, function, *args):
+    """Выполнение bcrypt в пуле с учётом времени ожидания свободного потока и самой работы"""
+    submitted = time.perf_counter()
+    started = []
+
+    def task():
+        started.append(time.perf_counter())
+        return function(*args)
+
+    try:
+        return PASSWORD_POOL.submit(task).result()
+    finally:
+        finished = time.perf_counter()
+        began = started[0] if started else finished
+        PASSWORD_METRICS.record(operation, (began - submitted) * 1000, (finished - began) * 1000)
+
+
+def hash_password(password: str, rounds: int = None) -> str:
+    """Хеширование пароля с bcrypt (стоимость BCRYPT_ROUNDS)"""
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
+    return _run('hash', bcrypt.hashpw, password.encode('utf-8'), salt).decode()
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Проверка пароля; повреждённый хеш считается несовпадением"""
+    try:
+        return _run('verify', bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+    except (ValueError, TypeError, AttributeError):
+        # Хеш не строка bcrypt (NULL у учётной записи без пароля, мусор в колонке)
+        print(json.dumps({'event': 'password_hash_invalid'}))
+        return False
+
+
+def hash_rounds(password_hash: str) -> int:
+    """Стоимость из хеша вида $2b$12$..."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError, AttributeError):
+        return 0
+
+
+def needs_rehash(password_hash: str) -> bool:
+    return hash_rounds(password_hash) != BCRYPT_ROUNDS
@@ -0,0 +1,233 @@
+import hmac
+import json
+import os
+import random
+import time
+import traceback
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+from psycopg2.extras import RealDictCursor
+
+# Доля запросов с подробной трассировкой (этапы, SQL); 0 — трассируются только запросы с заголовком X-Trace
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0'))
+
+# Трассировку запроса включает заголовок X-Trace: 1 с действующей сессией в X-Authorization
+# или X-Trace со значением TRACE_SECRET (без сессии, для нагрузочных прогонов); пустой — только по сессии
+TRACE_SECRET = os.environ.get('TRACE_SECRET', '')
+
+# Заголовок Server-Timing в ответах трассируемых запросов (этапы видны во вкладке Network браузера)
+TRACE_SERVER_TIMING = os.environ.get('TRACE_SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+
+# Сколько символов SQL попадает в запись о самом медленном запросе
+TRACE_SQL_PREVIEW = 120
+
+# Трассировка текущего вызова; None — вызов не трассируется (этапы и запросы не учитываются)
+_current: ContextVar = ContextVar('request_trace', default=None)
+
+
+class RequestTrace:
+    """Этапы и SQL-запросы одного вызова функции"""
+
+    def __init__(self, function: str, method: str, action: str, request_id: Optional[str]):
+        self.function = function
+        self.method = method
+        self.action = action
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        # этап → [мс, число входов]; вложенные этапы (analyze → keywords) входят и во внешний
+        self.stages = {}
+        self.queries = 0
+        self.query_ms = 0.0
+        self.slowest_query_ms = 0.0
+        self.slowest_query = ''
+
+    def add_stage(self, name: str, elapsed_ms: float):
+        stats = self.stages.setdefault(name, [0.0, 0])
+        stats[0] += elapsed_ms
+        stats[1] += 1
+
+    def add_query(self, query, elapsed_ms: float):
+        self.queries += 1
+        self.query_ms += elapsed_ms
+        if elapsed_ms > self.slowest_query_ms:
+            self.slowest_query_ms = elapsed_ms
+            if isinstance(query, bytes):
+                # execute_values передаёт уже собранный запрос со значениями — в журнал они не попадают
+                text = query.decode('utf-8', 'replace')
+                values_at = text.upper().find('VALUES')
+                text = text[:values_at + len('VALUES')] + ' …' if values_at >= 0 else text
+            else:
+                text = str(query)
+            self.slowest_query = ' '.join(text.split())[:TRACE_SQL_PREVIEW]
+
+    def record(self, status: int, total_ms: float) -> dict:
+        return {
+            'event': 'request_trace',
+            'function': self.function,
+            'request_id': self.request_id,
+            'method': self.method,
+            'action': self.action,
+            'status': status,
+            'total_ms': round(total_ms, 2),
+            'stages': {name: round(elapsed_ms, 2) for name, (elapsed_ms, _) in self.stages.items()},
+            'queries': self.queries,
+            'query_ms': round(self.query_ms, 2),
+            'slowest_query': {'ms': round(self.slowest_query_ms, 2), 'sql': self.slowest_query} if self.queries else None
+        }
+
+    def server_timing(self, total_ms: float) -> str:
+        parts = [f'{name};dur={elapsed_ms:.2f}' for name, (elapsed_ms, _) in self.stages.items()]
+        parts.append(f'db;dur={self.query_ms:.2f};desc="{self.queries} queries"')
+        parts.append(f'total;dur={total_ms:.2f}')
+        return ', '.join(parts)
+
+
+class _Stage:
+    """Замер одного входа в этап трассируемого вызова"""
+    __slots__ = ('trace', 'name', 'started')
+
+    def __init__(self, trace: RequestTrace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.trace.add_stage(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+class _NoStage:
+    """Этап вне трассируемого вызова: общий объект без замера"""
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """Замер этапа обработки (with stage('rank'): ...); вне трассируемого вызова — только проверка контекста"""
+    trace = _current.get()
+    return _NO_STAGE if trace is None else _Stage(trace, name)
+
+
+class TracingCursor(RealDictCursor):
+    """Курсор пула: в трассируемом вызове учитывает число запросов, их время и самый медленный"""
+
+    def execute(self, query, vars=None):
+        trace = _current.get()
+        if trace is None:
+            return super().execute(query, vars)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            trace.add_query(query, (time.perf_counter() - started) * 1000)
+
+    def executemany(self, query, vars_list):
+        trace = _current.get()
+        if trace is None:
+            return super().executemany(query, vars_list)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            trace.add_query(query, (time.perf_counter() - started) * 1000)
+
+    def copy_expert(self, sql, file, size=8192):
+        trace = _current.get()
+        if trace is None:
+            return super().copy_expert(sql, file, size)
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            trace.add_query(sql, (time.perf_counter() - started) * 1000)
+
+
+def _header(event: dict, name: str) -> str:
+    """Заголовок запроса без учёта регистра имени"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name.lower():
+            return value or ''
+    return ''
+
+
+def _trace_requested(event: dict) -> bool:
+    """X-Trace от сотрудника с действующей сессией или с секретом TRACE_SECRET; анонимный X-Trace не учитывается"""
+    value = _header(event, 'X-Trace')
+    if not value:
+        return False
+    if TRACE_SECRET and hmac.compare_digest(value.encode(), TRACE_SECRET.encode()):
+        return True
+    if value != '1':
+        return False
+
+    # session_auth импортирует db, а db — этот модуль; сессия берётся из кэша процесса, и handler
+    # при своей проверке того же токена уже не обращается к базе
+    from session_auth import request_token, validate_token
+    token = request_token(event)
+    if not token:
+        return False
+    try:
+        return validate_token(token) is not None
+    except Exception:
+        # База недоступна: запрос обрабатывается без трассировки, ошибку вернёт проверка сессии в handler
+        return False
+
+
+def traced(function: str):
+    """Обёртка handler: решение о трассировке, запись request_trace в журнал и заголовок Server-Timing"""
+    def decorate(handler):
+        @wraps(handler)
+        def wrapper(event: dict, context) -> dict:
+            if not (TRACE_SAMPLE_RATE and random.random() < TRACE_SAMPLE_RATE) and not _trace_requested(event):
+                return handler(event, context)
+
+            trace = RequestTrace(
+                function,
+                event.get('httpMethod', 'GET'),
+                (event.get('queryStringParameters') or {}).get('action', ''),
+                getattr(context, 'request_id', None)
+            )
+            token = _current.set(trace)
+            try:
+                response = handler(event, context)
+            finally:
+                _current.reset(token)
+
+            total_ms = (time.perf_counter() - trace.started) * 1000
+            print(json.dumps(trace.record(response.get('statusCode', 0), total_ms), ensure_ascii=False))
+            if TRACE_SERVER_TIMING:
+                response['headers'] = {
+                    **(response.get('headers') or {}),
+                    'Server-Timing': trace.server_timing(total_ms),
+                    'Timing-Allow-Origin': '*'
+                }
+            return response
+        return wrapper
+    return decorate
+
+
+def log_error(function: str, error: Exception):
+    """Необработанная ошибка вызова одной строкой журнала: тип, сообщение и последние кадры стека"""
+    trace = _current.get()
+    print(json.dumps({
+        'event': 'request_error',
+        'function': function,
+        'request_id': trace.request_id if trace else None,
+        'error_type': type(error).__name__,
+        'error': str(error),
+        'frames': [
+            f'{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}'
+            for frame in traceback.extract_tb(error.__traceback__)[-5:]
+        ]
+    }, ensure_ascii=False))
@@ -0,0 +1,185 @@
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Сколько секунд страница списка живёт в памяти процесса: регистрация и вход сбрасывают кэш сразу,
+# изменения из других экземпляров функции становятся видны не позже
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '15'))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '500'))
+
+# Колонки справочника (password_hash не выдаётся никогда); параметр fields выбирает подмножество
+USER_COLUMNS = ['id', 'username', 'full_name', 'rank', 'department', 'role', 'is_active', 'created_at', 'last_login']
+
+# Ключ порядка и курсора: сотрудники без created_at идут последними (индексы V0026 построены по тому же выражению)
+CURSOR_CREATED_AT = "COALESCE(created_at, 'epoch'::timestamp)"
+
+
+def encode_cursor(row: dict) -> str:
+    """Курсор следующей страницы: (CURSOR_CREATED_AT, id) последней строки"""
+    raw = json.dumps([row['_cursor_created_at'].isoformat(), row['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбор курсора; некорректный курсор — ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (ValueError, TypeError):
+        raise ValueError('Некорректный курсор страницы')
+
+
+def parse_fields(value: str) -> List[str]:
+    """Запрошенные колонки в порядке USER_COLUMNS (без параметра — все)"""
+    if not value:
+        return USER_COLUMNS
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    if not fields:
+        return USER_COLUMNS
+    unknown = [field for field in fields if field not in USER_COLUMNS]
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+    return [column for column in USER_COLUMNS if column in fields]
+
+
+def user_filters(query_params: dict) -> Tuple[List[str], list]:
+    """Условия по отделу, роли и активности (индексы idx_users_department / idx_users_role)"""
+    conditions = []
+    params = []
+
+    if query_params.get('department'):
+        conditions.append("department = %s")
+        params.append(query_params['department'])
+
+    if query_params.get('role'):
+        conditions.append("role = %s")
+        params.append(query_params['role'])
+
+    if query_params.get('is_active') in ('1', 'true', '0', 'false'):
+        conditions.append("is_active = %s")
+        params.append(query_params['is_active'] in ('1', 'true'))
+
+    return conditions, params
+
+
+def list_users(conn, query_params: dict) -> Tuple[List[dict], Optional[str]]:
+    """Страница справочника сотрудников от новых к старым"""
+    limit = min(max(int(query_params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    columns = parse_fields(query_params.get('fields', ''))
+    conditions, params = user_filters(query_params)
+
+    if query_params.get('after'):
+        conditions.append(f"({CURSOR_CREATED_AT}, id) < (%s, %s)")
+        params.extend(decode_cursor(query_params['after']))
+
+    where = ' AND '.join(conditions) if conditions else 'TRUE'
+
+    # id и ключ курсора выбираются всегда, в ответ попадают только запрошенные колонки
+    selected = [column for column in USER_COLUMNS if column in columns or column == 'id']
+
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT {', '.join(selected)}, {CURSOR_CREATED_AT} AS _cursor_created_at
+        FROM users
+        WHERE {where}
+        ORDER BY {CURSOR_CREATED_AT} DESC, id DESC
+        LIMIT %s
+    """, params + [limit])
+    rows = cur.fetchall()
+    cur.close()
+
+    next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+    users = [{column: row[column] for column in columns} for row in rows]
+    return users, next_cursor
+
+
+def count_users(conn, query_params: dict) -> dict:
+    """Число сотрудников по тем же фильтрам, что и список, с разбивкой по ролям"""
+    conditions, params = user_filters(query_params)
+    where = ' AND '.join(conditions) if conditions else 'TRUE'
+
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT role, COUNT(*) AS users, COUNT(*) FILTER (WHERE is_active) AS active
+        FROM users
+        WHERE {where}
+        GROUP BY role
+    """, params)
+    rows = cur.fetchall()
+    cur.close()
+
+    return {
+        'total': sum(row['users'] for row in rows),
+        'active': sum(row['active'] for row in rows),
+        'by_role': {row['role']: row['users'] for row in rows}
+    }
+
+
+class UserDirectoryCache:
+    """Кэш страниц и счётчиков справочника на USER_CACHE_TTL секунд; ключ — нормализованные параметры запроса"""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _cached(self, key: tuple, load):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self.invalidations
+
+        value = load()
+
+        with self._lock:
+            # Результат, прочитанный до сброса кэша, не сохраняется: он мог не увидеть новую запись
+            if generation == self.invalidations:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[key] = (now, value)
+        return value
+
+    def list(self, conn, query_params: dict) -> Tuple[List[dict], Optional[str]]:
+        key = ('list',) + tuple(sorted((k, str(v)) for k, v in query_params.items() if k != 'action'))
+        return self._cached(key, lambda: list_users(conn, query_params))
+
+    def count(self, conn, query_params: dict) -> dict:
+        key = ('count',) + tuple(sorted((k, str(v)) for k, v in query_params.items() if k != 'action'))
+        return self._cached(key, lambda: count_users(conn, query_params))
+
+    def invalidate(self):
+        """Сброс после изменения пользователей в этом процессе (регистрация, вход)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'ttl_seconds': self.ttl
+        }
+
+
+# Один экземпляр на процесс: живёт между тёплыми вызовами функции
+USER_DIRECTORY = UserDirectoryCache()
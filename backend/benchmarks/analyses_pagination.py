@@ -0,0 +1,210 @@
+"""Список анализов на миллионе дел: задержка страниц по курсору (created_at, id) и фильтров против прежнего запроса.
+
+Запуск (нужен только сервер PostgreSQL: база mvd_bench_* создаётся из db_migrations и удаляется по окончании):
+    python backend/benchmarks/analyses_pagination.py --server-url postgresql://postgres:@/postgres?host=/tmp/pgdata \\
+        --analyses 1000000 --iterations 50
+
+Дела вставляются напрямую в crime_analyses (generate_series, по делу каждые 30 секунд): полные описание
+и analysis_result, две статьи УК РФ на дело, документ у каждого десятого. Сценарии вызывают handler
+функции analysis (GET списка) и печатают p50/p95 задержки:
+    first_page, page_100, middle_page — страница с начала, после 100 страниц и с середины списка (курсор);
+    status, officer, category, article, date_range — фильтры V0016 на первой странице;
+    rare_article — статья, которой квалифицированы только 20 самых старых дел (конец списка);
+    legacy_first_page, legacy_offset_* — прежний запрос (ca.*, COUNT(*) по документам на строку,
+        ORDER BY created_at DESC LIMIT 50) и та же глубина страниц через OFFSET.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+PAGE_SIZE = 50
+STATUSES = ['pending', 'completed', 'archived']
+RARE_ARTICLE_CASES = 20
+
+LEGACY_SQL = """
+    SELECT
+        ca.*,
+        u.full_name as officer_name,
+        u.rank as officer_rank,
+        (SELECT COUNT(*) FROM document_attachments WHERE analysis_id = ca.id) as document_count
+    FROM crime_analyses ca
+    LEFT JOIN users u ON ca.officer_id = u.id
+    WHERE 1=1
+    ORDER BY ca.created_at DESC LIMIT 50 OFFSET %s
+"""
+
+
+def seed(dsn: str, analyses: int) -> dict:
+    started = time.perf_counter()
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO users (username, full_name, department, role, password_hash, created_at)
+        SELECT 'pager' || g, 'Сотрудник ' || g, 'Отдел полиции № ' || (g % 20 + 1), 'officer',
+               '$2b$12$' || repeat('x', 53), '2024-01-01'
+        FROM generate_series(1, 100) g
+    """)
+    cur.execute("SELECT array_agg(id ORDER BY id) FROM users WHERE username LIKE 'pager%'")
+    officers = cur.fetchone()[0]
+    categories = sorted({category for category, _ in harness.CRIME_TYPES})
+    cur.execute("""
+        INSERT INTO crime_analyses (
+            case_number, incident_date, category, description, evidence, analysis_result,
+            status, officer_id, created_at, updated_at
+        )
+        SELECT
+            'PAGE-' || g,
+            DATE '2022-01-01' + (g::bigint * 7919 %% 1460)::int,
+            (%(categories)s::text[])[g %% %(category_count)s + 1],
+            repeat('Гражданин похитил мобильный телефон из сумки потерпевшей в автобусе. ', 12),
+            'Показания свидетелей, видеозапись',
+            jsonb_build_object('summary', repeat('Анализ дела. ', 40), 'articles', jsonb_build_array(158, 161)),
+            (%(statuses)s::text[])[g %% 3 + 1],
+            (%(officers)s::int[])[g %% 100 + 1],
+            TIMESTAMP '2022-01-01' + g * INTERVAL '30 seconds',
+            TIMESTAMP '2022-01-01' + g * INTERVAL '30 seconds'
+        FROM generate_series(1, %(analyses)s) g
+    """, {'categories': categories, 'category_count': len(categories), 'statuses': STATUSES,
+          'officers': officers, 'analyses': analyses})
+    # Последняя статья редкая: ею квалифицированы только RARE_ARTICLE_CASES самых старых дел
+    cur.execute("""
+        INSERT INTO analysis_articles (analysis_id, article_type, article_id, relevance_score)
+        SELECT ca.id, 'uk_rf', articles.ids[(ca.id * k) % (array_length(articles.ids, 1) - 1) + 1], 0.8
+        FROM crime_analyses ca,
+             (SELECT array_agg(id ORDER BY id) AS ids FROM uk_rf_articles) articles,
+             generate_series(1, 2) k
+    """)
+    cur.execute("""
+        INSERT INTO analysis_articles (analysis_id, article_type, article_id, relevance_score)
+        SELECT ca.id, 'uk_rf', (SELECT max(id) FROM uk_rf_articles), 0.8
+        FROM crime_analyses ca
+        ORDER BY ca.created_at, ca.id
+        LIMIT %s
+    """, (RARE_ARTICLE_CASES,))
+    cur.execute("""
+        INSERT INTO document_attachments (analysis_id, file_name, file_type, file_size, extracted_text)
+        SELECT id, 'protocol_' || id || '.txt', 'TXT', 2048, 'Протокол осмотра места происшествия'
+        FROM crime_analyses
+        WHERE id % 10 = 0
+    """)
+    conn.commit()
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE")
+    conn.close()
+    return {'analyses': analyses, 'seconds': round(time.perf_counter() - started, 1)}
+
+
+def cursor_at(cur, encode_cursor, offset: int) -> str:
+    """Курсор страницы, начинающейся со строки offset (как если бы клиент пролистал до неё)"""
+    cur.execute("""
+        SELECT created_at, id FROM crime_analyses
+        ORDER BY created_at DESC, id DESC
+        OFFSET %s LIMIT 1
+    """, (offset - 1,))
+    return encode_cursor(cur.fetchone())
+
+
+def measure(call, iterations: int) -> dict:
+    call()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': harness.percentile(latencies, 50), 'p95_ms': harness.percentile(latencies, 95)}
+
+
+def scenarios(dsn: str, analyses: int) -> dict:
+    index, db = harness.load_function('analysis')
+    encode_cursor = sys.modules['analyses_list'].encode_cursor
+    conn = psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+    cur.execute("SELECT article_number FROM uk_rf_articles ORDER BY id LIMIT 1")
+    article = cur.fetchone()['article_number']
+    cur.execute("SELECT article_number FROM uk_rf_articles ORDER BY id DESC LIMIT 1")
+    rare_article = cur.fetchone()['article_number']
+    cur.execute("SELECT officer_id FROM crime_analyses LIMIT 1")
+    officer = cur.fetchone()['officer_id']
+    cur.execute("SELECT category FROM crime_analyses LIMIT 1")
+    category = cur.fetchone()['category']
+
+    def page(params: dict, expected: int = PAGE_SIZE):
+        def call():
+            response = index.handler({'httpMethod': 'GET', 'queryStringParameters': {'limit': str(PAGE_SIZE), **params}}, None)
+            assert response['statusCode'] == 200, response['body']
+            assert json.loads(response['body'])['count'] == expected
+        return call
+
+    def legacy(offset: int):
+        def call():
+            cur.execute(LEGACY_SQL, (offset,))
+            assert len(cur.fetchall()) == PAGE_SIZE
+        return call
+
+    page_100, middle = 100 * PAGE_SIZE, analyses // 2
+    cases = {
+        'first_page': page({}),
+        'page_100': page({'after': cursor_at(cur, encode_cursor, page_100)}),
+        'middle_page': page({'after': cursor_at(cur, encode_cursor, middle)}),
+        'status': page({'status': 'completed'}),
+        'officer': page({'officer_id': str(officer)}),
+        'category': page({'category': category}),
+        'article': page({'article': article}),
+        'rare_article': page({'article': rare_article}, RARE_ARTICLE_CASES),
+        'date_range': page({'date_from': '2023-03-01', 'date_to': '2023-03-31'}),
+        'legacy_first_page': legacy(0),
+        'legacy_offset_page_100': legacy(page_100),
+        'legacy_offset_middle_page': legacy(middle)
+    }
+    return cases, (index, db, conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--server-url', required=True, help='DSN служебной базы сервера (postgres)')
+    parser.add_argument('--analyses', type=int, default=1000000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--keep', action='store_true', help='не удалять базу после прогона')
+    args = parser.parse_args()
+
+    dsn = harness.create_database(args.server_url)
+    os.environ['DATABASE_URL'] = dsn
+    results = {}
+    try:
+        # Журнальные строки функции уходят в stderr: stdout остаётся под JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            skipped = harness.apply_migrations(dsn)
+            seeded = seed(dsn, args.analyses)
+            harness.log(json.dumps({'seeded': seeded}))
+            cases, (index, db, conn) = scenarios(dsn, args.analyses)
+            for name, call in cases.items():
+                results[name] = measure(call, args.iterations)
+                harness.log(json.dumps({name: results[name]}))
+            conn.close()
+            harness.close_pool(db)
+    finally:
+        if not args.keep:
+            harness.drop_database(args.server_url, dsn)
+
+    print(json.dumps({
+        'benchmark': 'analyses_pagination',
+        'analyses': args.analyses,
+        'page_size': PAGE_SIZE,
+        'iterations': args.iterations,
+        'skipped_migration_statements': skipped,
+        'scenarios': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,503 @@
+"""Нагрузочный прогон функций analysis, auth и legislation: handler(event, context) вызывается напрямую.
+
+Запуск (нужен только сервер PostgreSQL: база mvd_bench_* создаётся из db_migrations и удаляется по окончании):
+    python backend/benchmarks/harness.py --server-url postgresql://postgres:@/postgres?host=/tmp/pgdata \\
+        --scale 1 --iterations 200 --output harness.json --compare harness-previous.json
+
+Сценарии — запросы из tests.json каждой функции и синтетическая нагрузка (список, карточка и создание дел,
+статистика, похожие дела, разбор документа, справочник сотрудников, поиск статей). Объём данных задаётся
+--scale: 1000 дел, 200 статей, 500 документов и 100 сотрудников на единицу.
+
+Результат — JSON с p50/p95/p99 задержки, числом SQL-запросов на вызов и выделениями памяти (tracemalloc)
+по каждому сценарию; --compare печатает в stderr отношение к результату предыдущего коммита.
+"""
+import argparse
+import base64
+import contextlib
+import glob
+import hashlib
+import importlib
+import json
+import os
+import re
+import secrets
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date, timedelta
+from urllib.parse import parse_qsl
+
+import numpy as np
+import psycopg2
+from psycopg2.extensions import make_dsn, parse_dsn
+from psycopg2.extras import execute_values
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+BACKEND = os.path.join(ROOT, 'backend')
+MIGRATIONS = os.path.join(ROOT, 'db_migrations')
+FUNCTIONS = ['analysis', 'auth', 'legislation']
+
+# Прогон измеряет стоимость обработчиков, а не блокировку входа: повторы tests.json не должны упираться в лимиты
+os.environ.setdefault('LOGIN_USER_MAX_ATTEMPTS', '1000000000')
+os.environ.setdefault('LOGIN_IP_MAX_ATTEMPTS', '1000000000')
+os.environ.setdefault('PASSWORD_SLOW_MS', '1e9')
+
+# Объекты расширений, которых может не быть в локальной сборке PostgreSQL: такие операторы миграций пропускаются
+EXTENSION_MARKERS = {
+    'pg_trgm': ['pg_trgm', 'gin_trgm_ops', 'gist_trgm_ops']
+}
+
+CRIME_TYPES = [
+    ('Преступления против собственности', 'похитил мобильный телефон из сумки потерпевшей'),
+    ('Преступления против собственности', 'открыто похитил золотую цепочку применив насилие'),
+    ('Преступления против собственности', 'путём обмана завладел денежными средствами по телефону'),
+    ('Преступления против жизни и здоровья', 'причинил тяжкий вред здоровью ударив ножом'),
+    ('Преступления против здоровья населения', 'сбыл наркотическое средство в крупном размере'),
+    ('Преступления против безопасности движения', 'управлял автомобилем в состоянии опьянения совершив наезд'),
+]
+PLACES = ['рынке', 'вокзале', 'автобусе', 'магазине', 'парке', 'подъезде', 'метро', 'кафе']
+SEVERITIES = ['Небольшой тяжести', 'Средней тяжести', 'Тяжкое', 'Особо тяжкое']
+DEPARTMENTS = [f'Отдел полиции № {i}' for i in range(1, 21)]
+
+
+def log(message: str):
+    print(message, file=sys.stderr)
+
+
+def percentile(values: list, q: float) -> float:
+    return round(float(np.percentile(values, q)), 3) if values else 0.0
+
+
+# --- Временная база ---------------------------------------------------------------------------
+
+def migration_files() -> list:
+    """Миграции по номеру версии (V0001__..., V0002__...)"""
+    def version(path: str) -> int:
+        return int(re.match(r'V(\d+)__', os.path.basename(path)).group(1))
+    return sorted(glob.glob(os.path.join(MIGRATIONS, 'V*__*.sql')), key=version)
+
+
+def create_database(server_url: str) -> str:
+    """Пустая база mvd_bench_<pid> на сервере server_url; возвращается её DSN"""
+    name = f'mvd_bench_{os.getpid()}'
+    conn = psycopg2.connect(server_url)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f'DROP DATABASE IF EXISTS {name}')
+    cur.execute(f'CREATE DATABASE {name}')
+    conn.close()
+    return make_dsn(server_url, dbname=name)
+
+
+def drop_database(server_url: str, dsn: str):
+    conn = psycopg2.connect(server_url)
+    conn.autocommit = True
+    conn.cursor().execute(f"DROP DATABASE IF EXISTS {parse_dsn(dsn)['dbname']} WITH (FORCE)")
+    conn.close()
+
+
+def apply_migrations(dsn: str) -> list:
+    """Все миграции по порядку; операторы с недоступными расширениями пропускаются (список возвращается)"""
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM pg_available_extensions")
+    available = {row[0] for row in cur.fetchall()}
+    markers = [marker for extension, names in EXTENSION_MARKERS.items() if extension not in available for marker in names]
+
+    skipped = []
+    for path in migration_files():
+        sql = open(path, encoding='utf-8').read()
+        if any(marker in sql for marker in markers):
+            # Такие миграции разбиваются на операторы; процедурных блоков ($$) в них нет
+            statements = [statement for statement in sql.split(';') if statement.strip()]
+            kept = [statement for statement in statements if not any(marker in statement for marker in markers)]
+            skipped.extend(f'{os.path.basename(path)}: {statement.strip().splitlines()[-1]}'
+                           for statement in statements if statement not in kept)
+            sql = ';'.join(kept)
+        cur.execute(sql)
+    conn.commit()
+    conn.close()
+    return skipped
+
+
+def admin_headers(dsn: str) -> dict:
+    """X-Authorization с новой сессией администратора из V0001: импорт и служебные действия требуют сессии всегда"""
+    token = secrets.token_urlsafe(32)
+    conn = psycopg2.connect(dsn)
+    conn.cursor().execute("""
+        INSERT INTO sessions (token_hash, user_id, expires_at)
+        SELECT %s, id, NOW() + INTERVAL '1 day'
+        FROM users
+        WHERE username = 'admin'
+    """, (hashlib.sha256(token.encode()).hexdigest(),))
+    conn.commit()
+    conn.close()
+    return {'X-Authorization': token}
+
+
+# --- Загрузка функций ---------------------------------------------------------------------------
+
+def function_modules() -> set:
+    """Имена модулей всех функций: общие файлы (db, session_auth, index...) у каждой функции свои"""
+    return {
+        os.path.splitext(os.path.basename(path))[0]
+        for function in FUNCTIONS
+        for path in glob.glob(os.path.join(BACKEND, function, '*.py'))
+    }
+
+
+# Запросы и их время в текущем вызове (сбрасываются перед каждым замером)
+QUERY_COUNTER = {'queries': 0, 'query_ms': 0.0}
+
+
+def counting_cursor(base):
+    """Подкласс курсора пула функции (tracing.TracingCursor), считающий все запросы без трассировки"""
+    class CountingCursor(base):
+        def _timed(self, method, *args):
+            started = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                QUERY_COUNTER['queries'] += 1
+                QUERY_COUNTER['query_ms'] += (time.perf_counter() - started) * 1000
+
+        def execute(self, query, vars=None):
+            return self._timed(super().execute, query, vars)
+
+        def executemany(self, query, vars_list):
+            return self._timed(super().executemany, query, vars_list)
+
+        def copy_expert(self, sql, file, size=8192):
+            return self._timed(super().copy_expert, sql, file, size)
+
+    return CountingCursor
+
+
+def load_function(function: str):
+    """index функции с чистым sys.modules: одноимённые модули других функций не подхватываются"""
+    for name in function_modules():
+        sys.modules.pop(name, None)
+    directory = os.path.join(BACKEND, function)
+    sys.path.insert(0, directory)
+    try:
+        db = importlib.import_module('db')
+        db.TracingCursor = counting_cursor(db.TracingCursor)
+        return importlib.import_module('index'), db
+    finally:
+        sys.path.remove(directory)
+
+
+def close_pool(db):
+    if db._pool is not None:
+        db._pool._pool.closeall()
+        db._pool = None
+
+
+# --- Данные ---------------------------------------------------------------------------
+
+def case_text(rng) -> tuple:
+    category, action = CRIME_TYPES[int(rng.integers(len(CRIME_TYPES)))]
+    description = (f'Гражданин {action} на {PLACES[int(rng.integers(len(PLACES)))]}, '
+                   f'ущерб {int(rng.integers(1, 500)) * 1000} рублей, эпизод {int(rng.integers(1_000_000))}')
+    return category, description
+
+
+def seed(dsn: str, scale: float, rng) -> dict:
+    """Сотрудники, статьи и документы — напрямую в базу; дела — через импорт функции analysis"""
+    volumes = {
+        'cases': int(1000 * scale),
+        'articles': int(200 * scale),
+        'documents': int(500 * scale),
+        'users': int(100 * scale)
+    }
+    started = time.perf_counter()
+
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    execute_values(cur, """
+        INSERT INTO users (username, full_name, department, role, password_hash, created_at)
+        VALUES %s
+    """, [
+        (f'officer{i}', f'Сотрудник {i}', DEPARTMENTS[i % len(DEPARTMENTS)],
+         'admin' if i % 25 == 0 else 'officer', '$2b$12$' + 'x' * 53, '2024-01-01T00:00:00')
+        for i in range(volumes['users'])
+    ])
+    execute_values(cur, """
+        INSERT INTO uk_rf_articles (article_number, title, category, severity, full_text)
+        VALUES %s
+        ON CONFLICT (article_number) DO NOTHING
+    """, [
+        (str(1000 + i), f'Синтетическая статья {i}', CRIME_TYPES[i % len(CRIME_TYPES)][0],
+         SEVERITIES[i % len(SEVERITIES)], ' '.join(case_text(rng)[1] for _ in range(3)))
+        for i in range(volumes['articles'])
+    ])
+    conn.commit()
+
+    analysis, db = load_function('analysis')
+    lines = []
+    for i in range(volumes['cases']):
+        category, description = case_text(rng)
+        lines.append(json.dumps({
+            'case_number': f'SEED-{i:07d}',
+            'incident_date': (date(2023, 1, 1) + timedelta(days=int(rng.integers(900)))).isoformat(),
+            'category': category,
+            'description': description,
+            'evidence': 'Показания свидетелей, видеозапись',
+            'officer_id': 1
+        }, ensure_ascii=False))
+    response = analysis.handler({
+        'httpMethod': 'POST',
+        'queryStringParameters': {'action': 'import'},
+        'headers': admin_headers(dsn),
+        'body': '\n'.join(lines)
+    }, None)
+    if response['statusCode'] != 200:
+        raise RuntimeError(f"Импорт дел не удался: {response['body']}")
+    close_pool(db)
+
+    cur.execute("SELECT id FROM crime_analyses")
+    analysis_ids = [row[0] for row in cur.fetchall()]
+    execute_values(cur, """
+        INSERT INTO document_attachments (analysis_id, file_name, file_type, file_size, extracted_text)
+        VALUES %s
+    """, [
+        (analysis_ids[int(rng.integers(len(analysis_ids)))], f'protocol_{i}.txt', 'TXT', 2048,
+         ' '.join(case_text(rng)[1] for _ in range(10)))
+        for i in range(volumes['documents'])
+    ])
+    cur.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+    volumes['seconds'] = round(time.perf_counter() - started, 2)
+    volumes['analysis_ids'] = analysis_ids
+    return volumes
+
+
+# --- Сценарии ---------------------------------------------------------------------------
+
+def event(method: str, path: str, body=None, headers=None) -> dict:
+    query = path.split('?', 1)[1] if '?' in path else ''
+    result = {
+        'httpMethod': method,
+        'queryStringParameters': dict(parse_qsl(query)),
+        'headers': headers or {}
+    }
+    if body is not None:
+        result['body'] = body if isinstance(body, str) else json.dumps(body, ensure_ascii=False)
+    return result
+
+
+def tests_scenarios(function: str) -> list:
+    """Запросы из tests.json; case_number получает номер повтора — поле уникально в crime_analyses"""
+    scenarios = []
+    with open(os.path.join(BACKEND, function, 'tests.json'), encoding='utf-8') as f:
+        for test in json.load(f)['tests']:
+            def make(rng, i, test=test):
+                body = test.get('body')
+                if isinstance(body, dict) and 'case_number' in body:
+                    body = {**body, 'case_number': f"{body['case_number']}-{i}"}
+                return event(test['method'], test['path'], body)
+            scenarios.append({'name': test['name'], 'source': 'tests', 'expected': test['expectedStatus'], 'make': make})
+    return scenarios
+
+
+def synthetic_scenarios(function: str, seeded: dict) -> list:
+    analysis_ids = seeded['analysis_ids']
+
+    def pick_id(rng) -> str:
+        return str(analysis_ids[int(rng.integers(len(analysis_ids)))])
+
+    def create_case(rng, i):
+        category, description = case_text(rng)
+        return event('POST', '/', {
+            'case_number': f'LOAD-{i:07d}-{int(rng.integers(1_000_000))}',
+            'incident_date': '2025-06-01',
+            'category': category,
+            'description': description,
+            'evidence': 'Протокол осмотра места происшествия'
+        })
+
+    def parse_text(rng, i):
+        # Новый текст на каждом вызове: измеряется разбор, а не попадание в кэш документов
+        text = '\n'.join(case_text(rng)[1] for _ in range(20)) + f'\nВызов {i}'
+        return event('POST', '/?action=parse', {
+            'file_data': base64.b64encode(text.encode('utf-8')).decode(),
+            'file_name': f'load_{i}.txt'
+        })
+
+    scenarios = {
+        'analysis': [
+            ('Список дел, первая страница', lambda rng, i: event('GET', '/?limit=50')),
+            ('Список дел по категории', lambda rng, i: event('GET', '/?' + 'category=' + CRIME_TYPES[i % len(CRIME_TYPES)][0])),
+            ('Карточка дела', lambda rng, i: event('GET', '/?analysis_id=' + pick_id(rng))),
+            ('Создание дела', create_case),
+            ('Статистика панели', lambda rng, i: event('GET', '/?action=stats')),
+            ('Похожие дела', lambda rng, i: event('GET', '/?action=similar&analysis_id=' + pick_id(rng))),
+            ('Разбор TXT', parse_text),
+        ],
+        'auth': [
+            ('Справочник, страница', lambda rng, i: event('GET', '/?limit=50')),
+            ('Справочник по отделу', lambda rng, i: event('GET', '/?department=' + DEPARTMENTS[i % len(DEPARTMENTS)])),
+            ('Число сотрудников', lambda rng, i: event('GET', '/?action=count')),
+            ('Вход несуществующего сотрудника', lambda rng, i: event('POST', '/', {
+                'action': 'login', 'username': f'nobody{i}', 'password': 'wrong'
+            })),
+        ],
+        'legislation': [
+            ('Статьи УК РФ, страница', lambda rng, i: event('GET', '/?type=uk_rf&limit=50')),
+            ('Поиск статьи', lambda rng, i: event('GET', f'/?type=uk_rf&search={1000 + i % max(1, seeded["articles"])}')),
+            ('Статьи УПК РФ', lambda rng, i: event('GET', '/?type=upk_rf')),
+        ]
+    }
+    return [{'name': name, 'source': 'synthetic', 'expected': None, 'make': make} for name, make in scenarios[function]]
+
+
+# --- Замеры ---------------------------------------------------------------------------
+
+def run_scenario(index, scenario: dict, rng, iterations: int, warmup: int, alloc_iterations: int) -> dict:
+    """Задержка и запросы — на iterations вызовах, выделения памяти — отдельным проходом под tracemalloc"""
+    for i in range(warmup):
+        index.handler(scenario['make'](rng, i), None)
+
+    latencies, queries, query_ms, statuses = [], [], [], Counter()
+    for i in range(warmup, warmup + iterations):
+        request = scenario['make'](rng, i)
+        QUERY_COUNTER.update(queries=0, query_ms=0.0)
+        started = time.perf_counter()
+        response = index.handler(request, None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(QUERY_COUNTER['queries'])
+        query_ms.append(QUERY_COUNTER['query_ms'])
+        statuses[response['statusCode']] += 1
+
+    peaks, retained = [], []
+    tracemalloc.start()
+    for i in range(warmup + iterations, warmup + iterations + alloc_iterations):
+        request = scenario['make'](rng, i)
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        index.handler(request, None)
+        after, peak = tracemalloc.get_traced_memory()
+        peaks.append((peak - before) / 1024)
+        retained.append((after - before) / 1024)
+    tracemalloc.stop()
+
+    result = {
+        'name': scenario['name'],
+        'source': scenario['source'],
+        'iterations': iterations,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'mean': round(float(np.mean(latencies)), 3)
+        },
+        'queries_per_request': {'mean': round(float(np.mean(queries)), 2), 'max': int(max(queries))},
+        'query_ms_mean': round(float(np.mean(query_ms)), 3),
+        'alloc_kib': {
+            'peak_p50': round(float(np.median(peaks)), 1) if peaks else 0.0,
+            'retained_mean': round(float(np.mean(retained)), 1) if retained else 0.0
+        }
+    }
+    if scenario['expected'] is not None:
+        result['unexpected_status'] = iterations - statuses[scenario['expected']]
+    return result
+
+
+def compare(results: list, previous_path: str):
+    """Отношение p50/p95 и разница числа запросов к сохранённому прогону"""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = {(r['function'], r['name']): r for r in json.load(f)['scenarios']}
+    log(f"\nСравнение с {previous_path} (отношение текущий/прошлый):")
+    for result in results:
+        before = previous.get((result['function'], result['name']))
+        if before is None:
+            continue
+        ratios = [
+            result['latency_ms'][q] / before['latency_ms'][q] if before['latency_ms'][q] else float('nan')
+            for q in ('p50', 'p95')
+        ]
+        queries = result['queries_per_request']['mean'] - before['queries_per_request']['mean']
+        log(f"  {result['function']:<12} {result['name']:<40} p50 x{ratios[0]:.2f}  p95 x{ratios[1]:.2f}  запросов {queries:+.2f}")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--server-url', default=os.environ.get('BENCH_SERVER_URL', 'postgresql://postgres@localhost/postgres'))
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--alloc-iterations', type=int, default=20)
+    parser.add_argument('--functions', nargs='+', default=FUNCTIONS, choices=FUNCTIONS)
+    parser.add_argument('--output', default='')
+    parser.add_argument('--compare', default='')
+    parser.add_argument('--keep', action='store_true', help='не удалять базу после прогона')
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    commit = git_commit()
+    dsn = create_database(args.server_url)
+    os.environ['DATABASE_URL'] = dsn
+    log(f'База {parse_dsn(dsn)["dbname"]}')
+
+    try:
+        # Журнальные строки функций (загрузка кэшей и т. п.) уходят в stderr: stdout остаётся под JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            skipped = apply_migrations(dsn)
+            for statement in skipped:
+                log(f'Пропущено (нет расширения): {statement}')
+            seeded = seed(dsn, args.scale, rng)
+            log(f"Данные: {seeded['cases']} дел, {seeded['articles']} статей, {seeded['documents']} документов, "
+                f"{seeded['users']} сотрудников за {seeded['seconds']} с")
+
+            results = []
+            for function in args.functions:
+                index, db = load_function(function)
+                for scenario in tests_scenarios(function) + synthetic_scenarios(function, seeded):
+                    result = run_scenario(index, scenario, rng, args.iterations, args.warmup, args.alloc_iterations)
+                    result['function'] = function
+                    results.append(result)
+                    log(f"{function:<12} {result['name']:<40} p50 {result['latency_ms']['p50']:>8.2f} мс  "
+                        f"p99 {result['latency_ms']['p99']:>8.2f} мс  запросов {result['queries_per_request']['mean']:>5.1f}  "
+                        f"пик {result['alloc_kib']['peak_p50']:>8.1f} КиБ")
+                close_pool(db)
+    finally:
+        if not args.keep:
+            drop_database(args.server_url, dsn)
+
+    report = {
+        'benchmark': 'harness',
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'scale': args.scale,
+        'iterations': args.iterations,
+        'data': {key: value for key, value in seeded.items() if key != 'analysis_ids'},
+        'skipped_statements': skipped,
+        'scenarios': results
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        log(f'Результат сохранён в {args.output}')
+    else:
+        print(output)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Пропускная способность импорта архива дел: POST на каждое дело против action=import пачками.
+
+Запуск (нужен только сервер PostgreSQL: база mvd_bench_* создаётся из db_migrations и удаляется по окончании):
+    python backend/benchmarks/import_throughput.py --server-url postgresql://postgres:@/postgres?host=/tmp/pgdata \\
+        --sizes 1000 10000 100000 --batch-sizes 100 500 2000 --single 300
+
+single — --single дел по одному POST-запросу (как до импорта); import — NDJSON из --sizes дел для каждого
+размера пачки ?batch_size=. Дела — те же синтетические протоколы, что в harness.py, номера уникальны.
+Печатаются дела/с и время вызова; для импорта ещё число пачек и строк с ошибками (должно быть 0).
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+
+def case(rng, case_number: str) -> dict:
+    category, description = harness.case_text(rng)
+    return {
+        'case_number': case_number,
+        'incident_date': '2025-06-01',
+        'category': category,
+        'description': description,
+        'evidence': 'Показания свидетелей, видеозапись',
+        'officer_id': 1
+    }
+
+
+def single(index, rng, count: int) -> dict:
+    started = time.perf_counter()
+    for i in range(count):
+        response = index.handler({
+            'httpMethod': 'POST',
+            'body': json.dumps(case(rng, f'SINGLE-{i:07d}'), ensure_ascii=False)
+        }, None)
+        if response['statusCode'] != 201:
+            raise RuntimeError(f"Создание дела не удалось: {response['body']}")
+    elapsed = time.perf_counter() - started
+    return {'cases': count, 'seconds': round(elapsed, 2), 'cases_per_second': round(count / elapsed, 1)}
+
+
+def bulk(index, rng, size: int, batch_size: int, headers: dict) -> dict:
+    body = '\n'.join(
+        json.dumps(case(rng, f'IMPORT-{batch_size}-{size}-{i:07d}'), ensure_ascii=False) for i in range(size)
+    )
+    started = time.perf_counter()
+    response = index.handler({
+        'httpMethod': 'POST',
+        'queryStringParameters': {'action': 'import', 'batch_size': str(batch_size)},
+        'headers': headers,
+        'body': body
+    }, None)
+    elapsed = time.perf_counter() - started
+    if response['statusCode'] != 200:
+        raise RuntimeError(f"Импорт не удался: {response['body']}")
+    stats = json.loads(response['body'])['data']
+    return {
+        'cases': size,
+        'batch_size': batch_size,
+        'batches': stats['batches'],
+        'failed': stats['failed'],
+        'seconds': round(elapsed, 2),
+        'cases_per_second': round(stats['imported'] / elapsed, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--server-url', required=True, help='DSN служебной базы сервера (postgres)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--single', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=13)
+    parser.add_argument('--keep', action='store_true', help='не удалять базу после прогона')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    dsn = harness.create_database(args.server_url)
+    os.environ['DATABASE_URL'] = dsn
+    try:
+        # Журнальные строки функции уходят в stderr: stdout остаётся под JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            skipped = harness.apply_migrations(dsn)
+            index, db = harness.load_function('analysis')
+            headers = harness.admin_headers(dsn)
+            results = {'single': single(index, rng, args.single), 'import': []}
+            harness.log(json.dumps({'single': results['single']}, ensure_ascii=False))
+            for size in args.sizes:
+                for batch_size in args.batch_sizes:
+                    result = bulk(index, rng, size, batch_size, headers)
+                    results['import'].append(result)
+                    harness.log(json.dumps({'import': result}, ensure_ascii=False))
+            harness.close_pool(db)
+    finally:
+        if not args.keep:
+            harness.drop_database(args.server_url, dsn)
+
+    print(json.dumps({
+        'benchmark': 'import_throughput',
+        'skipped_migration_statements': skipped,
+        'results': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Сериализация списка анализов с analysis_result: json.dumps(default=str) против модуля serialization.
+
+Запуск на локальной базе, собранной из db_migrations (дела SER-* добавляются на время замера и удаляются):
+    DATABASE_URL=postgresql://... python backend/benchmarks/json_serialization.py --iterations 200
+
+Строки — колонки списка дел (LIST_COLUMNS), фамилия сотрудника и analysis_result, по 50 и 1000 строк.
+Каждый вариант замеряется целиком (SELECT + fetchall + тело ответа) и по частям:
+    baseline — JSONB разбирается драйвером в dict, тело собирает json.dumps(..., default=str);
+    raw_json — JSONB остаётся текстом (RawJSON), тело собирает стандартный json;
+    raw_orjson — то же через orjson (если установлен 3.9+ с orjson.Fragment).
+Тела всех вариантов после json.loads совпадают — это проверяется перед замером.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+
+import index  # noqa: E402
+import serialization  # noqa: E402
+from analyses_list import LIST_COLUMNS  # noqa: E402
+from tracing import TracingCursor  # noqa: E402
+
+SER_PREFIX = 'SER-'
+ROW_COUNTS = [50, 1000]
+
+DESCRIPTIONS = [
+    ('Преступления против собственности', 'Неизвестный тайно похитил мобильный телефон из сумки потерпевшей в автобусе'),
+    ('Преступления против собственности', 'Путём обмана по телефону завладел денежными средствами пенсионерки'),
+    ('Преступления против жизни и здоровья', 'В ходе ссоры причинил тяжкий вред здоровью, ударив ножом'),
+    ('Преступления против здоровья населения', 'Незаконно сбыл наркотическое средство в крупном размере'),
+]
+
+QUERY = f"""
+    SELECT {LIST_COLUMNS}, ca.analysis_result, u.full_name AS officer_name
+    FROM crime_analyses ca
+    LEFT JOIN users u ON ca.officer_id = u.id
+    ORDER BY ca.created_at DESC, ca.id DESC
+    LIMIT %s
+"""
+
+
+def seed(conn, rows: int):
+    """Дела SER-* с результатами настоящего анализа (по одному на каждое описание, повторяются по кругу)"""
+    results = [
+        (category, description, json.dumps(index.analyze_crime(description, category, '', conn), ensure_ascii=False))
+        for category, description in DESCRIPTIONS
+    ]
+    cur = conn.cursor()
+    execute_values(cur, """
+        INSERT INTO crime_analyses (case_number, incident_date, category, description, evidence, analysis_result, status)
+        VALUES %s
+    """, [
+        (f'{SER_PREFIX}{i}', '2026-01-23', category, description, '', result, 'completed')
+        for i, (category, description, result) in ((i, results[i % len(results)]) for i in range(rows))
+    ])
+    conn.commit()
+    cur.close()
+
+
+def cleanup(conn):
+    cur = conn.cursor()
+    cur.execute("DELETE FROM crime_analyses WHERE case_number LIKE %s", (SER_PREFIX + '%',))
+    conn.commit()
+    cur.close()
+
+
+def variants() -> dict:
+    # Прежний путь: драйвер разбирает JSONB, json.dumps обходит dict и вызывает str() для дат
+    result = {
+        'baseline': (False, lambda body: json.dumps(body, default=str)),
+        'raw_json': (True, serialization._JSON_ENCODER.encode)
+    }
+    if serialization.orjson is not None and hasattr(serialization.orjson, 'Fragment'):
+        result['raw_orjson'] = (True, serialization._dumps_orjson)
+    return result
+
+
+def run(conn, limit: int, dumps) -> tuple:
+    """Время запроса и время сборки тела ответа в мс; тело — для сверки вариантов"""
+    started = time.perf_counter()
+    cur = conn.cursor()
+    cur.execute(QUERY, (limit,))
+    rows = cur.fetchall()
+    cur.close()
+    fetched = time.perf_counter()
+    body = dumps({'success': True, 'data': rows, 'count': len(rows), 'next_cursor': None})
+    finished = time.perf_counter()
+    return (fetched - started) * 1000, (finished - fetched) * 1000, body
+
+
+def measure(connections: dict, iterations: int) -> dict:
+    results = {}
+    for limit in ROW_COUNTS:
+        bodies = {name: run(connections[raw], limit, dumps)[2] for name, (raw, dumps) in variants().items()}
+        reference = json.loads(bodies['baseline'])
+        for name, body in bodies.items():
+            if json.loads(body) != reference:
+                sys.exit(f'Тело варианта {name} расходится с baseline на {limit} строках')
+
+        timings = {name: {'fetch': [], 'serialize': []} for name in bodies}
+        for _ in range(iterations):
+            # Варианты чередуются внутри итерации: дрейф нагрузки делится между ними поровну
+            for name, (raw, dumps) in variants().items():
+                fetch_ms, serialize_ms, _ = run(connections[raw], limit, dumps)
+                timings[name]['fetch'].append(fetch_ms)
+                timings[name]['serialize'].append(serialize_ms)
+
+        baseline_total = float(np.median(np.add(timings['baseline']['fetch'], timings['baseline']['serialize'])))
+        results[f'rows_{limit}'] = {
+            name: {
+                'fetch_p50_ms': round(float(np.median(parts['fetch'])), 3),
+                'serialize_p50_ms': round(float(np.median(parts['serialize'])), 3),
+                'total_p50_ms': round(float(np.median(np.add(parts['fetch'], parts['serialize']))), 3),
+                'speedup': round(baseline_total / float(np.median(np.add(parts['fetch'], parts['serialize']))), 2),
+                'body_bytes': len(bodies[name].encode())
+            }
+            for name, parts in timings.items()
+        }
+        print(json.dumps({limit: results[f'rows_{limit}']}, ensure_ascii=False), file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    # Оба соединения с курсором пула; JSONB как текст — только у второго
+    parsed = psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=TracingCursor)
+    raw = psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=TracingCursor)
+    serialization.register_raw_jsonb(raw)
+    connections = {False: parsed, True: raw}
+
+    # Журнальные строки функции (загрузка кэшей) уходят в stderr: stdout остаётся под JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        cleanup(parsed)
+        try:
+            seed(parsed, max(ROW_COUNTS))
+            results = measure(connections, args.iterations)
+        finally:
+            cleanup(parsed)
+    parsed.close()
+    raw.close()
+
+    print(json.dumps({
+        'benchmark': 'json_serialization',
+        'iterations': args.iterations,
+        'orjson': serialization.orjson.__version__ if serialization.orjson is not None else None,
+        'results': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Поиск ключевых слов: прежний цикл подстрок (keyword in text) против KeywordMatcher на текстах 1 КБ – 1 МБ.
+
+Запуск на локальной базе, собранной из db_migrations (словарь читается из keyword_article_map):
+    DATABASE_URL=postgresql://... python backend/benchmarks/keyword_matching.py --repeat 20
+
+Текст — слова протоколов вперемешку с ключевыми фразами (около 2% слов), числами и знаками препинания.
+Два профиля текста:
+    typical — в тексте TYPICAL_KEYWORDS разных ключевых слов, как в реальном протоколе или приложенном PDF;
+    dense — встречается весь словарь.
+Для каждого размера печатается среднее время вызова обоих вариантов и время этапов матчера
+(разбиение на слова, коды лемм уникальных слов, цепочки лемм).
+
+Точка пересечения. Матчер линеен по числу слов текста и не зависит от размера словаря. Цикл подстрок
+делает одну проверку `in` на ключевое слово: отсутствующее слово сканирует весь текст, найденное —
+только до первого вхождения. Поэтому цикл стоит примерно (число отсутствующих ключевых слов) × (один
+проход строки). В профиле dense у цикла почти нет отсутствующих слов, и на больших текстах он быстрее
+матчера. В профиле typical отсутствует почти весь словарь, и матчер выигрывает на любом размере.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+
+from keyword_matcher import KeywordMatcher  # noqa: E402
+from lemmatizer import PHRASE_BREAK  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+KEYWORD_DENSITY = 0.02
+TYPICAL_KEYWORDS = 5
+
+FILLER = (
+    'гражданин гражданка потерпевший потерпевшая пояснил пояснила около часов находясь в районе дома по улице '
+    'неизвестный мужчина женщина подошёл подошла к ней нему и после чего скрылся скрылась с места происшествия '
+    'на место прибыла следственно-оперативная группа в ходе осмотра обнаружены изъяты следы рук обуви '
+    'свидетель показал что видел как автомобиль остановился у подъезда сотрудники полиции задержали '
+    'проведена экспертиза установлено заявление зарегистрировано в книге учёта сообщений о происшествиях'
+).split()
+PUNCTUATION = [',', '.', ' —', ':', ';']
+
+
+def load_keywords() -> dict:
+    conn = psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT keyword, article_number, weight
+        FROM keyword_article_map
+        WHERE article_type = 'uk_rf' AND is_active
+        ORDER BY id
+    """)
+    keywords_map = {}
+    for row in cur.fetchall():
+        keywords_map.setdefault(row['keyword'], {})[row['article_number']] = float(row['weight'])
+    conn.close()
+    return keywords_map
+
+
+def make_text(size: int, keywords: list, rng: random.Random) -> str:
+    """Текст протокола размером около size символов"""
+    parts = []
+    length = 0
+    while length < size:
+        roll = rng.random()
+        if roll < KEYWORD_DENSITY:
+            word = rng.choice(keywords)
+        elif roll < 0.06:
+            word = str(rng.randint(1, 99999))
+        else:
+            word = rng.choice(FILLER)
+        if rng.random() < 0.08:
+            word += rng.choice(PUNCTUATION)
+        parts.append(word)
+        length += len(word) + 1
+    return ' '.join(parts)[:size]
+
+
+def substring_loop(keywords_map: dict, text: str) -> tuple:
+    """Поиск до KeywordMatcher: одна проверка подстроки на каждое ключевое слово"""
+    matched_keywords = []
+    keyword_articles = {}
+    for keyword, articles in keywords_map.items():
+        if keyword in text:
+            matched_keywords.append(keyword)
+            for article, weight in articles.items():
+                keyword_articles[article] = max(keyword_articles.get(article, 0.0), weight)
+    return matched_keywords, keyword_articles
+
+
+def mean_ms(function, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def matcher_stages(matcher: KeywordMatcher, text: str, repeat: int) -> dict:
+    """Время этапов find(): split, коды лемм уникальных слов (кэш тёплый), склейка и разрезание
+    строки кодов на цепочки; остаток до matcher_ms — проход автомата по уникальным цепочкам"""
+    words = text.split()
+    codes = matcher.lemmas.encode(words)
+    runs = set(''.join(map(codes.__getitem__, words)).split(PHRASE_BREAK))
+    return {
+        'split_ms': round(mean_ms(lambda: text.split(), repeat), 3),
+        'encode_ms': round(mean_ms(lambda: matcher.lemmas.encode(words), repeat), 3),
+        'runs_ms': round(mean_ms(lambda: set(''.join(map(codes.__getitem__, words)).split(PHRASE_BREAK)), repeat), 3),
+        'words': len(words),
+        'unique_words': len(codes),
+        'unique_runs': len(runs)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    keywords_map = load_keywords()
+    started = time.perf_counter()
+    matcher = KeywordMatcher(keywords_map)
+    build_ms = (time.perf_counter() - started) * 1000
+    rng = random.Random(args.seed)
+
+    profiles = {
+        'typical': rng.sample(list(keywords_map), TYPICAL_KEYWORDS),
+        'dense': list(keywords_map)
+    }
+
+    results = {}
+    for profile, keywords in profiles.items():
+        results[profile] = {}
+        for size in SIZES:
+            text = make_text(size, keywords, rng)
+            matcher.match(text)  # прогрев кэшей лемм и кодов слов
+            loop_ms = mean_ms(lambda: substring_loop(keywords_map, text), args.repeat)
+            matcher_ms = mean_ms(lambda: matcher.match(text), args.repeat)
+            results[profile][f'{size // 1000}kb'] = {
+                'loop_ms': round(loop_ms, 3),
+                'matcher_ms': round(matcher_ms, 3),
+                'speedup': round(loop_ms / matcher_ms, 2),
+                'matcher_stages': matcher_stages(matcher, text, args.repeat)
+            }
+            print(json.dumps({profile: {size: results[profile][f'{size // 1000}kb']}}, ensure_ascii=False), file=sys.stderr)
+
+    print(json.dumps({
+        'benchmark': 'keyword_matching',
+        'keywords': len(keywords_map),
+        'matcher_build_ms': round(build_ms, 2),
+        'repeat': args.repeat,
+        'results': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
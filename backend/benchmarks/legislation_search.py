@@ -0,0 +1,168 @@
+"""Поиск по законодательству на 100 000 статей: планы EXPLAIN и задержка против прежнего ILIKE.
+
+Запуск (нужен только сервер PostgreSQL: база mvd_bench_* создаётся из db_migrations и удаляется по окончании):
+    python backend/benchmarks/legislation_search.py --server-url postgresql://postgres:@/postgres?host=/tmp/pgdata \\
+        --rows 100000 --iterations 50
+
+Таблица uk_rf_articles добивается до --rows статей: номера '1', '1.1' … '1.9', '2', …, тексты и категории
+берутся по кругу из настоящих статей УК РФ. Для каждого запроса печатаются:
+    search_ms — p50 запроса функции legislation (search_sql: GIN по search_vector OR префикс номера);
+    ilike_ms — p50 прежнего запроса (article_number ILIKE '%q%' OR title ILIKE '%q%');
+    plan — EXPLAIN (ANALYZE, BUFFERS) запроса функции;
+    plan_without_prefix_index — тот же план, когда ни один индекс не обслуживает LIKE по номеру
+        (так выглядит база с сортировкой не C без индекса varchar_pattern_ops): индексы удаляются в
+        транзакции, которая затем откатывается.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, '..', 'legislation'))
+sys.path.insert(0, BENCHMARKS)
+
+import harness  # noqa: E402
+from index import search_sql  # noqa: E402
+from legislation_cache import LEGISLATION_COLUMNS  # noqa: E402
+
+QUERIES = {
+    'word': 'кража',
+    'phrase': 'тяжкий вред здоровью',
+    'number_prefix': '158',
+    'exact_number': '105.1'
+}
+
+# Прежний запрос функции legislation (до полнотекстового поиска)
+ILIKE_SQL = """
+    SELECT * FROM uk_rf_articles
+    WHERE (article_number ILIKE %s OR title ILIKE %s)
+    ORDER BY article_number
+"""
+
+
+def seed_articles(dsn: str, rows: int) -> int:
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("SELECT title, category, severity, full_text FROM uk_rf_articles ORDER BY id")
+    sources = cur.fetchall()
+    cur.execute("SELECT COUNT(*) FROM uk_rf_articles")
+    missing = rows - cur.fetchone()[0]
+
+    generated = []
+    number = 0
+    while len(generated) < missing * 1.01 + 100:
+        major, minor = number // 10 + 1, number % 10
+        generated.append((f'{major}.{minor}' if minor else str(major),) + sources[number % len(sources)])
+        number += 1
+    # Номера настоящих статей пропускаются (ON CONFLICT), лишние последние строки удаляются
+    execute_values(cur, """
+        INSERT INTO uk_rf_articles (article_number, title, category, severity, full_text)
+        VALUES %s
+        ON CONFLICT (article_number) DO NOTHING
+    """, generated, page_size=5000)
+    cur.execute("""
+        DELETE FROM uk_rf_articles
+        WHERE id IN (SELECT id FROM uk_rf_articles ORDER BY id DESC LIMIT GREATEST((SELECT COUNT(*) FROM uk_rf_articles) - %s, 0))
+    """, (rows,))
+    cur.execute("SELECT COUNT(*) FROM uk_rf_articles")
+    total = cur.fetchone()[0]
+    conn.commit()
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE uk_rf_articles")
+    conn.close()
+    return total
+
+
+def explain(cur, sql: str, params: list) -> list:
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+    return [row['QUERY PLAN'] for row in cur.fetchall()]
+
+
+def measure(dsn: str, iterations: int) -> dict:
+    conn = psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+    fields = [column.strip() for column in LEGISLATION_COLUMNS['uk_rf'].split(',')]
+    results = {}
+
+    for name, text in QUERIES.items():
+        sql, params = search_sql('uk_rf', fields, text, '', None, None, 0)
+        ilike_params = [f'%{text}%', f'%{text}%']
+
+        timings = {'search': [], 'ilike': []}
+        counts = {}
+        for _ in range(iterations):
+            # Запросы чередуются: кэш страниц PostgreSQL прогрет одинаково для обоих
+            for variant, (variant_sql, variant_params) in (('search', (sql, params)), ('ilike', (ILIKE_SQL, ilike_params))):
+                started = time.perf_counter()
+                cur.execute(variant_sql, variant_params)
+                counts[variant] = len(cur.fetchall())
+                timings[variant].append((time.perf_counter() - started) * 1000)
+
+        plan = explain(cur, sql, params)
+
+        # План без индекса под LIKE: удаляются все B-деревья, начинающиеся с article_number или содержащие его
+        cur.execute("""
+            SELECT indexname, EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conname = indexname
+            ) AS is_constraint
+            FROM pg_indexes
+            WHERE tablename = 'uk_rf_articles' AND indexdef LIKE '%%btree%%' AND indexdef LIKE '%%article_number%%'
+        """)
+        for index in cur.fetchall():
+            if index['is_constraint']:
+                cur.execute(f"ALTER TABLE uk_rf_articles DROP CONSTRAINT {index['indexname']}")
+            else:
+                cur.execute(f"DROP INDEX {index['indexname']}")
+        plan_without_prefix_index = explain(cur, sql, params)
+        conn.rollback()
+
+        results[name] = {
+            'query': text,
+            'rows': counts['search'],
+            'ilike_rows': counts['ilike'],
+            'search_ms': round(float(np.median(timings['search'])), 3),
+            'ilike_ms': round(float(np.median(timings['ilike'])), 3),
+            'plan': plan,
+            'plan_without_prefix_index': plan_without_prefix_index
+        }
+        print(json.dumps({name: {key: value for key, value in results[name].items() if 'plan' not in key}},
+                         ensure_ascii=False), file=sys.stderr)
+
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--server-url', required=True, help='DSN служебной базы сервера (postgres)')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--keep', action='store_true', help='не удалять базу после прогона')
+    args = parser.parse_args()
+
+    dsn = harness.create_database(args.server_url)
+    try:
+        skipped = harness.apply_migrations(dsn)
+        total = seed_articles(dsn, args.rows)
+        results = measure(dsn, args.iterations)
+    finally:
+        if not args.keep:
+            harness.drop_database(args.server_url, dsn)
+
+    print(json.dumps({
+        'benchmark': 'legislation_search',
+        'articles': total,
+        'iterations': args.iterations,
+        'skipped_migration_statements': skipped,
+        'queries': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Полнота и задержка поиска ключевых слов: точное совпадение подстрок против KeywordMatcher по леммам.
+
+Запуск на локальной базе, собранной из db_migrations (словарь читается из keyword_article_map):
+    DATABASE_URL=postgresql://... python backend/benchmarks/lemma_recall.py --repeat 20
+
+Полнота — доля ожидаемых статей, найденных по словарю, на коротких протоколах со словоформами,
+которых нет в словаре дословно («кражу», «угнали машину», «мошенничества»). Лишние статьи
+(найденные, но не ожидаемые) печатаются рядом: лемматизация не должна покупать полноту ложными
+срабатываниями. Задержка — среднее время вызова на протоколах из 1 000 и 10 000 слов с тёплыми
+кэшами лемм и с холодными (первый вызов после старта экземпляра функции).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+
+from keyword_matcher import KeywordMatcher  # noqa: E402
+from keyword_matching import load_keywords, mean_ms, substring_loop  # noqa: E402
+from lemmatizer import lemmatize  # noqa: E402
+
+# Протокол → статьи, которые словарь должен найти
+REPORTS = [
+    ('Гражданин совершил кражу мобильного телефона из сумки потерпевшей', {'158'}),
+    ('Неизвестные угнали машину, припаркованную во дворе дома', {'166'}),
+    ('Задержан за сбыт наркотических средств в крупном размере', {'228', '228.1'}),
+    ('Неизвестные совершили мошенничества с банковскими картами пенсионеров', {'159'}),
+    ('Поступило сообщение о нападениях на прохожих в парке', {'162'}),
+    ('Группа лиц совершила грабежи в торговом центре', {'161'}),
+    ('Установлены факты вымогательства денег у предпринимателей', {'163'}),
+    ('Чиновник получил взятку от директора строительной компании', {'290'}),
+    ('Директор дал взятку инспектору за выдачу разрешения', {'291'}),
+    ('Водитель сбил пешехода и скрылся с места происшествия', {'264', '265'}),
+    ('Мужчина избил соседа, причинив тяжкий вред здоровью', {'111'}),
+    ('Обнаружен притон для употребления наркотиков', {'232'}),
+    ('Подозреваемый совершил поджоги двух автомобилей', {'167'}),
+    ('Несовершеннолетнего задержали за изнасилования', {'131'}),
+]
+
+
+def recall(keywords_map: dict, matcher: KeywordMatcher) -> dict:
+    results = {}
+    for name, search in (
+        ('exact', lambda text: substring_loop(keywords_map, text)),
+        ('lemmas', matcher.match)
+    ):
+        expected_total = found_total = extra_total = 0
+        misses = []
+        for text, expected in REPORTS:
+            _, keyword_articles = search(text.lower())
+            found = expected & set(keyword_articles)
+            expected_total += len(expected)
+            found_total += len(found)
+            extra_total += len(set(keyword_articles) - expected)
+            if found != expected:
+                misses.append(text)
+        results[name] = {
+            'recall': round(found_total / expected_total, 3),
+            'found': f'{found_total}/{expected_total}',
+            'extra_articles': extra_total,
+            'missed_reports': misses
+        }
+    return results
+
+
+def report_text(words: int) -> str:
+    """Протокол заданной длины из тех же предложений"""
+    sentences = [text.lower() for text, _ in REPORTS]
+    parts = []
+    count = 0
+    while count < words:
+        sentence = sentences[len(parts) % len(sentences)]
+        parts.append(sentence + '.')
+        count += len(sentence.split())
+    return ' '.join(parts)
+
+
+def latency(keywords_map: dict, repeat: int) -> dict:
+    results = {}
+    for words in (1_000, 10_000):
+        text = report_text(words)
+
+        # Холодный вызов: новый автомат (пустой кэш кодов слов) и сброшенный LRU-кэш лемм
+        cold = []
+        for _ in range(repeat):
+            matcher = KeywordMatcher(keywords_map)
+            lemmatize.cache_clear()
+            started = time.perf_counter()
+            matcher.match(text)
+            cold.append((time.perf_counter() - started) * 1000)
+
+        results[f'{words}_words'] = {
+            'exact_ms': round(mean_ms(lambda: substring_loop(keywords_map, text), repeat), 3),
+            'lemmas_warm_ms': round(mean_ms(lambda: matcher.match(text), repeat), 3),
+            'lemmas_cold_ms': round(sum(cold) / len(cold), 3)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    keywords_map = load_keywords()
+    matcher = KeywordMatcher(keywords_map)
+
+    print(json.dumps({
+        'benchmark': 'lemma_recall',
+        'keywords': len(keywords_map),
+        'reports': len(REPORTS),
+        'recall': recall(keywords_map, matcher),
+        'latency': latency(keywords_map, args.repeat)
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
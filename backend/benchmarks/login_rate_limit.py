@@ -0,0 +1,187 @@
+"""Подбор паролей на 10 000 попыток в минуту против лимитера входа функции auth.
+
+Запуск на локальной базе, собранной из db_migrations (сотрудники bench_* и их счётчики удаляются по окончании):
+    DATABASE_URL=postgresql://... python backend/benchmarks/login_rate_limit.py --rate 10000 --duration 60
+
+Пропущенные лимитером попытки к существующим учётным записям проходят bcrypt с BCRYPT_ROUNDS функции:
+на машине с одним ядром именно они ограничивают темп (BCRYPT_ROUNDS=10 — чтобы измерить сам лимитер).
+
+Атака: перебор паролей к --targets логинам (доля --existing — реальные учётные записи) с --attacker-ips адресов.
+Параллельно входят --legit сотрудников со своих адресов, часть из них (--legit-attacked) — под атакой.
+Результат — JSON: исходы попыток, задержки, сколько проверок bcrypt выполнено и сколько отсечено лимитером,
+доля успешных входов у сотрудников вне атаки и под ней.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'auth'))
+
+# Пропущенные лимитером входы ждут пул bcrypt — журнал медленных проверок замеры не засоряет
+os.environ.setdefault('PASSWORD_SLOW_MS', '1e9')
+
+import index  # noqa: E402
+from db import db_connection  # noqa: E402
+from login_limiter import LOGIN_LIMITER  # noqa: E402
+from password_service import PASSWORD_METRICS, hash_password  # noqa: E402
+
+PASSWORD = 'Смена-0800-пароль'
+BENCH_PREFIX = 'bench_'
+ATTACKER_NET = '203.0.113.'
+OFFICE_NET = '198.51.100.'
+
+
+def percentile(values: list, q: float) -> float:
+    return round(float(np.percentile(values, q)), 2) if values else 0.0
+
+
+def create_users(usernames: list):
+    password_hash = hash_password(PASSWORD)
+    with db_connection() as conn:
+        cur = conn.cursor()
+        for username in usernames:
+            cur.execute("""
+                INSERT INTO users (username, full_name, password_hash, role)
+                VALUES (%s, %s, %s, 'officer')
+                ON CONFLICT (username) DO NOTHING
+            """, (username, f'Сотрудник {username}', password_hash))
+        conn.commit()
+        cur.close()
+
+
+def cleanup():
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            DELETE FROM sessions
+            WHERE user_id IN (SELECT id FROM users WHERE username LIKE %s)
+        """, (BENCH_PREFIX + '%',))
+        cur.execute("DELETE FROM users WHERE username LIKE %s", (BENCH_PREFIX + '%',))
+        cur.execute("""
+            DELETE FROM login_rate_limits
+            WHERE key LIKE %s OR key LIKE %s OR key LIKE %s
+        """, ('user:' + BENCH_PREFIX + '%', 'ip:' + ATTACKER_NET + '%', 'ip:' + OFFICE_NET + '%'))
+        conn.commit()
+        cur.close()
+
+
+def schedule(rng, args) -> list:
+    """Попытки (группа, логин, пароль, адрес) в порядке отправки: вход сотрудника — каждая legit_every-я"""
+    targets = [f'{BENCH_PREFIX}target{i}' for i in range(args.targets)]
+    legit = [f'{BENCH_PREFIX}officer{i}' for i in range(args.legit)]
+    # Сотрудники под атакой попадают в список перебираемых логинов
+    targets[:args.legit_attacked] = legit[:args.legit_attacked]
+
+    total = args.rate * args.duration // 60
+    legit_logins = args.legit * args.logins_per_officer
+    legit_every = max(1, total // max(1, legit_logins))
+
+    attempts = []
+    for i in range(total):
+        if i % legit_every == 0 and legit_logins:
+            legit_logins -= 1
+            officer = int(rng.integers(args.legit))
+            group = 'legit_attacked' if officer < args.legit_attacked else 'legit'
+            attempts.append((group, legit[officer], PASSWORD, OFFICE_NET + str(1 + officer % 250)))
+        else:
+            attempts.append((
+                'attack',
+                targets[int(rng.integers(args.targets))],
+                f'guess{i}',
+                ATTACKER_NET + str(1 + int(rng.integers(args.attacker_ips)))
+            ))
+    existing = targets[:int(args.targets * args.existing)] + legit
+    return attempts, sorted(set(existing))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rate', type=int, default=10000, help='попыток в минуту')
+    parser.add_argument('--duration', type=int, default=60, help='секунд')
+    parser.add_argument('--targets', type=int, default=200)
+    parser.add_argument('--existing', type=float, default=0.25)
+    parser.add_argument('--attacker-ips', type=int, default=50)
+    parser.add_argument('--legit', type=int, default=20)
+    parser.add_argument('--legit-attacked', type=int, default=5)
+    parser.add_argument('--logins-per-officer', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    attempts, existing = schedule(rng, args)
+    cleanup()
+    create_users(existing)
+    verify_before = PASSWORD_METRICS.stats()['operations'].get('verify', {}).get('count', 0)
+    print(f'{len(attempts)} попыток, {len(existing)} учётных записей', file=sys.stderr)
+
+    interval = 60.0 / args.rate
+    outcomes = Counter()
+    latencies = defaultdict(list)
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def attempt(item):
+        i, (group, username, password, ip) = item
+        delay = started + i * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        sent = time.perf_counter()
+        response = index.handler({
+            'httpMethod': 'POST',
+            'body': json.dumps({'action': 'login', 'username': username, 'password': password}),
+            'requestContext': {'identity': {'sourceIp': ip}}
+        }, None)
+        elapsed_ms = (time.perf_counter() - sent) * 1000
+        with lock:
+            outcomes[(group, response['statusCode'])] += 1
+            latencies[response['statusCode']].append(elapsed_ms)
+            if i and i % 2000 == 0:
+                print(f'{i} попыток, {time.perf_counter() - started:.1f} с', file=sys.stderr)
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as clients:
+            list(clients.map(attempt, enumerate(attempts)))
+        elapsed = time.perf_counter() - started
+    finally:
+        cleanup()
+
+    verify = PASSWORD_METRICS.stats()['operations'].get('verify', {})
+    verified = verify.get('count', 0) - verify_before
+    # Без лимитера каждая попытка к существующей учётной записи дошла бы до bcrypt
+    existing_set = set(existing)
+    attempts_on_existing = sum(1 for _, username, _, _ in attempts if username in existing_set)
+
+    def success_rate(group):
+        total = sum(count for (g, _), count in outcomes.items() if g == group)
+        return round(outcomes[(group, 200)] / total, 4) if total else None
+
+    print(json.dumps({
+        'benchmark': 'login_rate_limit',
+        'attempts': len(attempts),
+        'elapsed_seconds': round(elapsed, 2),
+        'attempts_per_minute': round(len(attempts) / elapsed * 60),
+        'outcomes': {f'{group}:{status}': count for (group, status), count in sorted(outcomes.items())},
+        'latency_ms': {
+            str(status): {'count': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95), 'p99': percentile(values, 99)}
+            for status, values in sorted(latencies.items())
+        },
+        'bcrypt': {
+            'verified': verified,
+            'avoided': attempts_on_existing - verified,
+            'avg_work_ms': verify.get('avg_work_ms', 0.0)
+        },
+        'legit_success_rate': {'not_attacked': success_rate('legit'), 'attacked': success_rate('legit_attacked')},
+        'limiter': LOGIN_LIMITER.stats()
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Пропускная способность входа: проверки пароля bcrypt в секунду при стоимости 10 и 12.
+
+Запуск (база не нужна — измеряется сервис паролей функции auth):
+    python backend/benchmarks/login_throughput.py --rounds 10 12 --logins 200 --concurrency 1 8
+
+Для каждой стоимости: последовательные проверки в одном потоке (как до пула) и всплеск
+параллельных входов через PASSWORD_POOL. Результат — JSON с входами/с и задержками.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'auth'))
+
+# Во всплеске почти каждая проверка «медленная» из-за ожидания в пуле — журнал замеры не засоряет
+os.environ.setdefault('PASSWORD_SLOW_MS', '1e9')
+
+import password_service  # noqa: E402
+
+PASSWORD = 'Смена-0800-пароль'
+
+
+def percentile(values: list, q: float) -> float:
+    return round(float(np.percentile(values, q)), 2) if values else 0.0
+
+
+def burst(password_hash: str, logins: int, concurrency: int) -> dict:
+    """logins входов от concurrency одновременных клиентов"""
+    latencies = []
+
+    def login(_):
+        started = time.perf_counter()
+        assert password_service.verify_password(PASSWORD, password_hash)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'logins_per_second': round(logins / elapsed, 1),
+        'latency_ms': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95), 'p99': percentile(latencies, 99)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 12])
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    results = []
+    for rounds in args.rounds:
+        password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode()
+
+        started = time.perf_counter()
+        for _ in range(args.logins):
+            bcrypt.checkpw(PASSWORD.encode('utf-8'), password_hash.encode('utf-8'))
+        sequential = args.logins / (time.perf_counter() - started)
+
+        result = {
+            'rounds': rounds,
+            'sequential_logins_per_second': round(sequential, 1),
+            'pool': [burst(password_hash, args.logins, concurrency) for concurrency in args.concurrency]
+        }
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False), file=sys.stderr)
+
+    print(json.dumps({
+        'benchmark': 'login_throughput',
+        'workers': password_service.PASSWORD_WORKERS,
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
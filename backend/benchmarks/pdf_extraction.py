@@ -0,0 +1,124 @@
+"""Извлечение текста PDF: прежний цикл text += page.extract_text() против PdfPages последовательно и пулом процессов.
+
+Запуск (база не нужна, PDF строятся в памяти):
+    python backend/benchmarks/pdf_extraction.py --pages 10 100 1000 --workers 4 --repeat 3
+
+Синтетический PDF — страницы по LINES_PER_PAGE строк текста шрифтом Helvetica, как в протоколах.
+Варианты для каждого числа страниц:
+    concat — прежний extract_text_from_pdf: страницы подряд, текст наращивается +=;
+    serial — PdfPages с одним процессом и collect_text (один join);
+    pooled — PdfPages с --workers процессами (с PARSE_PARALLEL_MIN_PAGES страниц, иначе тоже последовательно);
+    budget — pooled с бюджетом --budget-kb КБ текста: досрочная остановка и отмена оставшихся заданий.
+Тексты concat, serial и pooled совпадают — это проверяется перед замером. Ускорение пула видно только
+при нескольких доступных ядрах (в выводе — cpu_count).
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import pypdf
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+
+import parse_document  # noqa: E402
+from parse_document import PdfPages, collect_text  # noqa: E402
+
+LINES_PER_PAGE = 40
+
+
+def make_pdf(pages: int) -> bytes:
+    """PDF из pages страниц по LINES_PER_PAGE строк (латиница: стандартный шрифт без встраивания)"""
+    writer = pypdf.PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica')
+    }))
+    for number in range(pages):
+        page = writer.add_blank_page(width=595, height=842)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})
+        })
+        lines = [
+            f'({number}-{line} ' + ' '.join(f'w{(number * 7 + line + i) % 97}' for i in range(12)) + ') Tj 0 -18 Td'
+            for line in range(LINES_PER_PAGE)
+        ]
+        content = DecodedStreamObject()
+        content.set_data(('BT /F1 10 Tf 20 800 Td ' + ' '.join(lines) + ' ET').encode())
+        page[NameObject('/Contents')] = writer._add_object(content)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def concat(data: bytes) -> str:
+    """Прежний extract_text_from_pdf: текст наращивается += по страницам"""
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    text = ''
+    for page in reader.pages:
+        text += (page.extract_text() or '') + '\n'
+    return text.strip()
+
+
+def pages_text(data: bytes, workers: int, max_bytes: int = parse_document.MAX_TEXT_BYTES) -> str:
+    pdf_pages = PdfPages(data, workers=workers)
+    pages = iter(pdf_pages)
+    try:
+        return collect_text(pages, max_bytes)[0]
+    finally:
+        pages.close()
+
+
+def mean_seconds(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget-kb', type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    for pages in args.pages:
+        data = make_pdf(pages)
+        expected = concat(data)
+        for workers in (1, args.workers):
+            if pages_text(data, workers) != expected:
+                raise SystemExit(f'{pages} страниц, {workers} процессов: текст не совпадает с прежним извлечением')
+
+        result = {
+            'pdf_kb': round(len(data) / 1024, 1),
+            'text_kb': round(len(expected.encode('utf-8')) / 1024, 1),
+            'concat_s': round(mean_seconds(lambda: concat(data), args.repeat), 3),
+            'serial_s': round(mean_seconds(lambda: pages_text(data, 1), args.repeat), 3),
+            'pooled_s': round(mean_seconds(lambda: pages_text(data, args.workers), args.repeat), 3),
+            'budget_s': round(mean_seconds(
+                lambda: pages_text(data, args.workers, args.budget_kb * 1024), args.repeat
+            ), 3)
+        }
+        results[f'{pages}_pages'] = result
+        print(json.dumps({pages: result}), file=sys.stderr)
+
+    print(json.dumps({
+        'benchmark': 'pdf_extraction',
+        'cpu_count': os.cpu_count(),
+        'workers': args.workers,
+        'parallel_min_pages': parse_document.PARALLEL_MIN_PAGES,
+        'budget_kb': args.budget_kb,
+        'repeat': args.repeat,
+        'results': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""Агрегаты статистики: сохранения одной категории параллельно и чтение панели против GROUP BY по делам.
+
+Запуск (нужен только сервер PostgreSQL: база mvd_bench_* создаётся из db_migrations и удаляется по окончании):
+    python backend/benchmarks/rollup_contention.py --server-url postgresql://postgres:@/postgres?host=/tmp/pgdata \\
+        --analyses 500000 --threads 1 4 16 --seconds 10
+
+saves — --threads потоков по своему соединению сохраняют завершённые анализы одной категории (как у всех дел
+с фронтенда): INSERT в crime_analyses, учёт в агрегатах, COMMIT. Режимы:
+    upsert — прежний учёт: ON CONFLICT DO UPDATE строк analysis_rollups в транзакции сохранения;
+    deltas — record_analyses: вставка строк analysis_rollup_deltas, перенос — fold_rollup_deltas.
+Вариант with_import держит рядом транзакцию импорта пачки (учёт пачки, затем 500 мс работы до COMMIT).
+Печатаются сохранения/с и p50/p95/p99 одной транзакции.
+
+stats — на --analyses завершённых делах (статьи, тяжесть, сотрудники, дни): GET ?action=stats через handler
+без приращений и с --pending неперенесённых сохранений, fold — перенос их в агрегаты, group_by — те же
+разрезы запросами RECOMPUTE_QUERIES по crime_analyses и analysis_articles.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+CATEGORY = 'Преступления против собственности'
+IMPORT_HOLD_SECONDS = 0.5
+
+# Прежний учёт в агрегатах (до analysis_rollup_deltas): ключи по порядку, в транзакции сохранения
+LEGACY_UPSERT = """
+    INSERT INTO analysis_rollups (dimension, bucket, analyses)
+    VALUES %s
+    ON CONFLICT (dimension, bucket) DO UPDATE
+    SET analyses = analysis_rollups.analyses + EXCLUDED.analyses,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def seed(dsn: str, analyses: int) -> dict:
+    started = time.perf_counter()
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO users (username, full_name, department, role, password_hash, created_at)
+        SELECT 'rollup' || g, 'Сотрудник ' || g, 'Отдел полиции № ' || (g % 20 + 1), 'officer',
+               '$2b$12$' || repeat('x', 53), '2024-01-01'
+        FROM generate_series(1, 100) g
+    """)
+    cur.execute("SELECT array_agg(id ORDER BY id) FROM users WHERE username LIKE 'rollup%'")
+    officers = cur.fetchone()[0]
+    categories = sorted({category for category, _ in harness.CRIME_TYPES})
+    cur.execute("""
+        INSERT INTO crime_analyses (
+            case_number, incident_date, category, description, analysis_result, status, officer_id
+        )
+        SELECT
+            'ROLLUP-' || g,
+            DATE '2022-01-01' + (g::bigint * 7919 %% 1460)::int,
+            (%(categories)s::text[])[g %% %(category_count)s + 1],
+            'Гражданин похитил мобильный телефон из сумки потерпевшей в автобусе',
+            jsonb_build_object('article_details', jsonb_build_array(
+                jsonb_build_object('severity', (%(severities)s::text[])[g %% %(severity_count)s + 1])
+            )),
+            'completed',
+            (%(officers)s::int[])[g %% 100 + 1]
+        FROM generate_series(1, %(analyses)s) g
+    """, {'categories': categories, 'category_count': len(categories), 'severities': harness.SEVERITIES,
+          'severity_count': len(harness.SEVERITIES), 'officers': officers, 'analyses': analyses})
+    cur.execute("""
+        INSERT INTO analysis_articles (analysis_id, article_type, article_id, relevance_score)
+        SELECT ca.id, 'uk_rf', articles.ids[(ca.id * k) % array_length(articles.ids, 1) + 1], 0.8
+        FROM crime_analyses ca,
+             (SELECT array_agg(id ORDER BY id) AS ids FROM uk_rf_articles) articles,
+             generate_series(1, 2) k
+    """)
+    conn.commit()
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE")
+    conn.close()
+    return {'analyses': analyses, 'seconds': round(time.perf_counter() - started, 1)}
+
+
+def completed_analysis(officer_id: int) -> dict:
+    return {
+        'category': CATEGORY,
+        'officer_id': officer_id,
+        'incident_date': '2025-06-01',
+        'analysis_result': {
+            'article_details': [{'severity': 'Средней тяжести'}],
+            'suggested_articles': ['158', '161']
+        }
+    }
+
+
+def save(conn, cur, stats, mode: str, analyses: list, hold: float = 0.0):
+    """Транзакция сохранения: дела, учёт в агрегатах, затем hold секунд прочей работы до COMMIT"""
+    for analysis in analyses:
+        cur.execute("""
+            INSERT INTO crime_analyses (case_number, incident_date, category, status, officer_id)
+            VALUES ('SAVE-' || gen_random_uuid(), %s, %s, 'completed', %s)
+        """, (analysis['incident_date'], analysis['category'], analysis['officer_id']))
+    if mode == 'upsert':
+        keys = {}
+        for analysis in analyses:
+            for key in stats.rollup_keys(conn, analysis):
+                keys[key] = keys.get(key, 0) + 1
+        execute_values(cur, LEGACY_UPSERT, [(*key, count) for key, count in sorted(keys.items())])
+    else:
+        stats.record_analyses(conn, cur, analyses)
+    if hold:
+        time.sleep(hold)
+    conn.commit()
+
+
+def saves(dsn: str, stats, mode: str, threads: int, seconds: float, with_import: bool) -> dict:
+    latencies = []
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def writer(officer_id: int):
+        conn = psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+        cur = conn.cursor()
+        analysis = completed_analysis(officer_id)
+        own = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            save(conn, cur, stats, mode, [analysis])
+            own.append((time.perf_counter() - started) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(own)
+
+    def importer():
+        conn = psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+        cur = conn.cursor()
+        batch = [completed_analysis(1)] * 500
+        while not stop.is_set():
+            save(conn, cur, stats, mode, batch, hold=IMPORT_HOLD_SECONDS)
+        conn.close()
+
+    workers = [threading.Thread(target=writer, args=(i + 1,)) for i in range(threads)]
+    if with_import:
+        workers.append(threading.Thread(target=importer))
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    return {
+        'saves_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': harness.percentile(latencies, 50),
+        'p95_ms': harness.percentile(latencies, 95),
+        'p99_ms': harness.percentile(latencies, 99)
+    }
+
+
+def measure(call, iterations: int) -> dict:
+    call()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': harness.percentile(latencies, 50), 'p95_ms': harness.percentile(latencies, 95)}
+
+
+def statistics(dsn: str, index, stats, pending: int, iterations: int) -> dict:
+    headers = harness.admin_headers(dsn)
+
+    def request(action: str, method: str = 'GET'):
+        response = index.handler({
+            'httpMethod': method,
+            'queryStringParameters': {'action': action, 'repair': '1'},
+            'headers': headers
+        }, None)
+        assert response['statusCode'] == 200, response['body']
+        return json.loads(response['body'])['data']
+
+    # Агрегаты по засеянным делам — полным пересчётом
+    repaired = request('stats_recompute', 'POST')
+
+    conn = psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+
+    def group_by():
+        for query in stats.RECOMPUTE_QUERIES.values():
+            cur.execute(query)
+            cur.fetchall()
+
+    def read_pending():
+        # Чтение панели без переноса приращений перед ним
+        stats.get_statistics(conn, {})
+        conn.rollback()
+
+    results = {'buckets': repaired['buckets'], 'stats': measure(lambda: request('stats'), iterations)}
+    for _ in range(pending):
+        stats.record_analyses(conn, cur, [completed_analysis(1)])
+    conn.commit()
+    results['stats_with_pending_deltas'] = measure(read_pending, iterations)
+    started = time.perf_counter()
+    while stats.fold_rollup_deltas(cur):
+        conn.commit()
+    conn.commit()
+    results['fold_pending_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    results['group_by'] = measure(group_by, max(iterations // 10, 3))
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--server-url', required=True, help='DSN служебной базы сервера (postgres)')
+    parser.add_argument('--analyses', type=int, default=500000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--pending', type=int, default=10000, help='неперенесённых сохранений при чтении панели')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--keep', action='store_true', help='не удалять базу после прогона')
+    args = parser.parse_args()
+
+    dsn = harness.create_database(args.server_url)
+    os.environ['DATABASE_URL'] = dsn
+    results = {'saves': {}}
+    try:
+        # Журнальные строки функции уходят в stderr: stdout остаётся под JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            skipped = harness.apply_migrations(dsn)
+            seeded = seed(dsn, args.analyses)
+            harness.log(json.dumps({'seeded': seeded}))
+            index, db = harness.load_function('analysis')
+            stats = sys.modules['analysis_stats']
+            results['statistics'] = statistics(dsn, index, stats, args.pending, args.iterations)
+            harness.log(json.dumps({'statistics': results['statistics']}))
+
+            for with_import in (False, True):
+                for mode in ('upsert', 'deltas'):
+                    for threads in args.threads:
+                        name = f"{mode}{'_with_import' if with_import else ''}_{threads}"
+                        results['saves'][name] = saves(dsn, stats, mode, threads, args.seconds, with_import)
+                        harness.log(json.dumps({name: results['saves'][name]}))
+                    # Приращения режима переносятся до следующего прогона
+                    index.process_jobs()
+            harness.close_pool(db)
+    finally:
+        if not args.keep:
+            harness.drop_database(args.server_url, dsn)
+
+    print(json.dumps({
+        'benchmark': 'rollup_contention',
+        'analyses': args.analyses,
+        'seconds': args.seconds,
+        'skipped_migration_statements': skipped,
+        **results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""Полнота поиска похожих дел (MinHash/LSH) против точного перебора по Жаккару.
+
+Запуск на локальной базе, собранной из db_migrations (дела BENCH-* удаляются по окончании):
+    DATABASE_URL=postgresql://... python backend/benchmarks/similar_cases_recall.py --cases 100000 1000000
+
+Синтетические дела: общая лексика вида преступления + редкие слова из большого словаря,
+часть дел — правки более ранних (замена доли слов), чтобы у запросов были соседи разной близости.
+Результат — JSON: полнота top-k, полнота среди соседей с Жаккаром ≥ 0.5, задержки запроса и число кандидатов.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+
+from bulk_import import copy_rows  # noqa: E402
+from db import db_connection  # noqa: E402
+from similar_cases import (  # noqa: E402
+    SIMILAR_MAX_CANDIDATES, band_buckets, compute_signature, find_similar_ids, shingle_hashes, shingles, similarity_rows
+)
+
+CRIME_TYPES = [
+    'похитил мобильный телефон из сумки потерпевшей',
+    'открыто похитил золотую цепочку применив насилие',
+    'незаконно проник в квартиру и похитил имущество',
+    'причинил тяжкий вред здоровью ударив ножом',
+    'угнал автомобиль припаркованный у подъезда дома',
+    'сбыл наркотическое средство в крупном размере',
+    'путём обмана завладел денежными средствами по телефону',
+    'управлял автомобилем в состоянии опьянения совершив наезд',
+    'поджёг гараж причинив значительный ущерб владельцу',
+    'вымогал денежные средства угрожая распространением сведений',
+]
+PLACES = ['рынке', 'вокзале', 'автобусе', 'магазине', 'парке', 'подъезде', 'метро', 'кафе', 'офисе', 'стоянке']
+SYLLABLES = ['ка', 'ро', 'ми', 'ту', 'ле', 'на', 'зо', 'пу', 'ше', 'да', 'вил', 'кор', 'сан', 'тел', 'мар', 'гот']
+
+BENCH_PREFIX = 'BENCH-'
+
+# Номер синтетического дела → id в crime_analyses
+ID_BY_NUMBER = {}
+
+
+def pseudo_words(rng, count: int) -> list:
+    """Словарь редких «слов» (фамилии, улики, приметы) из слогов"""
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(SYLLABLES, size=rng.integers(3, 5))) + 'ов')
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def generate_cases(rng, start: int, count: int, vocabulary: list, texts: list) -> list:
+    """Новые описания; примерно каждое пятое — правка одного из ранее созданных"""
+    # Частоты слов по Ципфу без «головы» распределения: самые частые слова — служебные, их отсекает MIN_SHINGLE_LENGTH
+    zipf = np.minimum(rng.zipf(1.2, size=(count, 12)) + 100, len(vocabulary) - 1)
+    generated = []
+    for i in range(count):
+        if texts and rng.random() < 0.2:
+            words = texts[int(rng.integers(0, len(texts)))].split()
+            share = rng.uniform(0.05, 0.6)
+            for position in rng.choice(len(words), size=max(1, int(len(words) * share)), replace=False):
+                words[position] = vocabulary[int(rng.integers(0, len(vocabulary)))]
+            text = ' '.join(words)
+        else:
+            text = ' '.join([
+                'Гражданин', vocabulary[int(rng.integers(0, len(vocabulary)))],
+                CRIME_TYPES[int(rng.integers(0, len(CRIME_TYPES)))], 'на', PLACES[int(rng.integers(0, len(PLACES)))],
+                *(vocabulary[index] for index in zipf[i])
+            ])
+        texts.append(text)
+        generated.append((start + i, text))
+    return generated
+
+
+def load_cases(conn, cases: list) -> float:
+    """Запись дел, сигнатур и корзин через COPY пачками по 10 000; возвращает время в секундах"""
+    started = time.perf_counter()
+    cur = conn.cursor()
+    for offset in range(0, len(cases), 10000):
+        batch = cases[offset:offset + 10000]
+        cur.execute("""
+            SELECT nextval(pg_get_serial_sequence('crime_analyses', 'id')) AS id
+            FROM generate_series(1, %s)
+        """, (len(batch),))
+        ids = [row['id'] for row in cur.fetchall()]
+        copy_rows(cur, 'crime_analyses', ('id', 'case_number', 'incident_date', 'category', 'description', 'status'), [
+            (analysis_id, f'{BENCH_PREFIX}{number}', (date(2020, 1, 1) + timedelta(days=number % 1500)).isoformat(),
+             'Бенчмарк', text, 'completed')
+            for analysis_id, (number, text) in zip(ids, batch)
+        ])
+        signatures, buckets = similarity_rows((analysis_id, text) for analysis_id, (_, text) in zip(ids, batch))
+        copy_rows(cur, 'case_minhash', ('analysis_id', 'signature', 'shingles'), [
+            (analysis_id, '\\x' + signature.hex(), '\\x' + hashes.hex()) for analysis_id, signature, hashes in signatures
+        ])
+        copy_rows(cur, 'case_lsh_buckets', ('bucket', 'analysis_id'), buckets)
+        conn.commit()
+        for analysis_id, (number, _) in zip(ids, batch):
+            ID_BY_NUMBER[number] = analysis_id
+    cur.execute("ANALYZE case_lsh_buckets")
+    cur.execute("ANALYZE case_minhash")
+    conn.commit()
+    cur.close()
+    return time.perf_counter() - started
+
+
+def shingle_matrix(texts: list):
+    """Разреженная матрица дело × лемма для точного Жаккара"""
+    vocabulary, indptr, indices = {}, [0], []
+    for text in texts:
+        indices.extend(vocabulary.setdefault(word, len(vocabulary)) for word in shingles(text))
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(len(texts), len(vocabulary))
+    )
+    return matrix, vocabulary
+
+
+def percentile(values: list, q: float) -> float:
+    return round(float(np.percentile(values, q)), 2) if values else 0.0
+
+
+def measure(conn, rng, texts: list, queries: int, limit: int) -> dict:
+    matrix, vocabulary = shingle_matrix(texts)
+    sizes = np.asarray(matrix.sum(axis=1)).ravel()
+    number_by_id = {analysis_id: number for number, analysis_id in ID_BY_NUMBER.items()}
+
+    recalls, threshold_hits, threshold_total = [], 0, 0
+    latencies, brute_latencies, candidates = [], [], []
+    cur = conn.cursor()
+
+    for number in rng.choice(len(texts), size=queries, replace=False):
+        number = int(number)
+        hashes = shingle_hashes(texts[number])
+        signature = compute_signature(hashes)
+        if signature is None:
+            continue
+
+        # Точный перебор: пересечения всех дел с запросом одним умножением матрицы на вектор
+        started = time.perf_counter()
+        row = matrix[number]
+        intersection = np.asarray((matrix @ row.T).todense()).ravel()
+        jaccard = intersection / (sizes + sizes[number] - intersection)
+        jaccard[number] = -1
+        exact = np.argsort(-jaccard, kind='stable')[:limit]
+        brute_latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        found = find_similar_ids(conn, signature, hashes, limit, exclude_id=ID_BY_NUMBER[number])
+        latencies.append((time.perf_counter() - started) * 1000)
+        found_numbers = {number_by_id[analysis_id] for analysis_id, _ in found}
+
+        # Равные по Жаккару соседи взаимозаменяемы: засчитывается любой с Жаккаром не ниже k-го точного
+        kth = jaccard[exact[-1]]
+        relevant = [n for n in exact if jaccard[n] > 0]
+        if relevant:
+            hits = sum(1 for n in found_numbers if jaccard[n] >= kth and jaccard[n] > 0)
+            recalls.append(min(hits, len(relevant)) / len(relevant))
+        close = [n for n in exact if jaccard[n] >= 0.5]
+        threshold_total += len(close)
+        threshold_hits += sum(1 for n in close if n in found_numbers)
+
+        cur.execute("""
+            SELECT COUNT(DISTINCT analysis_id) AS candidates
+            FROM case_lsh_buckets
+            WHERE bucket = ANY(%s::bigint[])
+        """, (band_buckets(signature),))
+        candidates.append(cur.fetchone()['candidates'])
+
+    cur.close()
+    return {
+        'queries': len(latencies),
+        'limit': limit,
+        'recall_at_k': round(float(np.mean(recalls)), 4) if recalls else None,
+        'recall_jaccard_0_5': round(threshold_hits / threshold_total, 4) if threshold_total else None,
+        'neighbours_jaccard_0_5': threshold_total,
+        'lsh_ms': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95), 'p99': percentile(latencies, 99)},
+        'brute_force_in_memory_ms': {'p50': percentile(brute_latencies, 50), 'p95': percentile(brute_latencies, 95)},
+        'candidates': {
+            'mean': round(float(np.mean(candidates)), 1) if candidates else 0,
+            'p95': percentile(candidates, 95),
+            'max': int(max(candidates)) if candidates else 0,
+            'cap': SIMILAR_MAX_CANDIDATES
+        },
+        'shingle_vocabulary': len(vocabulary)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cases', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--keep', action='store_true', help='не удалять дела BENCH-* после замеров')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vocabulary = pseudo_words(rng, 50000)
+    texts, results = [], []
+
+    with db_connection() as conn:
+        try:
+            for total in sorted(args.cases):
+                cases = generate_cases(rng, len(texts), total - len(texts), vocabulary, texts)
+                load_seconds = load_cases(conn, cases)
+                result = measure(conn, rng, texts, args.queries, args.limit)
+                result.update({'cases': total, 'load_cases_per_second': round(len(cases) / load_seconds, 1)})
+                results.append(result)
+                print(json.dumps(result, ensure_ascii=False), file=sys.stderr)
+        finally:
+            if not args.keep:
+                cur = conn.cursor()
+                cur.execute("DELETE FROM crime_analyses WHERE case_number LIKE %s", (BENCH_PREFIX + '%',))
+                conn.commit()
+                cur.close()
+
+    print(json.dumps({'benchmark': 'similar_cases_recall', 'results': results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Накладные расходы трассировки функции analysis: при выключенной выборке и при включённой.
+
+Запуск на локальной базе, собранной из db_migrations (создаваемые дела TRACE-* удаляются по окончании):
+    DATABASE_URL=postgresql://... python backend/benchmarks/tracing_overhead.py --iterations 300
+
+Выключенная выборка (TRACE_SAMPLE_RATE=0) стоит одной проверки контекста на этап, SQL-запрос и вызов handler.
+Эти проверки измеряются отдельно (их доли микросекунды тонут в шуме сквозного замера), умножаются
+на число этапов и запросов сценария из трассируемого прогона и делятся на медиану задержки сценария.
+Включённая трассировка сравнивается сквозным замером: вызовы с X-Trace (секрет TRACE_SECRET) и без него чередуются.
+"""
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+
+# Трассировка вызовов прогона включается секретом, без сессии сотрудника
+os.environ.setdefault('TRACE_SECRET', 'tracing-overhead')
+
+import index  # noqa: E402
+import tracing  # noqa: E402
+from db import db_connection  # noqa: E402
+
+TRACE_PREFIX = 'TRACE-'
+
+
+def scenarios(analysis_id: int) -> dict:
+    document = base64.b64encode('Протокол осмотра места происшествия: следы взлома двери'.encode()).decode()
+    return {
+        'create': lambda i: {
+            'httpMethod': 'POST',
+            'body': json.dumps({
+                'case_number': f'{TRACE_PREFIX}{i}-{time.time_ns()}',
+                'incident_date': '2026-01-23',
+                'category': 'Преступления против собственности',
+                'description': 'Неизвестный похитил мобильный телефон из сумки потерпевшей в автобусе',
+                'evidence': 'Показания свидетелей, видеозапись'
+            })
+        },
+        'list': lambda i: {'httpMethod': 'GET', 'queryStringParameters': {'limit': '50'}},
+        'card': lambda i: {'httpMethod': 'GET', 'queryStringParameters': {'analysis_id': str(analysis_id)}},
+        'parse': lambda i: {
+            'httpMethod': 'POST',
+            'queryStringParameters': {'action': 'parse'},
+            'body': json.dumps({'file_data': document, 'file_name': 'protocol.txt'})
+        }
+    }
+
+
+def call(event: dict, traced: bool) -> float:
+    """Время вызова в мс; журнал трассировки отбрасывается"""
+    if traced:
+        event = {**event, 'headers': {'X-Trace': tracing.TRACE_SECRET}}
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        index.handler(event, None)
+        return (time.perf_counter() - started) * 1000
+
+
+def trace_counts(event: dict) -> dict:
+    """Число входов в этапы и SQL-запросов одного вызова"""
+    trace = tracing.RequestTrace('analysis', event['httpMethod'], '', None)
+    token = tracing._current.set(trace)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            index.handler(event, None)
+    finally:
+        tracing._current.reset(token)
+    return {'stages': sum(calls for _, calls in trace.stages.values()), 'queries': trace.queries}
+
+
+def disabled_costs(repeat: int) -> dict:
+    """Стоимость выключенной трассировки в нс: этап, проверка в курсоре и обёртка handler"""
+    def empty_stage():
+        with tracing.stage('bench'):
+            pass
+
+    def nothing():
+        pass
+
+    stage_ns = (min(timeit.repeat(empty_stage, number=repeat, repeat=5)) - min(timeit.repeat(nothing, number=repeat, repeat=5))) / repeat * 1e9
+
+    # Курсор: одинаковые SELECT 1 через TracingCursor и RealDictCursor, блоки чередуются
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    plain, wrapped = conn.cursor(cursor_factory=RealDictCursor), conn.cursor(cursor_factory=tracing.TracingCursor)
+    block = max(1, repeat // 100)
+    differences = []
+    for _ in range(40):
+        timings = []
+        for cur in (plain, wrapped):
+            started = time.perf_counter()
+            for _ in range(block):
+                cur.execute("SELECT 1")
+            timings.append((time.perf_counter() - started) / block)
+        differences.append(timings[1] - timings[0])
+    conn.close()
+
+    event = {'httpMethod': 'GET', 'headers': {'Content-Type': 'application/json', 'X-Authorization': 'token'}}
+    bare = lambda event, context: None  # noqa: E731
+    wrapped_handler = tracing.traced('bench')(bare)
+    wrapper_ns = (min(timeit.repeat(lambda: wrapped_handler(event, None), number=repeat, repeat=5))
+                  - min(timeit.repeat(lambda: bare(event, None), number=repeat, repeat=5))) / repeat * 1e9
+
+    return {
+        'stage_ns': round(stage_ns, 1),
+        'cursor_ns': round(float(np.median(differences)) * 1e9, 1),
+        'handler_ns': round(wrapper_ns, 1)
+    }
+
+
+def cleanup():
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM crime_analyses WHERE case_number LIKE %s", (TRACE_PREFIX + '%',))
+        ids = [row['id'] for row in cur.fetchall()]
+        if ids:
+            for table in ('analysis_articles', 'document_attachments', 'analysis_jobs', 'case_minhash'):
+                cur.execute(f"DELETE FROM {table} WHERE analysis_id = ANY(%s)", (ids,))
+            cur.execute("DELETE FROM crime_analyses WHERE id = ANY(%s)", (ids,))
+            # Счётчики панели пересчитываются из оставшихся дел
+            index.recompute_statistics(conn, repair=True)
+        conn.commit()
+        cur.close()
+
+
+def measure(iterations: int, costs: dict) -> dict:
+    first = json.loads(index.handler(scenarios(0)['create'](0), None)['body'])['data']
+    results = {}
+    for name, make in scenarios(first['id']).items():
+        for i in range(10):
+            call(make(i), False)
+        counts = trace_counts(make(0))
+
+        untraced, traced = [], []
+        for i in range(iterations):
+            # Чередование выравнивает дрейф (рост таблиц, фоновая нагрузка) между вариантами
+            untraced.append(call(make(2 * i), False))
+            traced.append(call(make(2 * i + 1), True))
+
+        p50 = float(np.median(untraced))
+        off_ms = (counts['stages'] * costs['stage_ns'] + counts['queries'] * costs['cursor_ns'] + costs['handler_ns']) / 1e6
+        results[name] = {
+            **counts,
+            'p50_ms': round(p50, 3),
+            'traced_p50_ms': round(float(np.median(traced)), 3),
+            'sampling_off_overhead_pct': round(off_ms / p50 * 100, 4),
+            'sampling_on_overhead_pct': round((float(np.median(traced)) / p50 - 1) * 100, 2)
+        }
+        print(json.dumps({name: results[name]}, ensure_ascii=False), file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=200000, help='повторов микрозамеров')
+    args = parser.parse_args()
+
+    if tracing.TRACE_SAMPLE_RATE:
+        sys.exit('Замер выключенной трассировки требует TRACE_SAMPLE_RATE=0')
+
+    costs = disabled_costs(args.repeat)
+    print(json.dumps(costs), file=sys.stderr)
+
+    # Журнальные строки функции (загрузка кэшей) уходят в stderr: stdout остаётся под JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            results = measure(args.iterations, costs)
+        finally:
+            cleanup()
+
+    print(json.dumps({
+        'benchmark': 'tracing_overhead',
+        'iterations': args.iterations,
+        'disabled_costs_ns': costs,
+        'scenarios': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
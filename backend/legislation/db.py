@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import pool
+from tracing import TracingCursor
+from serialization import register_raw_jsonb
+
+POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '1'))
+POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '4'))
+POOL_WAIT_TIMEOUT = float(os.environ.get('DB_POOL_WAIT_TIMEOUT', '10'))
+
+# Соединение, простаивавшее дольше этого времени, перед выдачей проверяется запросом SELECT 1
+STALE_AFTER = float(os.environ.get('DB_POOL_STALE_AFTER', '30'))
+
+
+class PoolConnection(psycopg2.extensions.connection):
+    """Соединение пула: JSONB читается как RawJSON с момента создания; время возврата в пул — на самом соединении"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        register_raw_jsonb(self)
+        self.last_used = None
+
+
+class ConnectionPool:
+    """Пул соединений PostgreSQL уровня процесса, переживающий тёплые вызовы функции"""
+
+    def __init__(self, dsn: str, min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE):
+        # Состояние соединения хранится на нём самом: пул psycopg2 закрывает лишние соединения при возврате
+        # без уведомления, и словари по id(conn) копили бы закрытые соединения и путали новые с ними
+        self._pool = pool.ThreadedConnectionPool(
+            min_size, max_size, dsn, connection_factory=PoolConnection, cursor_factory=TracingCursor
+        )
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self.max_size = max_size
+        self.in_use = 0
+        self.acquired = 0
+        self.discarded = 0
+        self.wait_time_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def _is_alive(self, conn) -> bool:
+        """Проверка соединения: закрытые отбрасываются, долго простаивавшие пингуются"""
+        if conn.closed:
+            return False
+        last_used = conn.last_used
+        if last_used is None or time.monotonic() - last_used < STALE_AFTER:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def acquire(self):
+        """Выдача соединения из пула; при исчерпании пула ожидание не дольше POOL_WAIT_TIMEOUT"""
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=POOL_WAIT_TIMEOUT):
+            raise pool.PoolError('Превышено время ожидания соединения с базой данных')
+        waited_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            conn = self._pool.getconn()
+            while not self._is_alive(conn):
+                self._discard(conn)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+            self.acquired += 1
+            self.wait_time_ms += waited_ms
+            self.max_wait_ms = max(self.max_wait_ms, waited_ms)
+        return conn
+
+    def _discard(self, conn):
+        """Закрытие сломанного соединения и освобождение его места в пуле"""
+        self._pool.putconn(conn, close=True)
+        with self._lock:
+            self.discarded += 1
+
+    def release(self, conn, broken: bool = False):
+        """Возврат соединения в пул; незавершённая транзакция откатывается пулом"""
+        try:
+            if broken or conn.closed:
+                self._discard(conn)
+            else:
+                conn.last_used = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Метрики пула: занятые соединения, ожидание, отброшенные соединения"""
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'in_use': self.in_use,
+                'idle': len(self._pool._pool),
+                'acquired': self.acquired,
+                'discarded': self.discarded,
+                'avg_wait_ms': round(self.wait_time_ms / self.acquired, 3) if self.acquired else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 3)
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Пул создаётся при первом обращении и переиспользуется тёплыми вызовами"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(os.environ['DATABASE_URL'])
+    return _pool
+
+
+@contextmanager
+def db_connection():
+    """Соединение из пула, возвращаемое на любом пути выхода, включая исключения"""
+    connection_pool = get_pool()
+    conn = connection_pool.acquire()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        raise
+    finally:
+        connection_pool.release(conn, broken=broken)
+
+
+def pool_stats() -> dict:
+    """Метрики пула текущего процесса (пустые, если пул ещё не создавался)"""
+    return _pool.stats() if _pool is not None else {}
@@ -1,16 +1,162 @@
+import base64
 import json
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import hashlib
+import re
+from bisect import bisect_left, bisect_right
 from datetime import datetime
+from db import db_connection, pool_stats
+from legislation_cache import LEGISLATION_CACHE, LEGISLATION_COLUMNS, LEGISLATION_TABLES
+from session_auth import SESSION_CACHE, AuthError, authenticate
+from tracing import log_error, stage, traced
+from serialization import dumps
 
-def get_db_connection():
-    """Подключение к базе данных PostgreSQL"""
-    return psycopg2.connect(
-        os.environ['DATABASE_URL'],
-        cursor_factory=RealDictCursor
+MAX_PAGE_SIZE = 500
+
+# Заглушка для номеров без цифр: в PostgreSQL они сортируются последними (NULLS LAST)
+SORT_MAJOR_LAST = 2147483647
+
+# Ключ порядка результатов поиска (все компоненты по возрастанию): точное совпадение номера,
+# префикс номера, релевантность, естественный порядок номеров; по нему же строится курсор страницы
+SEARCH_ORDER = """(
+            article_number <> %s,
+            article_number NOT LIKE %s,
+            -ts_rank(search_vector, query),
+            COALESCE(sort_major, {last}),
+            sort_minor,
+            article_number
+        )""".format(last=SORT_MAJOR_LAST)
+
+def get_header(event: dict, name: str) -> str:
+    """Заголовок запроса без учёта регистра имени"""
+    headers = event.get('headers') or {}
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return ''
+
+def int_param(query_params: dict, name: str):
+    """Целочисленный параметр запроса или None; не число — ValueError (ответ 400)"""
+    value = query_params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть целым числом: {value}")
+
+def escape_like(value: str) -> str:
+    """Текст запроса для шаблона LIKE: символы %, _ и \\ ищутся буквально"""
+    return re.sub(r'([\\%_])', r'\\\1', value)
+
+def parse_fields(article_type: str, fields_param: str) -> list:
+    """Проекция колонок из параметра fields=; номер статьи нужен всегда (курсор пагинации)"""
+    allowed = [column.strip() for column in LEGISLATION_COLUMNS[article_type].split(',')]
+    if not fields_param:
+        return allowed
+    
+    requested = {field.strip() for field in fields_param.split(',')}
+    fields = [column for column in allowed if column in requested]
+    if 'article_number' not in fields:
+        fields.insert(0, 'article_number')
+    return fields
+
+def article_sort_key(article_number: str) -> tuple:
+    """Естественный ключ номера статьи, как генерируемые колонки sort_major/sort_minor (V0012)"""
+    major, _, minor = article_number.partition('.')
+    major_digits = re.sub(r'\D', '', major)
+    minor_digits = re.sub(r'\D', '', minor.split('.')[0])
+    return (
+        int(major_digits) if major_digits else SORT_MAJOR_LAST,
+        int(minor_digits) if minor_digits else 0,
+        article_number
     )
 
+def paginate(articles: list, positions: dict, after: str, limit: int) -> tuple:
+    """Keyset-страница после статьи after в естественном порядке номеров и курсор следующей страницы"""
+    start = 0
+    if after in positions:
+        start = bisect_right(articles, positions[after], key=lambda art: positions[art['article_number']])
+    elif after:
+        # Статьи after уже нет (законодательство обновилось): страница продолжается с её места в порядке номеров
+        start = bisect_right(articles, article_sort_key(after), key=lambda art: article_sort_key(art['article_number']))
+    
+    page = articles[start:start + limit] if limit else articles[start:]
+    has_more = bool(limit) and start + limit < len(articles)
+    next_cursor = page[-1]['article_number'] if has_more and page else None
+    return page, next_cursor
+
+def encode_search_cursor(row: dict) -> str:
+    """Курсор страницы поиска: ключ SEARCH_ORDER последней строки"""
+    raw = json.dumps([
+        row['_exact'], row['_prefix'], row['_rank'], row['_sort_major'], row['_sort_minor'], row['article_number']
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_search_cursor(cursor: str) -> list:
+    """Разбор курсора поиска; некорректный курсор — ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        exact, prefix, rank, sort_major, sort_minor, article_number = json.loads(base64.urlsafe_b64decode(padded))
+        return [not exact, not prefix, -float(rank), int(sort_major), int(sort_minor), str(article_number)]
+    except (ValueError, TypeError):
+        raise ValueError('Некорректный курсор страницы')
+
+def select_range(articles: list, range_from: int, range_to: int) -> list:
+    """Статьи с целой частью номера в диапазоне [range_from, range_to] из упорядоченного списка"""
+    def sort_major(art: dict) -> float:
+        # Номера без цифр в PostgreSQL сортируются последними (NULLS LAST)
+        return art['sort_major'] if art['sort_major'] is not None else float('inf')
+    
+    start = bisect_left(articles, range_from, key=sort_major) if range_from is not None else 0
+    end = bisect_right(articles, range_to, key=sort_major) if range_to is not None else len(articles)
+    return articles[start:end]
+
+def search_sql(article_type: str, fields: list, search_query: str, category: str,
+               range_from: int, range_to: int, limit: int, after: list = None) -> tuple:
+    """Поиск: ранжированный полнотекстовый запрос по GIN-индексу и префикс номера статьи
+    (индекс varchar_pattern_ops, без него дизъюнкция OR превращается в Seq Scan).
+    Служебные колонки _exact … _sort_minor — ключ порядка для курсора следующей страницы"""
+    query = f"""
+        SELECT
+            {', '.join(fields)},
+            article_number = %s AS _exact,
+            article_number LIKE %s AS _prefix,
+            ts_rank(search_vector, query) AS _rank,
+            COALESCE(sort_major, {SORT_MAJOR_LAST}) AS _sort_major,
+            sort_minor AS _sort_minor
+        FROM {LEGISLATION_TABLES[article_type]}, websearch_to_tsquery('russian', %s) AS query
+        WHERE (search_vector @@ query OR article_number LIKE %s)
+    """
+    prefix = escape_like(search_query) + '%'
+    params = [search_query, prefix, search_query, prefix]
+    
+    if category:
+        query += " AND category ILIKE %s"
+        params.append(f"%{escape_like(category)}%")
+    
+    if range_from is not None:
+        query += " AND sort_major >= %s"
+        params.append(range_from)
+    
+    if range_to is not None:
+        query += " AND sort_major <= %s"
+        params.append(range_to)
+    
+    if after:
+        # Keyset: строки строго после последней строки предыдущей страницы (ранг сравнивается как real)
+        query += f" AND {SEARCH_ORDER} > (%s, %s, %s::real, %s, %s, %s)"
+        params.extend([search_query, prefix] + after)
+    
+    query += f" ORDER BY {SEARCH_ORDER}"
+    params.extend([search_query, prefix])
+    
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    
+    return query, params
+
+@traced('legislation')
 def handler(event: dict, context) -> dict:
     """API для работы с базой законодательства РФ (УК РФ, УПК РФ, Конституция)"""
     method = event.get('httpMethod', 'GET')
@@ -21,114 +167,211 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Authorization'
+                'Access-Control-Allow-Headers': 'Content-Type, X-Authorization, If-None-Match, X-Trace'
             },
             'body': '',
             'isBase64Encoded': False
         }
     
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        path_params = event.get('pathParams', {})
-        query_params = event.get('queryStringParameters', {}) or {}
-        
-        if method == 'GET':
-            article_type = query_params.get('type', 'uk_rf')
-            search_query = query_params.get('search', '')
-            category = query_params.get('category', '')
-            
-            table_map = {
-                'uk_rf': 'uk_rf_articles',
-                'upk_rf': 'upk_rf_articles',
-                'constitution': 'constitution_articles'
-            }
-            
-            table_name = table_map.get(article_type, 'uk_rf_articles')
-            
-            query = f"SELECT * FROM {table_name} WHERE 1=1"
-            params = []
-            
-            if search_query:
-                query += " AND (article_number ILIKE %s OR title ILIKE %s)"
-                search_pattern = f"%{search_query}%"
-                params.extend([search_pattern, search_pattern])
+        with db_connection() as conn:
+            # Сессия по X-Authorization: обычно из кэша процесса, без обращения к базе
+            with stage('auth'):
+                authenticate(event, conn)
             
-            if category:
-                query += " AND category ILIKE %s"
-                params.append(f"%{category}%")
+            cur = conn.cursor()
             
-            query += " ORDER BY article_number"
+            path_params = event.get('pathParams', {})
+            query_params = event.get('queryStringParameters', {}) or {}
             
-            cur.execute(query, params)
-            articles = cur.fetchall()
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'success': True,
-                    'data': articles,
-                    'count': len(articles)
-                }, default=str),
-                'isBase64Encoded': False
-            }
-        
-        elif method == 'POST':
-            body = json.loads(event.get('body', '{}'))
-            action = body.get('action', 'add')
-            
-            if action == 'update_from_source':
-                update_result = {
-                    'articles_added': 0,
-                    'articles_updated': 0,
-                    'timestamp': datetime.now().isoformat()
+            if method == 'GET':
+                article_type = query_params.get('type', 'uk_rf')
+                search_query = query_params.get('search', '')
+                category = query_params.get('category', '')
+                
+                if query_params.get('action') == 'cache_stats':
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': dumps({
+                            'success': True,
+                            'data': {
+                                'cache': LEGISLATION_CACHE.stats(),
+                                'sessions': SESSION_CACHE.stats(),
+                                'pool': pool_stats()
+                            }
+                        }),
+                        'isBase64Encoded': False
+                    }
+                
+                if article_type not in LEGISLATION_TABLES:
+                    article_type = 'uk_rf'
+                
+                fields = parse_fields(article_type, query_params.get('fields', ''))
+                after = query_params.get('after', '')
+                # 0 — весь список без пагинации; отрицательный limit считается нулём
+                limit = min(max(int_param(query_params, 'limit') or 0, 0), MAX_PAGE_SIZE)
+                range_from = int_param(query_params, 'from')
+                range_to = int_param(query_params, 'to')
+                
+                # ETag зависит только от версии законодательства и параметров запроса
+                version = LEGISLATION_CACHE.current_version(conn)
+                etag_source = json.dumps(
+                    [version, article_type, search_query, category, fields, after, limit, range_from, range_to],
+                    default=str
+                )
+                etag = '"' + hashlib.sha1(etag_source.encode()).hexdigest() + '"'
+                cache_headers = {
+                    'ETag': etag,
+                    'Cache-Control': 'no-cache',
+                    'Access-Control-Expose-Headers': 'ETag'
                 }
                 
-                cur.execute("""
-                    INSERT INTO legislation_updates (source_type, articles_added, articles_updated, status)
-                    VALUES (%s, %s, %s, %s)
-                """, ('manual', 0, 0, 'success'))
+                if get_header(event, 'If-None-Match') == etag:
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 304,
+                        'headers': {
+                            'Access-Control-Allow-Origin': '*',
+                            **cache_headers
+                        },
+                        'body': '',
+                        'isBase64Encoded': False
+                    }
+                
+                next_cursor = None
+                
+                if search_query:
+                    # Лишняя строка сверх limit показывает, есть ли следующая страница
+                    query, params = search_sql(
+                        article_type, fields, search_query, category, range_from, range_to,
+                        limit + 1 if limit else 0, decode_search_cursor(after) if after else None
+                    )
+                    
+                    with stage('search'):
+                        cur.execute(query, params)
+                        articles = cur.fetchall()
+                    
+                    if limit and len(articles) > limit:
+                        articles = articles[:limit]
+                        next_cursor = encode_search_cursor(articles[-1])
+                    articles = [{field: art[field] for field in fields} for art in articles]
+                else:
+                    # Список статей отдаётся из кэша тёплого контейнера
+                    with stage('list'):
+                        # Категория — подстрока без учёта регистра, как ILIKE '%...%' в поиске
+                        if category:
+                            articles = LEGISLATION_CACHE.list_category(conn, article_type, category)
+                        else:
+                            articles = LEGISLATION_CACHE.list_articles(conn, article_type)
+                        
+                        if range_from is not None or range_to is not None:
+                            articles = select_range(articles, range_from, range_to)
+                        
+                        articles, next_cursor = paginate(articles, LEGISLATION_CACHE.positions.get(article_type, {}), after, limit)
+                        articles = [{field: art[field] for field in fields} for art in articles]
                 
-                conn.commit()
                 cur.close()
-                conn.close()
+                
+                with stage('serialize'):
+                    response_body = dumps({
+                        'success': True,
+                        'data': articles,
+                        'count': len(articles),
+                        'next_cursor': next_cursor
+                    })
                 
                 return {
                     'statusCode': 200,
                     'headers': {
                         'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
+                        'Access-Control-Allow-Origin': '*',
+                        **cache_headers
                     },
-                    'body': json.dumps({
-                        'success': True,
-                        'message': 'Обновление законодательства запущено',
-                        'data': update_result
-                    }),
+                    'body': response_body,
                     'isBase64Encoded': False
                 }
-        
-        cur.close()
-        conn.close()
-        
+            
+            elif method == 'POST':
+                body = json.loads(event.get('body', '{}'))
+                action = body.get('action', 'add')
+                
+                if action == 'update_from_source':
+                    update_result = {
+                        'articles_added': 0,
+                        'articles_updated': 0,
+                        'timestamp': datetime.now().isoformat()
+                    }
+                    
+                    cur.execute("""
+                        INSERT INTO legislation_updates (source_type, articles_added, articles_updated, status)
+                        VALUES (%s, %s, %s, %s)
+                    """, ('manual', 0, 0, 'success'))
+                    
+                    conn.commit()
+                    LEGISLATION_CACHE.invalidate()
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({
+                            'success': True,
+                            'message': 'Обновление законодательства запущено',
+                            'data': update_result
+                        }),
+                        'isBase64Encoded': False
+                    }
+            
+            cur.close()
+            
+            return {
+                'statusCode': 405,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Method not allowed'}),
+                'isBase64Encoded': False
+            }
+            
+    except AuthError as auth_error:
+        return {
+            'statusCode': auth_error.status_code,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'success': False,
+                'error': str(auth_error)
+            }),
+            'isBase64Encoded': False
+        }
+    except ValueError as param_error:
         return {
-            'statusCode': 405,
+            'statusCode': 400,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({'error': 'Method not allowed'}),
+            'body': json.dumps({
+                'success': False,
+                'error': str(param_error)
+            }),
             'isBase64Encoded': False
         }
-        
     except Exception as e:
+        log_error('legislation', e)
         return {
             'statusCode': 500,
             'headers': {
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули функции analysis импортируются так же, как в облачной функции: из её каталога
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
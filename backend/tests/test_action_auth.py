@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import index
+import session_auth
+
+SESSIONS = {
+    'admin-token': {'user_id': 1, 'role': 'admin'},
+    'officer-token': {'user_id': 2, 'role': 'officer'}
+}
+
+
+@pytest.fixture(autouse=True)
+def sessions(monkeypatch):
+    """Токены проверяются без базы; REQUIRE_AUTH выключен, как по умолчанию"""
+    monkeypatch.setattr(session_auth, 'REQUIRE_AUTH', False)
+    monkeypatch.setattr(session_auth, 'validate_token', lambda token, conn=None: SESSIONS.get(token))
+
+
+def call(action: str, token: str = None) -> dict:
+    headers = {'X-Authorization': token} if token else {}
+    return index.handler({
+        'httpMethod': 'POST',
+        'queryStringParameters': {'action': action},
+        'headers': headers,
+        'body': ''
+    }, None)
+
+
+@pytest.mark.parametrize('action', ['process_jobs', 'stats_recompute', 'index_similar', 'import'])
+def test_service_actions_require_session_without_require_auth(action):
+    response = call(action)
+    assert response['statusCode'] == 401
+    assert json.loads(response['body'])['success'] is False
+
+
+@pytest.mark.parametrize('action', ['process_jobs', 'stats_recompute', 'index_similar'])
+def test_service_actions_require_admin(action):
+    assert call(action, 'officer-token')['statusCode'] == 403
+
+
+def test_require_session_checks_role():
+    assert session_auth.require_session(SESSIONS['admin-token'], 'admin') is SESSIONS['admin-token']
+    assert session_auth.require_session(SESSIONS['officer-token']) is SESSIONS['officer-token']
+    with pytest.raises(session_auth.AuthError) as error:
+        session_auth.require_session(SESSIONS['officer-token'], 'admin')
+    assert error.value.status_code == 403
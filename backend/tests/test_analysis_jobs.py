@@ -0,0 +1,65 @@
+import os
+
+import psycopg2
+import pytest
+from psycopg2.extras import RealDictCursor
+
+from analysis_jobs import JOB_MAX_ATTEMPTS, JOB_STALE_AFTER, requeue_stale_jobs
+
+# Нужна база, собранная из db_migrations: DATABASE_URL=postgresql://... python -m pytest tests
+pytestmark = pytest.mark.skipif(not os.environ.get('DATABASE_URL'), reason='DATABASE_URL не задан')
+
+
+@pytest.fixture
+def conn():
+    """Соединение, все изменения которого откатываются после теста"""
+    connection = psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=RealDictCursor)
+    yield connection
+    connection.rollback()
+    connection.close()
+
+
+def stale_job(cur, case_number: str, attempts: int) -> int:
+    """Задание, захваченное обработчиком, который перестал отвечать"""
+    cur.execute("""
+        INSERT INTO crime_analyses (case_number, incident_date, category, status)
+        VALUES (%s, '2026-01-23', 'Кража', 'processing')
+        RETURNING id
+    """, (case_number,))
+    analysis_id = cur.fetchone()['id']
+    cur.execute("""
+        INSERT INTO analysis_jobs (analysis_id, status, attempts, locked_at)
+        VALUES (%s, 'processing', %s, NOW() - make_interval(secs => %s))
+    """, (analysis_id, attempts, JOB_STALE_AFTER + 60))
+    return analysis_id
+
+
+def statuses(cur, analysis_id: int) -> tuple:
+    cur.execute("""
+        SELECT j.status AS job_status, ca.status AS analysis_status, j.finished_at IS NOT NULL AS finished
+        FROM analysis_jobs j
+        JOIN crime_analyses ca ON ca.id = j.analysis_id
+        WHERE j.analysis_id = %s
+    """, (analysis_id,))
+    row = cur.fetchone()
+    return row['job_status'], row['analysis_status'], row['finished']
+
+
+def test_stale_job_with_exhausted_attempts_fails(conn):
+    """Задание, ронявшее обработчик на каждой попытке, не возвращается в очередь бесконечно"""
+    cur = conn.cursor()
+    retried = stale_job(cur, 'STALE-RETRY', JOB_MAX_ATTEMPTS - 1)
+    exhausted = stale_job(cur, 'STALE-EXHAUSTED', JOB_MAX_ATTEMPTS)
+
+    assert requeue_stale_jobs(cur) == {'requeued': 1, 'failed': 1}
+    assert statuses(cur, retried) == ('queued', 'pending', False)
+    assert statuses(cur, exhausted) == ('failed', 'failed', True)
+
+
+def test_recent_processing_job_is_left_alone(conn):
+    cur = conn.cursor()
+    analysis_id = stale_job(cur, 'STALE-RECENT', JOB_MAX_ATTEMPTS)
+    cur.execute("UPDATE analysis_jobs SET locked_at = NOW() WHERE analysis_id = %s", (analysis_id,))
+
+    assert requeue_stale_jobs(cur) == {'requeued': 0, 'failed': 0}
+    assert statuses(cur, analysis_id) == ('processing', 'processing', False)
@@ -0,0 +1,89 @@
+import os
+
+import psycopg2
+import pytest
+from psycopg2.extras import RealDictCursor
+
+from analysis_stats import fold_rollup_deltas, get_statistics, record_analyses
+
+# Нужна база, собранная из db_migrations: DATABASE_URL=postgresql://... python -m pytest tests
+pytestmark = pytest.mark.skipif(not os.environ.get('DATABASE_URL'), reason='DATABASE_URL не задан')
+
+CATEGORY = 'Проверка агрегатов'
+
+
+def connect():
+    return psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=RealDictCursor)
+
+
+@pytest.fixture
+def conn():
+    """Соединение, все изменения которого откатываются после теста"""
+    connection = connect()
+    yield connection
+    connection.rollback()
+    connection.close()
+
+
+def analysis(day: str = '2025-06-01') -> dict:
+    return {
+        'category': CATEGORY,
+        'officer_id': None,
+        'incident_date': day,
+        'analysis_result': {'article_details': [], 'suggested_articles': []}
+    }
+
+
+def category_count(conn) -> int:
+    statistics = get_statistics(conn, {'dimensions': 'category'})
+    return next((item['count'] for item in statistics['by_category'] if item['key'] == CATEGORY), 0)
+
+
+def rollup_row(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT analyses FROM analysis_rollups WHERE dimension = 'category' AND bucket = %s", (CATEGORY,))
+    row = cur.fetchone()
+    return row and row['analyses']
+
+
+def test_statistics_count_deltas_before_and_after_fold(conn):
+    record_analyses(conn, conn.cursor(), [analysis(), analysis(), analysis('2025-06-02')])
+    assert rollup_row(conn) is None
+    assert category_count(conn) == 3
+
+    assert fold_rollup_deltas(conn.cursor(), limit=None) >= 3
+    assert rollup_row(conn) == 3
+    assert category_count(conn) == 3
+
+
+def test_concurrent_saves_do_not_wait_for_each_other(conn):
+    """Сохранения одной категории не ждут друг друга: общие строки агрегатов не блокируются"""
+    other = connect()
+    try:
+        record_analyses(conn, conn.cursor(), [analysis()])
+        cur = other.cursor()
+        cur.execute("SET lock_timeout = '200ms'")
+        record_analyses(other, cur, [analysis()])
+    finally:
+        other.rollback()
+        other.close()
+
+
+def test_concurrent_fold_skips_deltas_taken_by_another(conn):
+    """Приращения, которые переносит другая транзакция, не переносятся второй раз"""
+    writer = connect()
+    cur = writer.cursor()
+    cur.execute("SELECT COALESCE(MAX(id), 0) AS last_id FROM analysis_rollup_deltas")
+    last_id = cur.fetchone()['last_id']
+    try:
+        record_analyses(writer, cur, [analysis(), analysis()])
+        writer.commit()
+
+        assert fold_rollup_deltas(conn.cursor(), limit=None) >= 2
+        assert fold_rollup_deltas(writer.cursor(), limit=None) == 0
+    finally:
+        writer.rollback()
+        conn.rollback()
+        cur.execute("DELETE FROM analysis_rollup_deltas WHERE id > %s", (last_id,))
+        writer.commit()
+        writer.close()
@@ -0,0 +1,85 @@
+import pytest
+
+import index
+from legislation_cache import LEGISLATION_CACHE
+
+ARTICLES = [
+    {'id': i, 'article_number': str(100 + i), 'title': f'Статья {100 + i}', 'category': '', 'severity': '',
+     'full_text': '', 'last_updated': None, 'sort_major': 100 + i, 'sort_minor': 0}
+    for i in range(1, 21)
+]
+
+
+class StubCursor:
+    """Курсор без базы: запоминает запросы и отдаёт версию законодательства и статьи УК РФ"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = []
+
+    def execute(self, query, vars=None):
+        sql = query.decode() if isinstance(query, bytes) else query
+        self.connection.queries.append(sql)
+        if 'FROM legislation_updates' in sql:
+            self.result = [{'id': 1, 'update_date': '2026-01-01'}]
+        elif 'FROM uk_rf_articles' in sql:
+            self.result = [dict(row) for row in ARTICLES]
+        else:
+            self.result = []
+
+    def mogrify(self, template, args):
+        return ('(' + ','.join(repr(arg) for arg in args) + ')').encode()
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    encoding = 'UTF8'
+
+    def __init__(self):
+        self.queries = []
+
+    def cursor(self):
+        return StubCursor(self)
+
+
+@pytest.fixture(autouse=True)
+def reset_legislation_cache():
+    yield
+    # Статьи-заглушки не должны остаться в кэше процесса для других тестов
+    LEGISLATION_CACHE.invalidate()
+
+
+def link_articles(count: int, cold: bool) -> list:
+    """Запросы к базе при поиске статей анализа и их привязке к делу"""
+    conn = StubConnection()
+    if cold:
+        LEGISLATION_CACHE.invalidate()
+    else:
+        LEGISLATION_CACHE.ensure_fresh(conn)
+        conn.queries.clear()
+
+    numbers = [row['article_number'] for row in ARTICLES[:count]]
+    articles = index.fetch_articles(conn, numbers)
+    assert [article['article_number'] for article in articles] == numbers
+
+    index.save_analysis_articles(conn.cursor(), 1, articles, {number: 0.5 for number in numbers})
+    return conn.queries
+
+
+@pytest.mark.parametrize('cold', [True, False], ids=['cold_cache', 'warm_cache'])
+def test_query_count_does_not_grow_with_articles(cold):
+    one = link_articles(1, cold)
+    fifteen = link_articles(15, cold)
+    assert len(one) == len(fifteen)
+    # Привязка — один INSERT на все статьи
+    inserts = [sql for sql in fifteen if sql.lstrip().startswith('INSERT INTO analysis_articles')]
+    assert len(inserts) == 1
+    assert inserts[0].count('(1,') == 15
@@ -0,0 +1,63 @@
+import pytest
+
+import article_ranker
+from article_ranker import ArticleRanker, bm25_relevance, text_lemmas
+
+ARTICLES = [
+    {'article_number': '105', 'title': 'Убийство', 'category': 'Преступления против жизни и здоровья',
+     'full_text': 'Убийство, то есть умышленное причинение смерти другому человеку'},
+    {'article_number': '111', 'title': 'Умышленное причинение тяжкого вреда здоровью',
+     'category': 'Преступления против жизни и здоровья',
+     'full_text': 'Умышленное причинение тяжкого вреда здоровью, опасного для жизни человека'},
+    {'article_number': '158', 'title': 'Кража', 'category': 'Преступления против собственности',
+     'full_text': 'Кража, то есть тайное хищение чужого имущества'},
+    {'article_number': '228.1', 'title': 'Незаконные производство, сбыт или пересылка наркотических средств',
+     'category': 'Преступления против здоровья населения',
+     'full_text': 'Незаконные производство, сбыт или пересылка наркотических средств, психотропных веществ'},
+    {'article_number': '290', 'title': 'Получение взятки', 'category': 'Преступления против государственной власти',
+     'full_text': 'Получение должностным лицом лично или через посредника взятки'},
+]
+
+# Остальной кодекс: idf и средняя длина статьи как в настоящем УК РФ (около 240 статей)
+FILLER_ARTICLES = [
+    {'article_number': str(300 + i), 'title': f'Деяние, совершённое лицом {i}', 'category': 'Иные преступления',
+     'full_text': 'Деяние, совершённое лицом, если это деяние было совершено в отношении другого человека'}
+    for i in range(240)
+]
+
+
+@pytest.fixture
+def ranker(monkeypatch):
+    """BM25 по нескольким статьям УК РФ без базы и кэша законодательства"""
+    built = ArticleRanker()
+    built._build(ARTICLES + FILLER_ARTICLES, version=(1, None))
+    monkeypatch.setattr(built, 'ensure_fresh', lambda conn: None)
+    return built
+
+
+def test_stopwords_are_not_lemmas():
+    assert text_lemmas('Он сказал, что она была там и всё это видела') == ['сказа', 'видел']
+
+
+@pytest.mark.parametrize('text', [
+    'Сегодня солнечная погода, температура воздуха двадцать градусов, ветер слабый',
+    'Он сказал, что она была там, и они все это видели, но никто не пришел',
+    'Совещание отдела перенесено на четверг, то есть на другой день',
+])
+def test_unrelated_text_scores_near_zero(ranker, text):
+    """Общие со статьями служебные и частые слова не дают статье релевантности"""
+    ranked = ranker.score(None, text)
+    assert all(bm25_relevance(score) < 0.05 for _, score in ranked)
+
+
+def test_relevance_is_absolute_not_relative_to_best_match(ranker):
+    """Лучшая статья слабого совпадения не получает 1.0; сильное совпадение выше слабого"""
+    weak = ranker.score(None, 'у потерпевшего произошла кража')
+    strong = ranker.score(None, 'причинил тяжкий вред здоровью, опасный для жизни')
+    assert weak[0][0] == '158' and strong[0][0] == '111'
+    assert 0 < bm25_relevance(weak[0][1]) < bm25_relevance(strong[0][1]) < 1
+
+
+def test_scores_below_threshold_are_dropped(ranker, monkeypatch):
+    monkeypatch.setattr(article_ranker, 'RANKER_MIN_SCORE', 1e9)
+    assert ranker.score(None, 'кража имущества') == []
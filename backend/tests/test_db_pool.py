@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from db import ConnectionPool
+from serialization import RawJSON
+
+# Нужна база, собранная из db_migrations: DATABASE_URL=postgresql://... python -m pytest tests
+pytestmark = pytest.mark.skipif(not os.environ.get('DATABASE_URL'), reason='DATABASE_URL не задан')
+
+
+def jsonb_value(conn):
+    cur = conn.cursor()
+    cur.execute("""SELECT '{"a": 1}'::jsonb AS value""")
+    value = cur.fetchone()['value']
+    conn.rollback()
+    return value
+
+
+@pytest.fixture
+def connection_pool():
+    created = ConnectionPool(os.environ['DATABASE_URL'], min_size=1, max_size=2)
+    yield created
+    created._pool.closeall()
+
+
+def test_connections_closed_by_psycopg2_pool_do_not_leave_state(connection_pool):
+    """Сверх min_size пул psycopg2 закрывает возвращённое соединение сам; новое снова читает JSONB как RawJSON"""
+    for _ in range(3):
+        first, second = connection_pool.acquire(), connection_pool.acquire()
+        assert isinstance(jsonb_value(first), RawJSON) and isinstance(jsonb_value(second), RawJSON)
+        connection_pool.release(first)
+        connection_pool.release(second)
+        assert second.closed and not first.closed
+    assert connection_pool.stats()['idle'] == 1
+
+
+def test_returned_connection_records_last_use(connection_pool):
+    conn = connection_pool.acquire()
+    assert conn.last_used is None
+    connection_pool.release(conn)
+    assert conn.last_used is not None
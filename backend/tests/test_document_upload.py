@@ -0,0 +1,128 @@
+import errno
+import io
+import os
+import tracemalloc
+
+import psycopg2
+import pypdf
+import pytest
+from psycopg2.extras import RealDictCursor
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+import document_upload
+from document_upload import UploadError, append_chunk, finalize_upload, init_upload
+
+# Нужна база, собранная из db_migrations: DATABASE_URL=postgresql://... python -m pytest tests
+pytestmark = pytest.mark.skipif(not os.environ.get('DATABASE_URL'), reason='DATABASE_URL не задан')
+
+LARGE_PDF_BYTES = 50 * 1024 * 1024
+LARGE_PDF_PAGES = 200
+
+
+@pytest.fixture
+def conn():
+    """Соединение, все изменения которого откатываются после теста"""
+    connection = psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=RealDictCursor)
+    yield connection
+    connection.rollback()
+    connection.close()
+
+
+def make_pdf(pages: int, padding: int = 0) -> bytes:
+    """PDF с текстом 'page N' на каждой странице и несжимаемым неиспользуемым потоком на padding байт"""
+    writer = pypdf.PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica')
+    }))
+    for number in range(pages):
+        page = writer.add_blank_page(width=200, height=200)
+        pad = DecodedStreamObject()
+        pad.set_data(os.urandom(padding // pages))
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font}),
+            NameObject('/XObject'): DictionaryObject({NameObject('/Pad'): writer._add_object(pad)})
+        })
+        content = DecodedStreamObject()
+        content.set_data(f'BT /F1 12 Tf 20 100 Td (page {number}) Tj ET'.encode())
+        page[NameObject('/Contents')] = writer._add_object(content)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def upload_file(conn, path: str, file_name: str) -> dict:
+    """Клиентская сторона протокола: файл читается и отправляется частями по UPLOAD_CHUNK_MAX_BYTES"""
+    upload = init_upload(conn, file_name, os.path.getsize(path))
+    with open(path, 'rb') as source:
+        while True:
+            chunk = source.read(upload['chunk_size'])
+            if not chunk:
+                break
+            append_chunk(conn, upload['upload_id'], source.tell() - len(chunk), chunk)
+    return finalize_upload(conn, upload['upload_id'])
+
+
+def test_resent_chunk_is_duplicate(conn):
+    upload = init_upload(conn, 'протокол.txt', 8)
+    append_chunk(conn, upload['upload_id'], 0, b'abcd')
+    assert append_chunk(conn, upload['upload_id'], 0, b'abcd') == {
+        'upload_id': upload['upload_id'], 'received_bytes': 4, 'duplicate': True
+    }
+
+
+@pytest.mark.parametrize('offset, chunk', [
+    (0, b'abcx'),    # другие байты по принятому смещению
+    (0, b'ab'),      # другая граница части
+    (2, b'cd'),      # смещение внутри принятой части
+    (2, b'cdef'),    # часть заходит за принятые байты
+])
+def test_chunk_conflicting_with_accepted_bytes_is_rejected(conn, offset, chunk):
+    upload = init_upload(conn, 'протокол.txt', 8)
+    append_chunk(conn, upload['upload_id'], 0, b'abcd')
+    with pytest.raises(UploadError) as error:
+        append_chunk(conn, upload['upload_id'], offset, chunk)
+    assert (error.value.status_code, error.value.details) == (409, {'expected_offset': 4})
+
+
+@pytest.mark.parametrize('failure', ['write', 'parse'])
+def test_finalize_removes_temp_file_on_failure(conn, monkeypatch, tmp_path, failure):
+    monkeypatch.setattr(document_upload.tempfile, 'tempdir', str(tmp_path))
+    if failure == 'write':
+        named_temporary_file = document_upload.tempfile.NamedTemporaryFile
+
+        def no_space(data):
+            raise OSError(errno.ENOSPC, 'No space left on device')
+
+        def full_disk(*args, **kwargs):
+            assembled = named_temporary_file(*args, **kwargs)
+            assembled.write = no_space
+            return assembled
+        monkeypatch.setattr(document_upload.tempfile, 'NamedTemporaryFile', full_disk)
+
+    upload = init_upload(conn, 'протокол.pdf', 16)
+    append_chunk(conn, upload['upload_id'], 0, b'not a pdf at all')
+    with pytest.raises(OSError if failure == 'write' else UploadError):
+        finalize_upload(conn, upload['upload_id'])
+    assert os.listdir(tmp_path) == []
+
+
+def test_50mb_pdf_upload_peak_memory(conn, tmp_path):
+    """Пиковая память загрузки частями не растёт с размером файла: в памяти не больше
+    ASSEMBLE_FETCH_CHUNKS частей сборки и страницы разбора, а не копии всего файла"""
+    path = tmp_path / 'протокол.pdf'
+    path.write_bytes(make_pdf(LARGE_PDF_PAGES, LARGE_PDF_BYTES))
+    assert path.stat().st_size > LARGE_PDF_BYTES
+
+    tracemalloc.start()
+    try:
+        parsed = upload_file(conn, str(path), path.name)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert parsed['text'].split('\n') == [f'page {number}' for number in range(LARGE_PDF_PAGES)]
+    chunk_budget = (document_upload.ASSEMBLE_FETCH_CHUNKS + 4) * document_upload.UPLOAD_CHUNK_MAX_BYTES
+    print(f"peak traced memory: {peak / 2 ** 20:.1f} MB for a {path.stat().st_size / 2 ** 20:.1f} MB PDF")
+    assert peak < chunk_budget < path.stat().st_size
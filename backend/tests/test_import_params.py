@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+import index
+import session_auth
+
+
+@pytest.fixture(autouse=True)
+def officer_session(monkeypatch):
+    """Импорт требует сессии; токен проверяется без базы"""
+    monkeypatch.setattr(session_auth, 'validate_token', lambda token, conn=None: {'user_id': 2, 'role': 'officer'})
+
+
+@pytest.mark.parametrize('batch_size', ['abc', '1.5', '0', '-1', '²', '5001'])
+def test_invalid_batch_size_is_rejected(batch_size):
+    response = index.handler({
+        'httpMethod': 'POST',
+        'queryStringParameters': {'action': 'import', 'batch_size': batch_size},
+        'headers': {'X-Authorization': 'officer-token'},
+        'body': ''
+    }, None)
+    assert response['statusCode'] == 400
+    assert 'batch_size' in json.loads(response['body'])['error']
@@ -0,0 +1,51 @@
+from keyword_matcher import KeywordMatcher
+
+KEYWORDS = {
+    'дал взятку': {'291': 1.0},
+    'взятку': {'290': 1.0},
+    'похищение': {'126': 1.0},
+    'похищение человека': {'126': 1.0, '127': 0.8},
+    'нож': {'111': 0.8},
+}
+
+
+def test_phrase_matches_across_whitespace():
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher.match('он дал взятку инспектору')[0] == ['дал взятку', 'взятку']
+
+
+def test_phrase_does_not_bridge_punctuation():
+    """Знак препинания — разрыв фразы, как и у прежнего поиска подстрок"""
+    matcher = KeywordMatcher(KEYWORDS)
+    for text in ['дал, взятку', 'дал — взятку', 'дал. взятку', '«дал» взятку', 'дал,взятку']:
+        assert matcher.match(text)[0] == ['взятку'], text
+
+
+def test_phrase_does_not_bridge_numbers():
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher.match('дал 5000 взятку')[0] == ['взятку']
+
+
+def test_nested_phrases_found_in_one_pass():
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher.match('похищение человека')[0] == ['похищение', 'похищение человека']
+
+
+def test_word_boundaries():
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher.match('изъяты ножницы') == ([], {})
+
+
+def test_word_forms_merge_into_first_dictionary_entry():
+    """Формы одной фразы («украл» / «украли») — одна запись matched_keywords под первой формой
+    словаря; статьи объединяются с наибольшим весом. Этот список показывает фронтенд"""
+    matcher = KeywordMatcher({
+        'украл': {'158': 1.0},
+        'кража': {'158': 1.0, '158.1': 0.8},
+        'украли': {'158': 0.9, '161': 0.8},
+    })
+    assert matcher.keywords == ['украл', 'кража']
+    assert matcher.match('они украли телефон') == (['украл'], {'158': 1.0, '161': 0.8})
+    assert matcher.match('кражу совершили те, кто украл телефон') == (
+        ['украл', 'кража'], {'158': 1.0, '161': 0.8, '158.1': 0.8}
+    )
@@ -0,0 +1,67 @@
+import importlib.util
+import os
+
+import pytest
+
+# Общие модули (db, legislation_cache, …) у функций одинаковые, index функции legislation грузится по пути
+SPEC = importlib.util.spec_from_file_location(
+    'legislation_index', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'legislation', 'index.py')
+)
+legislation = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(legislation)
+
+NUMBERS = ['105', '105.1', '106', '107', '158', '158.1', '159', '159.1', '160']
+ARTICLES = [{'article_number': number} for number in NUMBERS]
+POSITIONS = {number: i for i, number in enumerate(NUMBERS)}
+
+
+def page_numbers(after: str, limit: int) -> tuple:
+    page, next_cursor = legislation.paginate(ARTICLES, POSITIONS, after, limit)
+    return [art['article_number'] for art in page], next_cursor
+
+
+def test_known_cursor_continues_after_article():
+    assert page_numbers('105.1', 3) == (['106', '107', '158'], '158')
+
+
+def test_stale_cursor_seeks_by_natural_order():
+    """Удалённая статья 105.5 — страница продолжается со 106, а не с первой"""
+    assert page_numbers('105.5', 2) == (['106', '107'], '107')
+    assert page_numbers('158.2', 5) == (['159', '159.1', '160'], None)
+    assert page_numbers('1000', 5) == ([], None)
+
+
+def test_sort_key_matches_generated_columns():
+    assert legislation.article_sort_key('105.1') == (105, 1, '105.1')
+    assert legislation.article_sort_key('228') == (228, 0, '228')
+    assert legislation.article_sort_key('Преамбула')[0] == legislation.SORT_MAJOR_LAST
+
+
+def test_search_cursor_round_trip():
+    row = {'_exact': False, '_prefix': True, '_rank': 0.0607927, '_sort_major': 158, '_sort_minor': 1,
+           'article_number': '158.1'}
+    cursor = legislation.encode_search_cursor(row)
+    assert legislation.decode_search_cursor(cursor) == [True, False, -0.0607927, 158, 1, '158.1']
+
+
+@pytest.mark.parametrize('cursor', ['158', 'не-курсор', 'WzEsMl0'])
+def test_malformed_search_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        legislation.decode_search_cursor(cursor)
+
+
+def test_search_prefix_matches_wildcards_literally():
+    _, params = legislation.search_sql('uk_rf', ['article_number'], '1_5%\\', 'особо_', None, None, 10)
+    assert params[1] == params[3] == '1\\_5\\%\\\\%'
+    assert params[4] == '%особо\\_%'
+
+
+@pytest.mark.parametrize('value', ['abc', '1.5', '10x'])
+def test_non_integer_param_is_rejected(value):
+    with pytest.raises(ValueError, match='limit'):
+        legislation.int_param({'limit': value}, 'limit')
+
+
+def test_missing_int_param_is_none():
+    assert legislation.int_param({}, 'limit') is None
+    assert legislation.int_param({'limit': '-5'}, 'limit') == -5
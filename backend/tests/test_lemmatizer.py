@@ -0,0 +1,22 @@
+from keyword_matcher import KeywordMatcher
+from lemmatizer import lemmatize
+
+
+def test_inflections_share_lemma():
+    assert lemmatize('кражу') == lemmatize('кража')
+    assert lemmatize('угнали') == lemmatize('угнал')
+    assert lemmatize('наркотических') == lemmatize('наркотическое')
+
+
+def test_dat_forms_do_not_collide_with_particle_da():
+    """Формы «дать» не сводятся к частице «да»"""
+    assert lemmatize('да') != lemmatize('дал')
+    for form in ('дал', 'дала', 'дали', 'дать'):
+        assert lemmatize(form) == lemmatize('дать')
+
+
+def test_particle_da_does_not_match_dal_vzyatku():
+    matcher = KeywordMatcher({'дал взятку': {'291': 1.0}, 'взятка': {'290': 1.0}})
+    matched_keywords, keyword_articles = matcher.match('да взятку он не брал')
+    assert matched_keywords == ['взятка']
+    assert '291' not in keyword_articles
@@ -0,0 +1,82 @@
+import importlib.util
+import os
+
+import psycopg2
+import pytest
+from psycopg2.extras import RealDictCursor
+
+# Лимитер — модуль функции auth, грузится по пути
+SPEC = importlib.util.spec_from_file_location(
+    'login_limiter', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'auth', 'login_limiter.py')
+)
+login_limiter = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(login_limiter)
+
+# Нужна база, собранная из db_migrations: DATABASE_URL=postgresql://... python -m pytest tests
+pytestmark = pytest.mark.skipif(not os.environ.get('DATABASE_URL'), reason='DATABASE_URL не задан')
+
+POLICIES = {'user': (10, 3600), 'ip': (100, 3600)}
+USERNAME = 'limiter_test'
+IP = '192.0.2.10'
+
+
+@pytest.fixture
+def conn():
+    """Лимитер фиксирует попытки сам, поэтому счётчики теста удаляются явно"""
+    connection = psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=RealDictCursor)
+    yield connection
+    connection.rollback()
+    connection.cursor().execute("DELETE FROM login_rate_limits WHERE key IN (%s, %s)", (f'user:{USERNAME}', f'ip:{IP}'))
+    connection.commit()
+    connection.close()
+
+
+def shared_attempts(conn, key: str) -> int:
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(SUM(attempts), 0) AS attempts FROM login_rate_limits WHERE key = %s", (key,))
+    attempts = cur.fetchone()['attempts']
+    conn.commit()
+    return attempts
+
+
+def test_attempts_far_from_limit_are_written_in_batches(conn):
+    limiter = login_limiter.LoginLimiter(POLICIES, sync_fraction=0.5, sync_interval=60)
+    for _ in range(4):
+        limiter.check(conn, USERNAME, IP)
+
+    # Первая попытка неизвестного ключа читает общий счёт, следующие три копятся в памяти
+    assert shared_attempts(conn, f'user:{USERNAME}') == 1
+    assert limiter.stats()['pending'] == 6
+
+    # Пятая доводит оценку до половины лимита логина — накопленное уходит в таблицу одним запросом
+    limiter.check(conn, USERNAME, IP)
+    assert shared_attempts(conn, f'user:{USERNAME}') == 5
+    assert shared_attempts(conn, f'ip:{IP}') == 5
+    assert limiter.stats()['pending'] == 0
+
+
+def test_limit_counts_attempts_of_other_instances(conn):
+    first = login_limiter.LoginLimiter(POLICIES, sync_fraction=0.5, sync_interval=60)
+    second = login_limiter.LoginLimiter(POLICIES, sync_fraction=0.5, sync_interval=60)
+    for _ in range(7):
+        first.check(conn, USERNAME, IP)
+    assert shared_attempts(conn, f'user:{USERNAME}') == 7
+
+    # Второй экземпляр видит общий счёт при первой же попытке и пишет каждую следующую сразу
+    for _ in range(3):
+        second.check(conn, USERNAME, IP)
+    # Одиннадцатая отсекается по счёту в памяти, без записи в таблицу
+    with pytest.raises(login_limiter.RateLimitExceeded):
+        second.check(conn, USERNAME, IP)
+    assert shared_attempts(conn, f'user:{USERNAME}') == 10
+
+
+def test_reset_user_drops_pending_attempts(conn):
+    limiter = login_limiter.LoginLimiter(POLICIES, sync_fraction=0.5, sync_interval=60)
+    for _ in range(3):
+        limiter.check(conn, USERNAME, IP)
+    limiter.reset_user(conn.cursor(), USERNAME)
+    conn.commit()
+
+    assert limiter.stats()['pending'] == 2
+    assert shared_attempts(conn, f'user:{USERNAME}') == 0
@@ -0,0 +1,88 @@
+import io
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pypdf
+import pytest
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+import parse_document
+from parse_document import PdfPages, extract_text
+
+
+def make_pdf(pages: int) -> bytes:
+    """PDF, на каждой странице которого написан её номер: 'page 0', 'page 1', …"""
+    writer = pypdf.PdfWriter()
+    font = DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica')
+    })
+    for number in range(pages):
+        page = writer.add_blank_page(width=200, height=200)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): writer._add_object(font)})
+        })
+        content = DecodedStreamObject()
+        content.set_data(f'BT /F1 12 Tf 20 100 Td (page {number}) Tj ET'.encode())
+        page[NameObject('/Contents')] = writer._add_object(content)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def expected(pages: int) -> list:
+    return [f'page {number}' for number in range(pages)]
+
+
+def test_page_budget_marks_result_truncated():
+    pages = PdfPages(make_pdf(5), max_pages=3)
+    assert (list(pages), pages.truncated) == (expected(3), True)
+
+
+def test_text_budget_marks_result_truncated():
+    assert parse_document.collect_text(iter(expected(5)), max_bytes=20) == ('page 0\npage 1\npage 2', True)
+
+
+def test_whole_document_is_not_truncated():
+    text, _, truncated = extract_text(make_pdf(3), 'протокол.pdf')
+    assert (text.split('\n'), truncated) == (expected(3), False)
+
+
+def test_parallel_workers_read_spilled_file(monkeypatch, tmp_path):
+    """Байты PDF передаются процессам через временный файл, который удаляется после обхода"""
+    monkeypatch.setattr(parse_document, 'PARALLEL_MIN_PAGES', 2)
+    monkeypatch.setattr(parse_document, 'PAGES_PER_TASK', 3)
+    monkeypatch.setattr(parse_document.tempfile, 'tempdir', str(tmp_path))
+    assert list(PdfPages(make_pdf(8), workers=2)) == expected(8)
+    assert os.listdir(tmp_path) == []
+
+
+class FailingExecutor:
+    """Пул, который отдаёт first_tasks заданий и затем ломается, как при гибели процесса"""
+    first_tasks = 1
+
+    def __init__(self, max_workers, initializer, initargs):
+        initializer(*initargs)
+
+    def map(self, function, ranges):
+        for task, page_range in enumerate(ranges):
+            if task == self.first_tasks:
+                raise BrokenProcessPool('A process in the process pool was terminated abruptly')
+            yield function(page_range)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class UnavailableExecutor:
+    def __init__(self, *args, **kwargs):
+        raise OSError(38, 'Function not implemented')
+
+
+@pytest.mark.parametrize('executor', [FailingExecutor, UnavailableExecutor])
+def test_pool_failure_falls_back_to_serial(monkeypatch, executor):
+    monkeypatch.setattr(parse_document, 'PARALLEL_MIN_PAGES', 2)
+    monkeypatch.setattr(parse_document, 'PAGES_PER_TASK', 3)
+    monkeypatch.setattr(parse_document, 'ProcessPoolExecutor', executor)
+    assert list(PdfPages(make_pdf(8), workers=2)) == expected(8)
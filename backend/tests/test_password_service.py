@@ -0,0 +1,28 @@
+import importlib.util
+import os
+
+import pytest
+
+# Сервис паролей — модуль функции auth, грузится по пути
+SPEC = importlib.util.spec_from_file_location(
+    'password_service', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'auth', 'password_service.py')
+)
+password_service = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(password_service)
+
+
+def test_matching_password_is_accepted():
+    password_hash = password_service.hash_password('пароль', rounds=4)
+    assert password_service.verify_password('пароль', password_hash) is True
+    assert password_service.verify_password('другой', password_hash) is False
+
+
+@pytest.mark.parametrize('password_hash', [None, '', 'не-bcrypt', 12345])
+def test_malformed_hash_is_a_mismatch(password_hash):
+    """Повреждённый или пустой хеш — отказ во входе, а не ошибка 500"""
+    assert password_service.verify_password('пароль', password_hash) is False
+
+
+def test_rehash_check_tolerates_missing_hash():
+    assert password_service.hash_rounds(None) == 0
+    assert password_service.needs_rehash(None) is True
@@ -0,0 +1,51 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import serialization
+from serialization import RawJSON, dumps
+
+# Строка, которую прежняя подстановка по меткам принимала за место готового JSON
+MARKER_LIKE = '\x000\x00'
+
+
+def body() -> dict:
+    return {
+        'id': 7,
+        'created_at': datetime(2026, 1, 23, 10, 30, 15),
+        'incident_date': date(2026, 1, 22),
+        'relevance_score': Decimal('0.850'),
+        'description': f'Кража "телефона" {MARKER_LIKE} \\ конец',
+        'analysis_result': RawJSON('{"suggested_articles": ["158"], "note": "\\u0000 и \\"кавычки\\""}'),
+        'results': [RawJSON('[1, 2.5, null]'), RawJSON('{}'), None, MARKER_LIKE],
+        'score': 1.5
+    }
+
+
+@pytest.fixture(params=['json', 'orjson'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson' and not (serialization.orjson and hasattr(serialization.orjson, 'Fragment')):
+        pytest.skip('orjson с Fragment (3.9+) не установлен')
+    monkeypatch.setattr(serialization, 'JSON_ORJSON', request.param == 'orjson')
+    return request.param
+
+
+def test_raw_json_is_embedded_and_strings_stay_strings(encoder):
+    decoded = json.loads(dumps(body()))
+    assert decoded['description'] == body()['description']
+    assert decoded['results'] == [[1, 2.5, None], {}, None, MARKER_LIKE]
+    assert decoded['analysis_result'] == {'suggested_articles': ['158'], 'note': '\x00 и "кавычки"'}
+
+
+def test_matches_default_str_format(encoder):
+    expected = json.loads(json.dumps({
+        **body(), 'analysis_result': None, 'results': None
+    }, default=str, ensure_ascii=False))
+    decoded = json.loads(dumps({**body(), 'analysis_result': None, 'results': None}))
+    assert decoded == expected
+
+
+def test_non_ascii_is_not_escaped(encoder):
+    assert 'Кража' in dumps(body())
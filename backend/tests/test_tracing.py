@@ -0,0 +1,45 @@
+import pytest
+
+import session_auth
+import tracing
+
+
+@tracing.traced('analysis')
+def handler(event, context):
+    return {'statusCode': 200, 'headers': {}, 'traced': tracing._current.get() is not None}
+
+
+@pytest.fixture(autouse=True)
+def sessions(monkeypatch):
+    """Действующий токен — только 'valid'; выборка выключена, секрет задан"""
+    monkeypatch.setattr(session_auth, 'validate_token', lambda token, conn=None: {'user_id': 1} if token == 'valid' else None)
+    monkeypatch.setattr(tracing, 'TRACE_SAMPLE_RATE', 0.0)
+    monkeypatch.setattr(tracing, 'TRACE_SECRET', 'trace-secret')
+
+
+@pytest.mark.parametrize('headers, traced', [
+    ({}, False),
+    ({'X-Trace': '1'}, False),
+    ({'X-Trace': '1', 'X-Authorization': 'stolen'}, False),
+    ({'X-Trace': '1', 'X-Authorization': 'valid'}, True),
+    ({'x-trace': '1', 'x-authorization': 'Bearer valid'}, True),
+    ({'X-TRACE': '1', 'X-Authorization': 'valid'}, True),
+    ({'X-Trace': '0', 'X-Authorization': 'valid'}, False),
+    ({'X-Trace': 'trace-secret'}, True),
+    ({'x-Trace': 'trace-secret'}, True),
+    ({'X-Trace': 'wrong-secret'}, False),
+])
+def test_forced_tracing_requires_session_or_secret(headers, traced):
+    assert handler({'httpMethod': 'GET', 'headers': headers}, None)['traced'] is traced
+
+
+def test_empty_secret_does_not_enable_tracing(monkeypatch):
+    monkeypatch.setattr(tracing, 'TRACE_SECRET', '')
+    assert handler({'httpMethod': 'GET', 'headers': {'X-Trace': ''}}, None)['traced'] is False
+
+
+def test_session_lookup_failure_skips_tracing(monkeypatch):
+    def unavailable(token, conn=None):
+        raise ConnectionError('база недоступна')
+    monkeypatch.setattr(session_auth, 'validate_token', unavailable)
+    assert handler({'httpMethod': 'GET', 'headers': {'X-Trace': '1', 'X-Authorization': 'valid'}}, None)['traced'] is False
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+import index
+
+
+def call(action: str, query_params: dict, body: str) -> dict:
+    return index.handler({
+        'httpMethod': 'POST',
+        'queryStringParameters': {'action': action, **query_params},
+        'body': body
+    }, None)
+
+
+@pytest.mark.parametrize('action, query_params, body', [
+    ('upload_init', {}, json.dumps({'file_name': 'a.pdf', 'file_size': 'много'})),
+    ('upload_init', {}, json.dumps({'file_name': 'a.pdf', 'file_size': None})),
+    ('upload_init', {}, '{не json'),
+    ('upload_init', {}, '[]'),
+    ('upload_chunk', {'upload_id': 'x', 'offset': '1.5'}, 'AAAA'),
+    ('upload_chunk', {'upload_id': 'x', 'offset': '0'}, 'AAA'),
+    ('upload_finalize', {}, '{не json'),
+])
+def test_malformed_upload_request_is_rejected_before_database(action, query_params, body):
+    """Ответ 400 до обращения к базе: соединение в тестах без DATABASE_URL не открывается"""
+    response = call(action, query_params, body)
+    assert response['statusCode'] == 400
+    assert json.loads(response['body'])['error'].startswith('Некорректный запрос загрузки')
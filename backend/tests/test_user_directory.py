@@ -0,0 +1,62 @@
+import importlib.util
+import os
+
+import psycopg2
+import pytest
+from psycopg2.extras import RealDictCursor
+
+# Справочник — модуль функции auth, грузится по пути
+SPEC = importlib.util.spec_from_file_location(
+    'user_directory', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'auth', 'user_directory.py')
+)
+user_directory = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(user_directory)
+
+# Нужна база, собранная из db_migrations: DATABASE_URL=postgresql://... python -m pytest tests
+pytestmark = pytest.mark.skipif(not os.environ.get('DATABASE_URL'), reason='DATABASE_URL не задан')
+
+
+@pytest.fixture
+def conn():
+    """Соединение, все изменения которого откатываются после теста"""
+    connection = psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=RealDictCursor)
+    yield connection
+    connection.rollback()
+    connection.close()
+
+
+def add_user(cur, username: str, created_at) -> int:
+    cur.execute("""
+        INSERT INTO users (username, password_hash, full_name, department, role, created_at)
+        VALUES (%s, 'x', %s, 'Отдел справочника', 'officer', %s)
+        RETURNING id
+    """, (username, username, created_at))
+    return cur.fetchone()['id']
+
+
+def all_pages(conn, query_params: dict) -> list:
+    users, after = user_directory.list_users(conn, query_params)
+    pages = [users]
+    while after:
+        users, after = user_directory.list_users(conn, {**query_params, 'after': after})
+        pages.append(users)
+    return pages
+
+
+def test_users_without_created_at_are_paged_last(conn):
+    cur = conn.cursor()
+    dated = add_user(cur, 'directory_dated', '2026-01-23 10:00')
+    undated = [add_user(cur, f'directory_undated_{i}', None) for i in range(3)]
+
+    users = [user for page in all_pages(conn, {'department': 'Отдел справочника', 'limit': '1'}) for user in page]
+    assert [user['id'] for user in users] == [dated] + sorted(undated, reverse=True)
+    assert [user['created_at'] is None for user in users] == [False, True, True, True]
+
+
+def test_only_requested_fields_are_returned(conn):
+    add_user(conn.cursor(), 'directory_fields', None)
+
+    users, after = user_directory.list_users(conn, {'department': 'Отдел справочника', 'fields': 'username', 'limit': '1'})
+    assert users == [{'username': 'directory_fields'}]
+    assert after is not None
+    assert user_directory.list_users(conn, {'department': 'Отдел справочника', 'after': after})[0] == []
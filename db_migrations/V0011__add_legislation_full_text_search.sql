@@ -0,0 +1,38 @@
+-- Полнотекстовый поиск по законодательству: tsvector в русской конфигурации с GIN-индексами
+-- и триграммные индексы для поиска по номеру статьи
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Веса: номер и название статьи важнее категории, категория важнее полного текста
+ALTER TABLE uk_rf_articles ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(article_number, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(category, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(full_text, '')), 'C')
+    ) STORED;
+
+ALTER TABLE upk_rf_articles ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(article_number, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(category, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(full_text, '')), 'C')
+    ) STORED;
+
+ALTER TABLE constitution_articles ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(article_number, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(category, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(full_text, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_uk_rf_search_vector ON uk_rf_articles USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_upk_rf_search_vector ON upk_rf_articles USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_constitution_search_vector ON constitution_articles USING GIN (search_vector);
+
+-- Триграммы обслуживают LIKE/ILIKE по номеру статьи ('158%', '%105.1%')
+CREATE INDEX IF NOT EXISTS idx_uk_rf_article_number_trgm ON uk_rf_articles USING GIN (article_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_upk_rf_article_number_trgm ON upk_rf_articles USING GIN (article_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_constitution_article_number_trgm ON constitution_articles USING GIN (article_number gin_trgm_ops);
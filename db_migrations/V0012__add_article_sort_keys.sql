@@ -0,0 +1,25 @@
+-- Естественный порядок номеров статей: '105' < '105.1' < '106' < '1051'
+-- Ключ сортировки (целая часть, подпункт) хранится в индексируемых генерируемых колонках
+
+ALTER TABLE uk_rf_articles
+    ADD COLUMN IF NOT EXISTS sort_major INTEGER
+        GENERATED ALWAYS AS (NULLIF(regexp_replace(split_part(article_number, '.', 1), '\D', '', 'g'), '')::integer) STORED,
+    ADD COLUMN IF NOT EXISTS sort_minor INTEGER
+        GENERATED ALWAYS AS (COALESCE(NULLIF(regexp_replace(split_part(article_number, '.', 2), '\D', '', 'g'), '')::integer, 0)) STORED;
+
+ALTER TABLE upk_rf_articles
+    ADD COLUMN IF NOT EXISTS sort_major INTEGER
+        GENERATED ALWAYS AS (NULLIF(regexp_replace(split_part(article_number, '.', 1), '\D', '', 'g'), '')::integer) STORED,
+    ADD COLUMN IF NOT EXISTS sort_minor INTEGER
+        GENERATED ALWAYS AS (COALESCE(NULLIF(regexp_replace(split_part(article_number, '.', 2), '\D', '', 'g'), '')::integer, 0)) STORED;
+
+ALTER TABLE constitution_articles
+    ADD COLUMN IF NOT EXISTS sort_major INTEGER
+        GENERATED ALWAYS AS (NULLIF(regexp_replace(split_part(article_number, '.', 1), '\D', '', 'g'), '')::integer) STORED,
+    ADD COLUMN IF NOT EXISTS sort_minor INTEGER
+        GENERATED ALWAYS AS (COALESCE(NULLIF(regexp_replace(split_part(article_number, '.', 2), '\D', '', 'g'), '')::integer, 0)) STORED;
+
+-- Упорядоченные страницы и диапазоны ("статьи 158–168") читаются прямо из индекса
+CREATE INDEX IF NOT EXISTS idx_uk_rf_sort_key ON uk_rf_articles (sort_major, sort_minor, article_number);
+CREATE INDEX IF NOT EXISTS idx_upk_rf_sort_key ON upk_rf_articles (sort_major, sort_minor, article_number);
+CREATE INDEX IF NOT EXISTS idx_constitution_sort_key ON constitution_articles (sort_major, sort_minor, article_number);
@@ -0,0 +1,14 @@
+-- Кэш извлечённого текста документов по SHA-256 содержимого файла
+CREATE TABLE IF NOT EXISTS document_text_cache (
+    content_hash CHAR(64) NOT NULL,
+    file_type VARCHAR(50) NOT NULL,
+    extracted_text TEXT NOT NULL,
+    text_length INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (content_hash, file_type)
+);
+
+-- Хеш содержимого у вложений: одинаковые документы разных дел находятся по индексу
+ALTER TABLE document_attachments ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_document_attachments_content_hash ON document_attachments(content_hash);
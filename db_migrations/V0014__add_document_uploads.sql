@@ -0,0 +1,24 @@
+-- Поэтапная загрузка документов: сессия загрузки и её части
+CREATE TABLE IF NOT EXISTS document_uploads (
+    id UUID PRIMARY KEY,
+    file_name VARCHAR(255) NOT NULL,
+    file_type VARCHAR(50) NOT NULL,
+    file_size BIGINT NOT NULL,
+    received_bytes BIGINT NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'open',
+    content_hash CHAR(64),
+    uploaded_by INTEGER REFERENCES users(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Части файла по смещению; удаляются после сборки файла
+CREATE TABLE IF NOT EXISTS document_upload_chunks (
+    upload_id UUID NOT NULL REFERENCES document_uploads(id) ON DELETE CASCADE,
+    chunk_offset BIGINT NOT NULL,
+    data BYTEA NOT NULL,
+    PRIMARY KEY (upload_id, chunk_offset)
+);
+
+-- Поиск брошенных незавершённых загрузок для очистки
+CREATE INDEX IF NOT EXISTS idx_document_uploads_status_created ON document_uploads(status, created_at);
@@ -0,0 +1,20 @@
+-- Очередь асинхронных анализов: статус анализа в crime_analyses проходит pending → processing → completed/failed
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id SERIAL PRIMARY KEY,
+    analysis_id INTEGER NOT NULL REFERENCES crime_analyses(id),
+    payload JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    locked_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Выборка очереди обработчиком: только ожидающие задания в порядке поступления
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_queued ON analysis_jobs(id) WHERE status = 'queued';
+
+-- Поиск зависших заданий и опрос статуса по анализу
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_processing ON analysis_jobs(locked_at) WHERE status = 'processing';
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_analysis_id ON analysis_jobs(analysis_id);
@@ -0,0 +1,11 @@
+-- Постраничная выдача списка анализов по курсору (created_at, id), от новых к старым
+CREATE INDEX IF NOT EXISTS idx_crime_analyses_created_id ON crime_analyses (created_at DESC, id DESC);
+
+-- Фильтры списка с тем же порядком выдачи
+CREATE INDEX IF NOT EXISTS idx_crime_analyses_status_created ON crime_analyses (status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_crime_analyses_officer_created ON crime_analyses (officer_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_crime_analyses_category_created ON crime_analyses (category, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_crime_analyses_incident_date ON crime_analyses (incident_date);
+
+-- Фильтр по статье: анализы, связанные со статьёй кодекса
+CREATE INDEX IF NOT EXISTS idx_analysis_articles_article ON analysis_articles (article_type, article_id, analysis_id);
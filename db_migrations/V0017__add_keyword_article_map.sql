@@ -0,0 +1,324 @@
+-- Словарь ключевых слов анализа: ключевое слово (или фраза) → статья кодекса с весом.
+-- Основная статья ключевого слова получает вес 1.0, сопутствующие — 0.8
+CREATE TABLE IF NOT EXISTS keyword_article_map (
+    id SERIAL PRIMARY KEY,
+    keyword VARCHAR(200) NOT NULL,
+    article_type VARCHAR(50) NOT NULL DEFAULT 'uk_rf',
+    article_number VARCHAR(20) NOT NULL,
+    weight NUMERIC(4,3) NOT NULL DEFAULT 1.0 CHECK (weight > 0 AND weight <= 1),
+    is_active BOOLEAN NOT NULL DEFAULT true,
+    revision BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (keyword, article_type, article_number)
+);
+
+-- Ревизия строки растёт при каждом изменении: функции дозагружают только изменённые строки
+CREATE SEQUENCE IF NOT EXISTS keyword_article_map_revision_seq;
+
+CREATE OR REPLACE FUNCTION keyword_article_map_touch() RETURNS trigger AS $$
+BEGIN
+    NEW.revision := nextval('keyword_article_map_revision_seq');
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Повторный прогон миграции пересоздаёт триггер
+DROP TRIGGER IF EXISTS keyword_article_map_revision ON keyword_article_map;
+CREATE TRIGGER keyword_article_map_revision
+    BEFORE INSERT OR UPDATE ON keyword_article_map
+    FOR EACH ROW EXECUTE FUNCTION keyword_article_map_touch();
+
+CREATE INDEX IF NOT EXISTS idx_keyword_article_map_revision ON keyword_article_map(revision);
+CREATE INDEX IF NOT EXISTS idx_keyword_article_map_article ON keyword_article_map(article_type, article_number);
+
+-- Преступления против собственности
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('кража', '158', 1.0),
+('кража', '158.1', 0.8),
+('украл', '158', 1.0),
+('украли', '158', 1.0),
+('похитил', '158', 1.0),
+('похитил', '161', 0.8),
+('похитил', '126', 0.8),
+('похищение', '158', 1.0),
+('похищение', '126', 0.8),
+('воровство', '158', 1.0),
+('тайное хищение', '158', 1.0),
+('грабеж', '161', 1.0),
+('грабёж', '161', 1.0),
+('открытое хищение', '161', 1.0),
+('отобрал', '161', 1.0),
+('разбой', '162', 1.0),
+('нападение', '162', 1.0),
+('нападение', '213', 0.8),
+('оружие', '162', 1.0),
+('оружие', '222', 0.8),
+('оружие', '223', 0.8),
+('оружие', '226', 0.8),
+('пистолет', '222', 1.0),
+('пистолет', '162', 0.8),
+('нож', '162', 1.0),
+('нож', '222', 0.8),
+('автомат', '222', 1.0),
+('взрывчатка', '222.1', 1.0),
+('взрывчатка', '223.1', 0.8),
+('мошенничество', '159', 1.0),
+('мошенничество', '159.1', 0.8),
+('мошенничество', '159.2', 0.8),
+('мошенничество', '159.3', 0.8),
+('мошенничество', '159.4', 0.8),
+('мошенничество', '159.5', 0.8),
+('мошенничество', '159.6', 0.8),
+('обман', '159', 1.0),
+('обман', '165', 0.8),
+('обманул', '159', 1.0),
+('развод', '159', 1.0),
+('фальшивый', '186', 1.0),
+('фальшивый', '187', 0.8),
+('поддельный', '186', 1.0),
+('поддельный', '187', 0.8),
+('поддельный', '327', 0.8),
+('подделка', '186', 1.0),
+('подделка', '327', 0.8),
+('вымогательство', '163', 1.0),
+('вымогал', '163', 1.0),
+('требовал деньги', '163', 1.0),
+('присвоение', '160', 1.0),
+('растрата', '160', 1.0),
+('угон', '166', 1.0),
+('угнал машину', '166', 1.0),
+('поджог', '167', 1.0),
+('поджог', '205', 0.8),
+('уничтожение имущества', '167', 1.0),
+('повреждение имущества', '167', 1.0),
+('повреждение имущества', '168', 0.8)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Преступления против жизни и здоровья
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('убийство', '105', 1.0),
+('убил', '105', 1.0),
+('лишил жизни', '105', 1.0),
+('умышленное убийство', '105', 1.0),
+('двух человек', '105.1', 1.0),
+('нескольких человек', '105.1', 1.0),
+('младенец', '106', 1.0),
+('новорожденный', '106', 1.0),
+('аффект', '107', 1.0),
+('аффект', '113', 0.8),
+('необходимая оборона', '108', 1.0),
+('необходимая оборона', '114', 0.8),
+('самооборона', '108', 1.0),
+('по неосторожности', '109', 1.0),
+('по неосторожности', '118', 0.8),
+('неосторожно', '109', 1.0),
+('неосторожно', '118', 0.8),
+('неосторожно', '168', 0.8),
+('суицид', '110', 1.0),
+('самоубийство', '110', 1.0),
+('доведение до самоубийства', '110', 1.0),
+('избил', '111', 1.0),
+('избил', '112', 0.8),
+('избил', '115', 0.8),
+('избил', '116', 0.8),
+('избиение', '111', 1.0),
+('избиение', '112', 0.8),
+('избиение', '116', 0.8),
+('побои', '116', 1.0),
+('удар', '115', 1.0),
+('удар', '116', 0.8),
+('тяжкий вред', '111', 1.0),
+('средний вред', '112', 1.0),
+('легкий вред', '115', 1.0),
+('истязание', '117', 1.0),
+('пытки', '117', 1.0),
+('угроза убийством', '119', 1.0),
+('угрожал убить', '119', 1.0),
+('вич', '122', 1.0),
+('спид', '122', 1.0),
+('заражение', '121', 1.0),
+('заражение', '122', 0.8),
+('венерическая болезнь', '121', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Половые преступления
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('изнасилование', '131', 1.0),
+('изнасиловал', '131', 1.0),
+('насилие сексуальное', '132', 1.0),
+('несовершеннолетний', '134', 1.0),
+('несовершеннолетний', '135', 0.8),
+('несовершеннолетний', '150', 0.8),
+('несовершеннолетний', '151', 0.8),
+('ребенок', '134', 1.0),
+('ребенок', '135', 0.8),
+('ребенок', '150', 0.8),
+('развратные действия', '135', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Преступления против свободы
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('похищение человека', '126', 1.0),
+('захват заложника', '206', 1.0),
+('заложник', '206', 1.0),
+('лишение свободы', '127', 1.0),
+('незаконное лишение свободы', '127', 1.0),
+('торговля людьми', '127.1', 1.0),
+('рабский труд', '127.2', 1.0),
+('клевета', '128.1', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Наркотические преступления
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('наркотик', '228', 1.0),
+('наркотик', '228.1', 0.8),
+('наркотик', '228.2', 0.8),
+('наркотик', '228.3', 0.8),
+('наркотик', '228.4', 0.8),
+('наркотик', '229', 0.8),
+('наркотик', '230', 0.8),
+('наркотик', '231', 0.8),
+('наркотик', '232', 0.8),
+('наркотики', '228', 1.0),
+('наркотики', '228.1', 0.8),
+('наркотики', '229', 0.8),
+('героин', '228', 1.0),
+('героин', '228.1', 0.8),
+('кокаин', '228', 1.0),
+('кокаин', '228.1', 0.8),
+('марихуана', '228', 1.0),
+('марихуана', '231', 0.8),
+('гашиш', '228', 1.0),
+('гашиш', '231', 0.8),
+('амфетамин', '228', 1.0),
+('амфетамин', '228.1', 0.8),
+('наркотическое средство', '228', 1.0),
+('наркотическое средство', '228.1', 0.8),
+('психотропное вещество', '228', 1.0),
+('психотропное вещество', '228.1', 0.8),
+('сбыт наркотиков', '228.1', 1.0),
+('распространение наркотиков', '228.1', 1.0),
+('склонение к употреблению', '230', 1.0),
+('притон', '232', 1.0),
+('выращивание наркотических растений', '231', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Транспортные преступления
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('дтп', '264', 1.0),
+('дтп', '265', 0.8),
+('авария', '264', 1.0),
+('дорожно-транспортное', '264', 1.0),
+('сбил пешехода', '264', 1.0),
+('наехал', '264', 1.0),
+('скрылся с места', '265', 1.0),
+('оставил место дтп', '265', 1.0),
+('пьяный за рулем', '264.1', 1.0),
+('алкоголь за рулем', '264', 1.0),
+('нарушение пдд', '264', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Экономические преступления
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('коррупция', '290', 1.0),
+('коррупция', '291', 0.8),
+('взятка', '290', 1.0),
+('взятка', '291', 0.8),
+('взятка', '291.1', 0.8),
+('взятка', '291.2', 0.8),
+('подкуп', '290', 1.0),
+('подкуп', '291', 0.8),
+('подкуп', '204', 0.8),
+('дал взятку', '291', 1.0),
+('получил взятку', '290', 1.0),
+('откат', '290', 1.0),
+('откат', '291', 0.8),
+('отмывание', '174', 1.0),
+('отмывание', '174.1', 0.8),
+('легализация', '174', 1.0),
+('легализация', '174.1', 0.8),
+('уклонение от налогов', '198', 1.0),
+('уклонение от налогов', '199', 0.8),
+('налоги не платил', '198', 1.0),
+('налоги не платил', '199', 0.8),
+('незаконное предпринимательство', '171', 1.0),
+('банкротство', '195', 1.0),
+('банкротство', '196', 0.8),
+('банкротство', '197', 0.8),
+('фиктивное банкротство', '197', 1.0),
+('преднамеренное банкротство', '196', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Компьютерные преступления
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('взлом', '272', 1.0),
+('взлом', '273', 0.8),
+('взлом', '274.1', 0.8),
+('хакер', '272', 1.0),
+('хакер', '273', 0.8),
+('компьютер', '272', 1.0),
+('компьютер', '273', 0.8),
+('компьютер', '274', 0.8),
+('вирус', '273', 1.0),
+('компьютерная программа', '273', 1.0),
+('неправомерный доступ', '272', 1.0),
+('вредоносная программа', '273', 1.0),
+('база данных', '272', 1.0),
+('критическая инфраструктура', '274.1', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Террористические и экстремистские преступления
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('терроризм', '205', 1.0),
+('терроризм', '205.1', 0.8),
+('терроризм', '205.2', 0.8),
+('терроризм', '205.3', 0.8),
+('терроризм', '205.4', 0.8),
+('терроризм', '205.5', 0.8),
+('террористический акт', '205', 1.0),
+('теракт', '205', 1.0),
+('взрыв', '205', 1.0),
+('взрыв', '207', 0.8),
+('взрыв', '222.1', 0.8),
+('ложное сообщение', '207', 1.0),
+('заминирование', '207', 1.0),
+('экстремизм', '280', 1.0),
+('экстремизм', '282', 0.8),
+('экстремизм', '282.1', 0.8),
+('экстремизм', '282.2', 0.8),
+('разжигание ненависти', '282', 1.0),
+('национальная рознь', '282', 1.0),
+('религиозная рознь', '282', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Преступления против государственной власти
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('служебный подлог', '292', 1.0),
+('подлог', '292', 1.0),
+('подлог', '327', 0.8),
+('халатность', '293', 1.0),
+('превышение полномочий', '286', 1.0),
+('злоупотребление полномочиями', '285', 1.0),
+('фальсификация доказательств', '303', 1.0),
+('незаконное задержание', '301', 1.0),
+('пытки следователем', '302', 1.0),
+('ложный донос', '306', 1.0),
+('лжесвидетельство', '307', 1.0),
+('государственная измена', '275', 1.0),
+('шпионаж', '276', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
+
+-- Хулиганство и общественный порядок
+INSERT INTO keyword_article_map (keyword, article_number, weight) VALUES
+('хулиганство', '213', 1.0),
+('дебош', '213', 1.0),
+('нарушение порядка', '213', 1.0),
+('вандализм', '214', 1.0),
+('массовые беспорядки', '212', 1.0),
+('бандитизм', '209', 1.0),
+('банда', '209', 1.0),
+('банда', '210', 0.8),
+('преступная группа', '210', 1.0),
+('организованная группа', '210', 1.0)
+ON CONFLICT (keyword, article_type, article_number) DO NOTHING;
@@ -0,0 +1,20 @@
+-- Сигнатуры MinHash дел для поиска похожих: 128 значений uint32 (512 байт) на дело.
+-- shingles — отсортированные хеши лемм (4 байта на слово): по ним кандидаты LSH
+-- упорядочиваются по точному Жаккару, а не по оценке сигнатуры
+CREATE TABLE IF NOT EXISTS case_minhash (
+    analysis_id INTEGER PRIMARY KEY REFERENCES crime_analyses(id) ON DELETE CASCADE,
+    signature BYTEA NOT NULL,
+    shingles BYTEA NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Индекс LSH: хеш каждой полосы сигнатуры → дела. Дела-кандидаты для запроса
+-- находятся по точному совпадению хотя бы одной полосы, без просмотра всей таблицы
+CREATE TABLE IF NOT EXISTS case_lsh_buckets (
+    bucket BIGINT NOT NULL,
+    analysis_id INTEGER NOT NULL REFERENCES case_minhash(analysis_id) ON DELETE CASCADE,
+    PRIMARY KEY (bucket, analysis_id)
+);
+
+-- Удаление сигнатуры дела каскадом удаляет его корзины
+CREATE INDEX IF NOT EXISTS idx_case_lsh_buckets_analysis_id ON case_lsh_buckets(analysis_id);
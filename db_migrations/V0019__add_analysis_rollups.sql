@@ -0,0 +1,48 @@
+-- Агрегаты завершённых анализов для панели статистики: число анализов в разрезе
+-- категории, статьи УК РФ, сотрудника, тяжести основной статьи и дня происшествия.
+-- Обновляются в транзакции сохранения анализа; сверка с исходными таблицами — POST ?action=stats_recompute
+CREATE TABLE IF NOT EXISTS analysis_rollups (
+    dimension VARCHAR(20) NOT NULL,
+    bucket VARCHAR(200) NOT NULL,
+    analyses BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (dimension, bucket)
+);
+
+-- Заполнение по уже сохранённым анализам
+INSERT INTO analysis_rollups (dimension, bucket, analyses)
+SELECT 'category', COALESCE(category, ''), COUNT(*)
+FROM crime_analyses
+WHERE status = 'completed'
+GROUP BY 2
+ON CONFLICT DO NOTHING;
+
+INSERT INTO analysis_rollups (dimension, bucket, analyses)
+SELECT 'officer', COALESCE(officer_id::text, ''), COUNT(*)
+FROM crime_analyses
+WHERE status = 'completed'
+GROUP BY 2
+ON CONFLICT DO NOTHING;
+
+INSERT INTO analysis_rollups (dimension, bucket, analyses)
+SELECT 'day', incident_date::text, COUNT(*)
+FROM crime_analyses
+WHERE status = 'completed'
+GROUP BY 2
+ON CONFLICT DO NOTHING;
+
+INSERT INTO analysis_rollups (dimension, bucket, analyses)
+SELECT 'severity', COALESCE(analysis_result->'article_details'->0->>'severity', ''), COUNT(*)
+FROM crime_analyses
+WHERE status = 'completed'
+GROUP BY 2
+ON CONFLICT DO NOTHING;
+
+INSERT INTO analysis_rollups (dimension, bucket, analyses)
+SELECT 'article', a.article_number, COUNT(DISTINCT aa.analysis_id)
+FROM analysis_articles aa
+JOIN crime_analyses ca ON ca.id = aa.analysis_id
+JOIN uk_rf_articles a ON a.id = aa.article_id
+WHERE aa.article_type = 'uk_rf' AND ca.status = 'completed'
+GROUP BY 2
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,12 @@
+-- Сессии сотрудников: в базе хранится только SHA-256 токена, сам токен знает лишь клиент
+CREATE TABLE IF NOT EXISTS sessions (
+    id SERIAL PRIMARY KEY,
+    token_hash CHAR(64) UNIQUE NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP
+);
+
+-- Очистка истёкших сессий пользователя при входе
+CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions(user_id, expires_at);
@@ -0,0 +1,12 @@
+-- Счётчики попыток входа по окнам фиксированной длины (ключ — 'user:<логин>' или 'ip:<адрес>').
+-- Общие для всех экземпляров функции auth; скользящее окно оценивается по текущему и предыдущему окну
+CREATE TABLE IF NOT EXISTS login_rate_limits (
+    key VARCHAR(300) NOT NULL,
+    window_id BIGINT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (key, window_id)
+);
+
+-- Удаление устаревших окон
+CREATE INDEX IF NOT EXISTS idx_login_rate_limits_updated_at ON login_rate_limits(updated_at);
@@ -0,0 +1,4 @@
+-- Справочник сотрудников: постраничный список от новых к старым, с фильтрами по отделу и роли
+CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_users_department ON users(department, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role, created_at DESC, id DESC);
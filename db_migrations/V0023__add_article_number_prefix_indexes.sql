@@ -0,0 +1,6 @@
+-- Префикс номера статьи (поиск article_number LIKE '158%') по B-дереву с varchar_pattern_ops:
+-- такой индекс обслуживает LIKE при любой сортировке базы и не требует расширения триграмм.
+-- Без индекса под LIKE дизъюнкция search_vector @@ query OR article_number LIKE ... читает всю таблицу
+CREATE INDEX IF NOT EXISTS idx_uk_rf_article_number_prefix ON uk_rf_articles (article_number varchar_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_upk_rf_article_number_prefix ON upk_rf_articles (article_number varchar_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_constitution_article_number_prefix ON constitution_articles (article_number varchar_pattern_ops);
@@ -0,0 +1,3 @@
+-- Признак обрезки текста по бюджету извлечения (PARSE_MAX_PAGES / PARSE_MAX_TEXT_BYTES):
+-- при попадании в кэш клиент узнаёт, что документ разобран не полностью
+ALTER TABLE document_text_cache ADD COLUMN IF NOT EXISTS truncated BOOLEAN NOT NULL DEFAULT FALSE;
@@ -0,0 +1,11 @@
+-- Приращения агрегатов статистики: транзакция сохранения анализа только добавляет строки
+-- и не блокирует общие строки analysis_rollups (у всех анализов одной категории одна строка).
+-- Обработчик очереди (POST ?action=process_jobs) и сверка stats_recompute переносят приращения
+-- в analysis_rollups; до переноса статистика складывает их с агрегатами при чтении
+CREATE TABLE IF NOT EXISTS analysis_rollup_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    dimension VARCHAR(20) NOT NULL,
+    bucket VARCHAR(200) NOT NULL,
+    analyses BIGINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,9 @@
+-- Справочник сотрудников: порядок и курсор — по COALESCE(created_at, 'epoch'), id.
+-- Сотрудники без created_at (внесённые в обход регистрации) идут последними и не ломают курсор
+DROP INDEX IF EXISTS idx_users_created_at_id;
+DROP INDEX IF EXISTS idx_users_department;
+DROP INDEX IF EXISTS idx_users_role;
+
+CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users((COALESCE(created_at, 'epoch'::timestamp)) DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_users_department ON users(department, (COALESCE(created_at, 'epoch'::timestamp)) DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role, (COALESCE(created_at, 'epoch'::timestamp)) DESC, id DESC);